@@ -19,6 +19,8 @@ struct _PyShadowCode;
 
 typedef struct {
     unsigned int ncalls, curcalls; /* incremented for each execution */
+    unsigned int nbackedges;       /* loop iterations run in the interpreter */
+    int profile_types;             /* profile types even if the thread doesn't */
     void *co_zombieframe;
     struct _PyShadowCode *shadow;
 } PyCode_MutableState;
@@ -159,6 +159,10 @@ struct _ts {
      * enabled. */
     char profile_interp;
 
+    /* Id of the lazy import resolution or module load in progress on this
+     * thread while lazy import profiling, or -1. */
+    Py_ssize_t lazy_import_profile_parent;
+
 };
 
 // Alias for backward compatibility with Python 3.8
@@ -39,6 +39,9 @@ PyAPI_FUNC(PyObject *) _PyImport_LoadLazyImportTstate(PyThreadState *tstate,
 PyAPI_FUNC(PyObject *) _PyImport_LoadLazyImport(PyObject *lazy_import,
                                                 int full);
 
+PyAPI_FUNC(int) _PyImport_SetLazyImportProfiling(int enabled);
+PyAPI_FUNC(PyObject *) _PyImport_GetAndClearLazyImportProfile(void);
+
 #ifdef __cplusplus
 }
 #endif
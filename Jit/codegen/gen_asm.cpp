@@ -534,6 +534,11 @@ void NativeGenerator::setupFrameAndSaveCallerRegisters(x86::Gp tstate_reg) {
   x86::Gp scratch_reg = x86::rax;
   as_->push(scratch_reg);
   initializeFrameHeader(tstate_reg, scratch_reg);
+  if (_PyJIT_CountCompiledCalls()) {
+    as_->mov(
+        scratch_reg, reinterpret_cast<uint64_t>(env_.code_rt->callCountAddr()));
+    as_->inc(x86::qword_ptr(scratch_reg));
+  }
   as_->pop(scratch_reg);
 
   // Push used callee-saved registers.
@@ -837,12 +837,21 @@ void LoadModuleMethodCache::fill(
   module_version_ = version;
 }
 
+static std::unique_ptr<CacheStats> makeCacheStats(
+    BorrowedRef<PyCodeObject> code,
+    int bc_offset) {
+  auto stats = std::make_unique<CacheStats>();
+  stats->filename = PyUnicode_AsUTF8(code->co_filename);
+  stats->method_name = PyUnicode_AsUTF8(code->co_name);
+  stats->code = code;
+  stats->bc_offset = bc_offset;
+  return stats;
+}
+
 void LoadMethodCache::initCacheStats(
-    const char* filename,
-    const char* method_name) {
-  cache_stats_ = std::make_unique<CacheStats>();
-  cache_stats_->filename = filename;
-  cache_stats_->method_name = method_name;
+    BorrowedRef<PyCodeObject> code,
+    int bc_offset) {
+  cache_stats_ = makeCacheStats(code, bc_offset);
 }
 
 void LoadMethodCache::clearCacheStats() {
@@ -853,6 +862,22 @@ const CacheStats* LoadMethodCache::cacheStats() {
   return cache_stats_.get();
 }
 
+void LoadMethodCache::forgetCode(BorrowedRef<PyCodeObject> code) {
+  if (cache_stats_ != nullptr && cache_stats_->code == code) {
+    cache_stats_->code = nullptr;
+  }
+}
+
+int LoadMethodCache::numCachedTypes() const {
+  int count = 0;
+  for (auto& entry : entries_) {
+    if (entry.type != nullptr) {
+      count++;
+    }
+  }
+  return count;
+}
+
 LoadMethodCache::~LoadMethodCache() {
   for (auto& entry : entries_) {
     if (entry.type != nullptr) {
@@ -1183,11 +1208,9 @@ void LoadTypeMethodCache::typeChanged(BorrowedRef<PyTypeObject> /* type */) {
 }
 
 void LoadTypeMethodCache::initCacheStats(
-    const char* filename,
-    const char* method_name) {
-  cache_stats_ = std::make_unique<CacheStats>();
-  cache_stats_->filename = filename;
-  cache_stats_->method_name = method_name;
+    BorrowedRef<PyCodeObject> code,
+    int bc_offset) {
+  cache_stats_ = makeCacheStats(code, bc_offset);
 }
 
 void LoadTypeMethodCache::clearCacheStats() {
@@ -1198,6 +1221,12 @@ const CacheStats* LoadTypeMethodCache::cacheStats() {
   return cache_stats_.get();
 }
 
+void LoadTypeMethodCache::forgetCode(BorrowedRef<PyCodeObject> code) {
+  if (cache_stats_ != nullptr && cache_stats_->code == code) {
+    cache_stats_->code = nullptr;
+  }
+}
+
 LoadTypeMethodCache::~LoadTypeMethodCache() {
   if (type != nullptr) {
     ltm_watcher.unwatch(type, this);
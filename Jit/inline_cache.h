@@ -218,6 +218,13 @@ struct CacheMiss {
 struct CacheStats {
   std::string filename;
   std::string method_name;
+  // Code object and bytecode offset of the instruction using the cache. The
+  // code object is only used to look up the stats for a function, never
+  // dereferenced, and is reset to nullptr when the code object is destroyed.
+  BorrowedRef<PyCodeObject> code{nullptr};
+  int bc_offset{-1};
+  // Number of receiver types in the cache when the stats were read.
+  int cached_types{0};
   std::unordered_map<std::string, CacheMiss> misses;
 };
 
@@ -235,9 +242,14 @@ class LoadMethodCache {
   JITRT_LoadMethodResult lookup(BorrowedRef<> obj, BorrowedRef<> name);
   void typeChanged(PyTypeObject* type);
 
-  void initCacheStats(const char* filename, const char* method_name);
+  void initCacheStats(BorrowedRef<PyCodeObject> code, int bc_offset);
   void clearCacheStats();
   const CacheStats* cacheStats();
+  // Stop attributing the stats to code, which is being destroyed.
+  void forgetCode(BorrowedRef<PyCodeObject> code);
+
+  // Number of receiver types currently cached.
+  int numCachedTypes() const;
 
  private:
   JITRT_LoadMethodResult lookupSlowPath(BorrowedRef<> obj, BorrowedRef<> name);
@@ -279,9 +291,11 @@ class LoadTypeMethodCache {
       BorrowedRef<> name);
   void typeChanged(BorrowedRef<PyTypeObject> type);
 
-  void initCacheStats(const char* filename, const char* method_name);
+  void initCacheStats(BorrowedRef<PyCodeObject> code, int bc_offset);
   void clearCacheStats();
   const CacheStats* cacheStats();
+  // Stop attributing the stats to code, which is being destroyed.
+  void forgetCode(BorrowedRef<PyCodeObject> code);
 
  private:
   void
@@ -32,6 +32,34 @@ void _PyJITContext_ClearCache(_PyJITContext* ctx) {
   ctx->compiled_codes.clear();
 }
 
+int _PyJITContext_DiscardCode(
+    _PyJITContext* ctx,
+    BorrowedRef<PyCodeObject> code) {
+  std::vector<CompilationKey> keys;
+  for (auto& entry : ctx->compiled_codes) {
+    if (entry.first.code == code) {
+      keys.emplace_back(entry.first);
+    }
+  }
+  // Frames still running the code only use its machine code and
+  // CodeRuntime, which are owned by the code allocator and the Runtime, so
+  // the CompiledFunction itself can be freed rather than orphaned.
+  for (const CompilationKey& key : keys) {
+    ctx->compiled_codes.erase(key);
+  }
+
+  std::vector<BorrowedRef<PyFunctionObject>> funcs;
+  for (BorrowedRef<PyFunctionObject> func : ctx->compiled_funcs) {
+    if (func->func_code == code) {
+      funcs.emplace_back(func);
+    }
+  }
+  for (BorrowedRef<PyFunctionObject> func : funcs) {
+    deopt_func(ctx, func);
+  }
+  return funcs.size();
+}
+
 // Record per-function metadata and set the function's entrypoint.
 static _PyJIT_Result finalizeCompiledFunc(
     _PyJITContext* ctx,
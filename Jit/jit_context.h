@@ -83,6 +83,17 @@ struct _PyJITContext {
  */
 void _PyJITContext_ClearCache(_PyJITContext* ctx);
 
+/*
+ * Discard the compiled code for code, resetting the entry points of the
+ * functions using it so that they are compiled again on their next call.
+ * Frames still running the old code are unaffected.
+ *
+ * Returns the number of functions whose entry points were reset.
+ */
+int _PyJITContext_DiscardCode(
+    _PyJITContext* ctx,
+    BorrowedRef<PyCodeObject> code);
+
 /*
  * JIT compile func and patch its entry point.
  *
@@ -1281,8 +1281,7 @@ LIRGenerator::TranslatedBlock LIRGenerator::TranslateOneBasicBlock(
         auto cache_entry = load_type_method_caches_.at(instr->cache_id());
         if (g_collect_inline_cache_stats) {
           cache_entry->initCacheStats(
-              PyUnicode_AsUTF8(code->co_filename),
-              PyUnicode_AsUTF8(code->co_name));
+              code, instr->frameState()->instr_offset().value());
         }
         bbb.AppendCode(
             "Move {}, {:#x}", tmp_id, reinterpret_cast<uint64_t>(name));
@@ -1325,8 +1324,7 @@ LIRGenerator::TranslatedBlock LIRGenerator::TranslateOneBasicBlock(
         auto cache_entry = Runtime::get()->allocateLoadMethodCache();
         if (g_collect_inline_cache_stats) {
           cache_entry->initCacheStats(
-              PyUnicode_AsUTF8(code->co_filename),
-              PyUnicode_AsUTF8(code->co_name));
+              code, instr->frameState()->instr_offset().value());
         }
         bbb.AppendCode(
             "Call {}, {:#x}, {:#x}, {}, {}",
@@ -105,6 +105,39 @@ void readVersion2(std::istream& stream) {
   }
 }
 
+// Convert the types recorded by an interpreter TypeProfiler to their names,
+// most frequent first, adding any types with cached split dict keys to
+// dict_key_types.
+PolymorphicProfiles profiledTypeNames(
+    const TypeProfiler& profile,
+    std::unordered_set<BorrowedRef<PyTypeObject>>& dict_key_types) {
+  PolymorphicProfiles vec;
+  // Store a list of profile row indices sorted by number of times seen
+  std::vector<int> sorted_rows;
+  for (int row = 0; row < profile.rows() && profile.count(row) > 0; row++) {
+    sorted_rows.emplace_back(row);
+  }
+  std::sort(sorted_rows.begin(), sorted_rows.end(), [&](int a, int b) {
+    return profile.count(a) > profile.count(b);
+  });
+  for (int row : sorted_rows) {
+    std::vector<std::string> single_profile;
+    for (int col = 0; col < profile.cols(); ++col) {
+      BorrowedRef<PyTypeObject> type = profile.type(row, col);
+      if (type == nullptr) {
+        single_profile.emplace_back("<NULL>");
+      } else {
+        if (numCachedKeys(type) > 0) {
+          dict_key_types.emplace(type);
+        }
+        single_profile.emplace_back(typeFullname(type));
+      }
+    }
+    vec.emplace_back(single_profile);
+  }
+  return vec;
+}
+
 void writeVersion4(std::ostream& stream, const TypeProfiles& profiles) {
   ProfileData data;
   std::unordered_set<BorrowedRef<PyTypeObject>> dict_key_types;
@@ -117,30 +150,8 @@ void writeVersion4(std::ostream& stream, const TypeProfiles& profiles) {
         // The profile isn't interesting. Ignore it.
         continue;
       }
-      auto& vec = code_data[profile_pair.first];
-      // Store a list of profile row indices sorted by number of times seen
-      std::vector<int> sorted_rows;
-      for (int row = 0; row < profile.rows() && profile.count(row) > 0; row++) {
-        sorted_rows.emplace_back(row);
-      }
-      std::sort(sorted_rows.begin(), sorted_rows.end(), [&](int a, int b) {
-        return profile.count(a) > profile.count(b);
-      });
-      for (int row : sorted_rows) {
-        std::vector<std::string> single_profile;
-        for (int col = 0; col < profile.cols(); ++col) {
-          BorrowedRef<PyTypeObject> type = profile.type(row, col);
-          if (type == nullptr) {
-            single_profile.emplace_back("<NULL>");
-          } else {
-            if (numCachedKeys(type) > 0) {
-              dict_key_types.emplace(type);
-            }
-            single_profile.emplace_back(typeFullname(type));
-          }
-        }
-        vec.emplace_back(single_profile);
-      }
+      code_data[profile_pair.first] =
+          profiledTypeNames(profile, dict_key_types);
     }
     if (!code_data.empty()) {
       data.emplace(codeKey(code_obj), std::move(code_data));
@@ -276,6 +287,31 @@ bool readProfileData(std::istream& stream) {
   return true;
 }
 
+bool mergeProfileData(
+    const std::string& filename,
+    std::vector<CodeKey>& code_keys) {
+  // Read into empty maps, so that a failure can't clobber the loaded data.
+  ProfileData profile_data;
+  TypeDictKeys type_dict_keys;
+  std::swap(profile_data, s_profile_data);
+  std::swap(type_dict_keys, s_type_dict_keys);
+  bool success = readProfileData(filename);
+  std::swap(profile_data, s_profile_data);
+  std::swap(type_dict_keys, s_type_dict_keys);
+  if (!success) {
+    return false;
+  }
+
+  for (auto& [key, code_data] : profile_data) {
+    code_keys.emplace_back(key);
+    s_profile_data.emplace(key, std::move(code_data));
+  }
+  for (auto& [type_name, keys] : type_dict_keys) {
+    s_type_dict_keys.emplace(type_name, std::move(keys));
+  }
+  return true;
+}
+
 bool writeProfileData(const std::string& filename) {
   std::ofstream file(filename, std::ios::binary);
   if (!file) {
@@ -308,6 +344,44 @@ void clearProfileData() {
   s_live_types.clear();
 }
 
+size_t numProfiledCodes() {
+  return s_profile_data.size();
+}
+
+bool updateProfileData(PyCodeObject* code, BCOffset bc_off) {
+  auto data_it = s_profile_data.find(codeKey(code));
+  if (data_it == s_profile_data.end()) {
+    return false;
+  }
+  CodeProfileData& code_data = data_it->second;
+  auto entry_it = code_data.find(bc_off);
+  if (entry_it == code_data.end()) {
+    return false;
+  }
+
+  TypeProfiles& profiles = Runtime::get()->typeProfiles();
+  auto code_it = profiles.find(Ref<PyCodeObject>::create(code));
+  if (code_it != profiles.end()) {
+    auto hits_it = code_it->second.typed_hits.find(bc_off);
+    if (hits_it != code_it->second.typed_hits.end()) {
+      const TypeProfiler& profile = *hits_it->second;
+      if (!profile.empty() && !profile.isPolymorphic()) {
+        // Dict keys are only primed when loading a profile, so these are
+        // ignored.
+        std::unordered_set<BorrowedRef<PyTypeObject>> dict_key_types;
+        entry_it->second = profiledTypeNames(profile, dict_key_types);
+        return true;
+      }
+    }
+  }
+
+  code_data.erase(entry_it);
+  if (code_data.empty()) {
+    s_profile_data.erase(data_it);
+  }
+  return true;
+}
+
 const CodeProfileData* getProfileData(PyCodeObject* code) {
   auto it = s_profile_data.find(codeKey(code));
   return it == s_profile_data.end() ? nullptr : &it->second;
@@ -34,6 +34,9 @@ bool writeProfileData(std::ostream& stream);
 // Clear any loaded profile data.
 void clearProfileData();
 
+// Return the number of code objects with loaded profile data.
+size_t numProfiledCodes();
+
 // Store a list of profiles of type names for all operands of an instruction
 using PolymorphicProfiles = std::vector<std::vector<std::string>>;
 
@@ -48,6 +51,13 @@ using CodeProfileData = UnorderedMap<BCOffset, PolymorphicProfiles>;
 // there is none.
 const CodeProfileData* getProfileData(PyCodeObject* code);
 
+// Replace the loaded profile data for the instruction at bc_off in code with
+// the types the interpreter has profiled there in this process. If it hasn't
+// profiled the instruction, or saw more than one type, the data is dropped so
+// that code compiled later doesn't speculate on those types. Returns false if
+// there was no loaded data for the instruction.
+bool updateProfileData(PyCodeObject* code, BCOffset bc_off);
+
 // Return a list types materialized from a CodeProfileData and a BCOffset. The
 // result will be empty if there's no data for bc_off.
 PolymorphicTypes getProfiledTypes(const CodeProfileData& data, BCOffset bc_off);
@@ -64,6 +74,15 @@ using CodeKey = std::string;
 // Return the code key for the given code object.
 CodeKey codeKey(PyCodeObject* code);
 
+// Load serialized profile data from the given filename like readProfileData(),
+// into the data that's already loaded, which wins for any code object or type
+// that both have data for. On success, add the keys of the code objects the
+// file has data for to code_keys and return true; on failure, leave the loaded
+// data unchanged.
+bool mergeProfileData(
+    const std::string& filename,
+    std::vector<CodeKey>& code_keys);
+
 // Return the qualname of the given code object, falling back to its name or
 // "<unknown>" if not set.
 std::string codeQualname(PyCodeObject* code);
@@ -33,6 +33,7 @@
 
 #include <dis-asm.h>
 
+#include <algorithm>
 #include <atomic>
 #include <chrono>
 #include <climits>
@@ -64,6 +65,12 @@ struct JitConfig {
   size_t cold_code_section_size{0};
   int hir_inliner_enabled{0};
   unsigned int auto_jit_threshold{0};
+  size_t auto_jit_queue_size{0};
+  unsigned int recompile_threshold{0};
+  unsigned int max_recompiles{2};
+  unsigned int recompile_window_ms{1000};
+  size_t active_code_budget{0};
+  unsigned int active_code_sweep_interval_ms{1000};
   uint32_t attr_cache_size{1};
   int dict_watcher_id{-1};
   int func_watcher_id{-1};
@@ -78,6 +85,7 @@ extern "C" const char* __asan_default_options() {
 
 void initJitConfig_() {
   jit_config = JitConfig();
+  _PyJIT_AutoJITBackedgeThresholdValue = 0;
 }
 
 int _PyJIT_IsJitConfigAllow_jit_list_wildcards() {
@@ -133,6 +141,86 @@ static std::unordered_set<BorrowedRef<>> jit_reg_units;
 using UnitDeletedCallback = std::function<void(PyObject*)>;
 static UnitDeletedCallback handle_unit_deleted_during_preload = nullptr;
 
+// Hot functions waiting to be compiled by auto-JIT, when it compiles in
+// batches.
+static std::unordered_set<BorrowedRef<>> jit_auto_queue;
+
+struct AutoJitStats {
+  size_t queued{0};
+  size_t compiled{0};
+  size_t failed{0};
+  size_t batches{0};
+  std::chrono::steady_clock::duration compile_time{0};
+};
+static AutoJitStats auto_jit_stats;
+
+// A guard that failed in JIT-compiled code, possibly in an inlined function.
+struct FailedGuard {
+  BorrowedRef<PyCodeObject> code;
+  BCOffset bc_offset;
+  const char* description;
+  unsigned int count;
+};
+
+// Guard failures in a compiled code object in the current window, and how
+// many times they have made us recompile it.
+struct RecompileState {
+  std::vector<FailedGuard> failed_guards;
+  unsigned int guard_failures{0};
+  std::chrono::steady_clock::time_point window_start;
+  unsigned int recompiles{0};
+  bool capped{false};
+};
+static std::unordered_map<BorrowedRef<PyCodeObject>, RecompileState>
+    jit_recompile_states;
+
+// A recompilation, or one skipped because of jit-max-recompiles, reported by
+// get_and_clear_runtime_stats().
+struct RecompileEvent {
+  struct Guard {
+    std::string func_qualname;
+    int lineno;
+    std::string description;
+    unsigned int count;
+  };
+
+  std::string func_qualname;
+  std::string filename;
+  unsigned int recompiles;
+  bool capped;
+  std::vector<Guard> guards;
+};
+static std::vector<RecompileEvent> jit_recompile_events;
+
+// Compiled code that jit-active-code-budget stopped functions from using,
+// reported by get_and_clear_runtime_stats(). Its machine code stays allocated.
+struct CodeDeactivation {
+  std::string func_qualname;
+  std::string filename;
+  size_t code_size;
+  int num_funcs;
+};
+
+struct ActiveCodeStats {
+  size_t sweeps{0};
+  size_t deactivated_bytes{0};
+  std::vector<CodeDeactivation> deactivations;
+};
+static ActiveCodeStats active_code_stats;
+
+// With jit-active-code-budget, when each compiled code object was last seen
+// being called.
+static std::unordered_map<
+    BorrowedRef<PyCodeObject>,
+    std::chrono::steady_clock::time_point>
+    jit_code_last_call;
+
+// Code objects deactivated by jit-active-code-budget. They run in the
+// interpreter from then on, unless compiled again with force_compile(): their
+// old machine code is never freed, so compiling them again whenever they get
+// warm would keep allocating more.
+static std::unordered_set<BorrowedRef<PyCodeObject>> jit_deactivated_codes;
+
 // Every unit that is a code object has corresponding entry in jit_code_data.
 static std::unordered_map<BorrowedRef<PyCodeObject>, CodeData> jit_code_data;
 // Every unit has an entry in preloaders if we are doing multithreaded compile.
@@ -290,6 +378,69 @@ void initFlagProcessor() {
         "Enable auto-JIT mode, which compiles functions after the given "
         "threshold");
 
+    xarg_flag_processor.addOption(
+        "jit-auto-backedge-threshold",
+        "PYTHONJITAUTOBACKEDGETHRESHOLD",
+        [](unsigned int threshold) {
+          _PyJIT_AutoJITBackedgeThresholdValue = threshold;
+        },
+        "With jit-auto, also compile functions after their loops have run "
+        "the given number of iterations in the interpreter. Only checked "
+        "when the function is next called: a running loop isn't moved to "
+        "compiled code");
+
+    xarg_flag_processor.addOption(
+        "jit-auto-queue-size",
+        "PYTHONJITAUTOQUEUESIZE",
+        jit_config.auto_jit_queue_size,
+        "With jit-auto, queue hot functions and compile them in batches of "
+        "the given size (using jit-batch-compile-workers threads) instead of "
+        "one at a time");
+
+    xarg_flag_processor.addOption(
+        "jit-recompile-threshold",
+        "PYTHONJITRECOMPILETHRESHOLD",
+        [](unsigned int threshold) {
+          jit_config.recompile_threshold = threshold;
+        },
+        "Recompile a function after the guards in its JIT-compiled code have "
+        "failed the given number of times, without speculating on the types "
+        "that failed");
+
+    xarg_flag_processor.addOption(
+        "jit-max-recompiles",
+        "PYTHONJITMAXRECOMPILES",
+        [](unsigned int max_recompiles) {
+          jit_config.max_recompiles = max_recompiles;
+        },
+        "With jit-recompile-threshold, the most times a function is "
+        "recompiled (default 2)");
+
+    xarg_flag_processor.addOption(
+        "jit-recompile-window-ms",
+        "PYTHONJITRECOMPILEWINDOWMS",
+        [](unsigned int window) { jit_config.recompile_window_ms = window; },
+        "With jit-recompile-threshold, only count guard failures that happen "
+        "within the given number of milliseconds of each other (default "
+        "1000, 0 counts every failure)");
+
+    xarg_flag_processor.addOption(
+        "jit-active-code-budget",
+        "PYTHONJITACTIVECODEBUDGET",
+        jit_config.active_code_budget,
+        "Once the JIT-compiled code in use takes more than the given number "
+        "of bytes, return functions that haven't been called recently to the "
+        "interpreter. Their machine code is not freed");
+
+    xarg_flag_processor.addOption(
+        "jit-active-code-sweep-interval-ms",
+        "PYTHONJITACTIVECODESWEEPINTERVALMS",
+        [](unsigned int interval) {
+          jit_config.active_code_sweep_interval_ms = interval;
+        },
+        "With jit-active-code-budget, the fewest milliseconds between looking "
+        "for compiled code to deactivate (default 1000)");
+
     xarg_flag_processor.addOption(
         "jit-debug",
         "PYTHONJITDEBUG",
@@ -728,23 +879,29 @@ static void compile_worker_thread() {
   JIT_DLOG("Finished compile worker in thread %d", std::this_thread::get_id());
 }
 
-static void multithread_compile_all() {
+// Compile the given units, along with any units registered while preloading
+// them, using the given number of worker threads.
+static void multithread_compile_all(
+    std::vector<BorrowedRef<>> preload_units,
+    size_t workers) {
   JIT_CHECK(jit_ctx, "JIT not initialized");
 
   std::vector<BorrowedRef<>> compilation_units;
   // units that were deleted during preloading
   std::unordered_set<PyObject*> deleted_units;
+  // Units that were already registered aren't part of this compile; set them
+  // aside so only units registered while preloading are picked up below.
+  std::unordered_set<BorrowedRef<>> waiting_units;
+  waiting_units.swap(jit_reg_units);
   // first we have to preload everything we are going to compile
-  while (jit_reg_units.size() > 0) {
-    std::vector<BorrowedRef<>> preload_units = {
-        jit_reg_units.begin(), jit_reg_units.end()};
-    jit_reg_units.clear();
+  while (preload_units.size() > 0) {
     for (auto unit : preload_units) {
       if (deleted_units.contains(unit)) {
         continue;
       }
       handle_unit_deleted_during_preload = [&](PyObject* deleted_unit) {
         deleted_units.emplace(deleted_unit);
+        waiting_units.erase(deleted_unit);
       };
       compilation_units.push_back(unit);
       if (PyFunction_Check(unit)) {
@@ -769,8 +926,11 @@ static void multithread_compile_all() {
         }
       }
     }
+    preload_units = {jit_reg_units.begin(), jit_reg_units.end()};
+    jit_reg_units.clear();
   }
   handle_unit_deleted_during_preload = nullptr;
+  jit_reg_units.swap(waiting_units);
 
   // Filter out any units that were deleted as a side effect of preloading
   std::vector<BorrowedRef<>> live_compilation_units;
@@ -796,12 +956,12 @@ static void multithread_compile_all() {
 
   g_threaded_compile_context.startCompile(std::move(live_compilation_units));
   std::vector<std::thread> worker_threads;
-  JIT_CHECK(jit_config.batch_compile_workers, "Zero workers for compile");
+  JIT_CHECK(workers, "Zero workers for compile");
   {
     // Hold a lock while we create threads because IG production has magic to
     // wrap pthread_create() and run Python code before threads are created.
     ThreadedCompileSerialize guard;
-    for (size_t i = 0; i < jit_config.batch_compile_workers; i++) {
+    for (size_t i = 0; i < workers; i++) {
       worker_threads.emplace_back(compile_worker_thread);
     }
   }
@@ -818,6 +978,140 @@ static void multithread_compile_all() {
   jit_preloaders.clear();
 }
 
+// Compile all registered units with the configured number of workers.
+static void multithread_compile_all() {
+  std::vector<BorrowedRef<>> units{jit_reg_units.begin(), jit_reg_units.end()};
+  jit_reg_units.clear();
+  multithread_compile_all(std::move(units), jit_config.batch_compile_workers);
+}
+
+// Once the compiled code in use takes more than jit-active-code-budget bytes,
+// deactivate the compiled code objects that haven't been called since the last
+// time this ran, least recently called first, until the rest fits: their
+// functions go back to the interpreter. This runs at most once every
+// jit-active-code-sweep-interval-ms. Compiled code counts its own calls,
+// however it is entered, so nothing is done to watch for them.
+//
+// Code that was compiled since the last sweep is never deactivated, and
+// neither is Static Python code, whose entry points are also held by vtables
+// and by the compiled code calling it directly. Frames and suspended
+// generators may still be running deactivated code, and the code allocators
+// can't free, so its machine code stays allocated: this bounds the compiled
+// code in use and the JIT metadata that goes with it, not the code memory.
+static void enforce_active_code_budget() {
+  static bool sweeping = false;
+  static std::chrono::steady_clock::time_point last_sweep;
+  if (jit_config.active_code_budget == 0 || jit_ctx == nullptr || sweeping) {
+    return;
+  }
+  auto now = std::chrono::steady_clock::now();
+  if (active_code_stats.sweeps > 0 &&
+      now - last_sweep <
+          std::chrono::milliseconds(jit_config.active_code_sweep_interval_ms)) {
+    return;
+  }
+  std::unordered_map<BorrowedRef<PyCodeObject>, size_t> code_sizes;
+  size_t active_bytes = 0;
+  for (auto& [key, compiled] : jit_ctx->compiled_codes) {
+    code_sizes[key.code] += compiled->codeSize();
+    active_bytes += compiled->codeSize();
+  }
+  if (active_bytes <= jit_config.active_code_budget) {
+    return;
+  }
+  sweeping = true;
+  last_sweep = now;
+  active_code_stats.sweeps++;
+
+  std::unordered_set<BorrowedRef<PyCodeObject>> called;
+  for (auto& [key, compiled] : jit_ctx->compiled_codes) {
+    if (compiled->codeRuntime()->takeCallCount() > 0) {
+      called.emplace(key.code);
+    }
+  }
+  std::vector<BorrowedRef<PyCodeObject>> cold;
+  for (auto& [code, size] : code_sizes) {
+    if (jit_code_last_call.emplace(code, now).second) {
+      // First seen in this sweep.
+      continue;
+    }
+    if (called.count(code) != 0) {
+      jit_code_last_call[code] = now;
+    } else if (!(code->co_flags & CO_STATICALLY_COMPILED)) {
+      cold.emplace_back(code);
+    }
+  }
+  std::sort(cold.begin(), cold.end(), [](auto a, auto b) {
+    return jit_code_last_call[a] < jit_code_last_call[b];
+  });
+
+  for (BorrowedRef<PyCodeObject> code : cold) {
+    if (active_bytes <= jit_config.active_code_budget) {
+      break;
+    }
+    size_t size = code_sizes[code];
+    int num_funcs = _PyJITContext_DiscardCode(jit_ctx, code);
+    jit_deactivated_codes.emplace(code);
+    jit_code_last_call.erase(code);
+    active_bytes -= size;
+    active_code_stats.deactivated_bytes += size;
+    active_code_stats.deactivations.push_back(CodeDeactivation{
+        codeQualname(code),
+        unicodeAsString(code->co_filename),
+        size,
+        num_funcs});
+    JIT_DLOG(
+        "Deactivated %d bytes of compiled code for %s used by %d functions",
+        size,
+        codeQualname(code),
+        num_funcs);
+  }
+  sweeping = false;
+}
+
+static bool g_compiling_auto_jit_queue{false};
+
+// Compile the functions queued by auto-JIT, returning how many were compiled.
+static size_t drain_auto_jit_queue() {
+  // Compiling can run Python code (e.g. resolving lazy imports), which can
+  // queue more functions; they wait for the next batch.
+  if (jit_auto_queue.empty() || g_compiling_auto_jit_queue) {
+    return 0;
+  }
+  g_compiling_auto_jit_queue = true;
+
+  // Keep the functions alive while they're compiled.
+  std::vector<Ref<>> funcs;
+  for (BorrowedRef<> func : jit_auto_queue) {
+    funcs.emplace_back(Ref<>::create(func));
+  }
+  jit_auto_queue.clear();
+  std::vector<BorrowedRef<>> units{funcs.begin(), funcs.end()};
+
+  std::chrono::time_point start = std::chrono::steady_clock::now();
+  if (jit_config.batch_compile_workers > 0) {
+    multithread_compile_all(units, jit_config.batch_compile_workers);
+  } else {
+    for (BorrowedRef<> unit : units) {
+      compileUnit(unit);
+    }
+  }
+  auto_jit_stats.compile_time += std::chrono::steady_clock::now() - start;
+  auto_jit_stats.batches++;
+
+  size_t compiled = 0;
+  for (BorrowedRef<> unit : units) {
+    if (_PyJIT_IsCompiled(unit)) {
+      compiled++;
+    }
+  }
+  auto_jit_stats.compiled += compiled;
+  auto_jit_stats.failed += units.size() - compiled;
+  g_compiling_auto_jit_queue = false;
+  enforce_active_code_budget();
+  return compiled;
+}
+
 static PyObject* multithreaded_compile_test(PyObject*, PyObject*) {
   if (!jit_config.multithreaded_compile_test) {
     PyErr_SetString(
@@ -862,6 +1156,7 @@ disable_jit(PyObject* /* self */, PyObject* const* args, Py_ssize_t nargs) {
 
   if (nargs == 0 || args[0] == Py_True) {
     // Compile all of the pending functions/codes before shutting down
+    drain_auto_jit_queue();
     std::chrono::time_point start = std::chrono::steady_clock::now();
     if (jit_config.batch_compile_workers > 0) {
       multithread_compile_all();
@@ -880,10 +1175,185 @@ disable_jit(PyObject* /* self */, PyObject* const* args, Py_ssize_t nargs) {
     jit_code_data.clear();
   }
 
+  jit_auto_queue.clear();
   _PyJIT_Disable();
   Py_RETURN_NONE;
 }
 
+static PyObject* precompile_from_profile(
+    PyObject* /* self */,
+    PyObject* args,
+    PyObject* kwargs) {
+  static const char* kwlist[] = {"path", "workers", nullptr};
+  PyObject* path_bytes = nullptr;
+  Py_ssize_t workers = jit_config.batch_compile_workers;
+  if (!PyArg_ParseTupleAndKeywords(
+          args,
+          kwargs,
+          "O&|n:precompile_from_profile",
+          const_cast<char**>(kwlist),
+          PyUnicode_FSConverter,
+          &path_bytes,
+          &workers)) {
+    return nullptr;
+  }
+  auto path = Ref<>::steal(path_bytes);
+  if (workers < 0) {
+    PyErr_SetString(PyExc_ValueError, "workers must be non-negative");
+    return nullptr;
+  }
+  if (jit_ctx == nullptr || !_PyJIT_IsEnabled()) {
+    PyErr_SetString(PyExc_RuntimeError, "JIT is not enabled");
+    return nullptr;
+  }
+
+  std::chrono::time_point load_start = std::chrono::steady_clock::now();
+  std::string filename{PyBytes_AS_STRING(path.get())};
+  // Add to, rather than replace, any profile data loaded at startup, which
+  // code compiled later still relies on.
+  std::vector<CodeKey> code_keys;
+  if (!mergeProfileData(filename, code_keys)) {
+    PyErr_Format(
+        PyExc_ValueError,
+        "Failed to load profile data from %s",
+        filename.c_str());
+    return nullptr;
+  }
+
+  // Profiles are keyed by code object, so find the live functions whose code
+  // matches one profiled in this file. Keep them alive until they've been
+  // compiled.
+  std::unordered_set<CodeKey> profiled_keys{code_keys.begin(), code_keys.end()};
+  auto gc_module = Ref<>::steal(PyImport_ImportModule("gc"));
+  if (gc_module == nullptr) {
+    return nullptr;
+  }
+  auto objects =
+      Ref<>::steal(PyObject_CallMethod(gc_module, "get_objects", nullptr));
+  if (objects == nullptr) {
+    return nullptr;
+  }
+  std::vector<BorrowedRef<>> units;
+  std::unordered_set<CodeKey> found_keys;
+  size_t skipped = 0;
+  for (Py_ssize_t i = 0, size = PyList_GET_SIZE(objects.get()); i < size;
+       ++i) {
+    BorrowedRef<> obj = PyList_GET_ITEM(objects.get(), i);
+    if (!PyFunction_Check(obj)) {
+      continue;
+    }
+    BorrowedRef<PyFunctionObject> func{obj};
+    BorrowedRef<PyCodeObject> code{func->func_code};
+    CodeKey key = codeKey(code);
+    if (profiled_keys.count(key) == 0) {
+      continue;
+    }
+    found_keys.emplace(std::move(key));
+    if (_PyJIT_IsCompiled(func) || (code->co_flags & CO_SUPPRESS_JIT)) {
+      skipped++;
+      continue;
+    }
+    jit_reg_units.erase(obj);
+    units.emplace_back(obj);
+  }
+  std::chrono::time_point compile_start = std::chrono::steady_clock::now();
+
+  if (workers > 0 && !units.empty()) {
+    multithread_compile_all(units, workers);
+  } else {
+    for (BorrowedRef<> unit : units) {
+      compileUnit(unit);
+    }
+  }
+  std::chrono::time_point compile_end = std::chrono::steady_clock::now();
+
+  size_t compiled = 0;
+  for (BorrowedRef<> unit : units) {
+    if (_PyJIT_IsCompiled(unit)) {
+      compiled++;
+    }
+  }
+  auto to_ms = [](auto duration) {
+    return std::chrono::duration_cast<std::chrono::milliseconds>(duration)
+        .count();
+  };
+  JIT_LOG(
+      "Precompiled %d of %d functions from %s in %d ms",
+      compiled,
+      units.size(),
+      filename,
+      to_ms(compile_end - compile_start));
+
+  return Py_BuildValue(
+      "{s:n,s:n,s:n,s:n,s:n,s:L,s:L}",
+      "profiled",
+      static_cast<Py_ssize_t>(profiled_keys.size()),
+      "not_found",
+      static_cast<Py_ssize_t>(profiled_keys.size() - found_keys.size()),
+      "skipped",
+      static_cast<Py_ssize_t>(skipped),
+      "compiled",
+      static_cast<Py_ssize_t>(compiled),
+      "failed",
+      static_cast<Py_ssize_t>(units.size() - compiled),
+      "load_time_ms",
+      static_cast<long long>(to_ms(compile_start - load_start)),
+      "compile_time_ms",
+      static_cast<long long>(to_ms(compile_end - compile_start)));
+}
+
+static PyObject* compile_auto_jit_queue(PyObject* /* self */, PyObject*) {
+  if (jit_ctx == nullptr || !_PyJIT_IsEnabled()) {
+    PyErr_SetString(PyExc_RuntimeError, "JIT is not enabled");
+    return nullptr;
+  }
+  return PyLong_FromSize_t(drain_auto_jit_queue());
+}
+
+static PyObject* set_auto_jit_thresholds(
+    PyObject* /* self */,
+    PyObject* args,
+    PyObject* kwargs) {
+  static const char* kwlist[] = {"calls", "backedges", nullptr};
+  unsigned int calls;
+  unsigned int backedges = 0;
+  if (!PyArg_ParseTupleAndKeywords(
+          args,
+          kwargs,
+          "I|I:set_auto_jit_thresholds",
+          const_cast<char**>(kwlist),
+          &calls,
+          &backedges)) {
+    return nullptr;
+  }
+  // Functions only go through auto-JIT if it was enabled when they were
+  // created, so it can't be turned on or off here.
+  if (!_PyJIT_IsAutoJITEnabled()) {
+    PyErr_SetString(PyExc_RuntimeError, "auto-JIT is not enabled");
+    return nullptr;
+  }
+  if (calls == 0) {
+    PyErr_SetString(PyExc_ValueError, "calls must be positive");
+    return nullptr;
+  }
+  jit_config.auto_jit_threshold = calls;
+  _PyJIT_AutoJITBackedgeThresholdValue = backedges;
+  Py_RETURN_NONE;
+}
+
+static PyObject* write_profile(PyObject* /* self */, PyObject* arg) {
+  PyObject* path = nullptr;
+  if (!PyUnicode_FSConverter(arg, &path)) {
+    return nullptr;
+  }
+  int st = _PyJIT_WriteTypeProfiles(PyBytes_AS_STRING(path));
+  Py_DECREF(path);
+  if (st < 0) {
+    return nullptr;
+  }
+  Py_RETURN_NONE;
+}
+
 static PyObject* get_batch_compilation_time_ms(PyObject*, PyObject*) {
   return PyLong_FromLong(g_batch_compilation_time_ms);
 }
@@ -898,6 +1368,8 @@ static PyObject* force_compile(PyObject* /* self */, PyObject* func) {
     Py_RETURN_FALSE;
   }
 
+  jit_deactivated_codes.erase(
+      reinterpret_cast<PyFunctionObject*>(func)->func_code);
   switch (_PyJIT_CompileFunction(reinterpret_cast<PyFunctionObject*>(func))) {
     case PYJIT_RESULT_OK:
       Py_RETURN_TRUE;
@@ -1109,6 +1581,18 @@ int check(int ret) {
   return ret;
 }
 
+/* This is tricky: For guard failures, the `next_instr_offset` points to the
+   instruction itself, but for exceptions, the next_instr_offset is the
+   subsequent instruction. We need to pull the instruction pointer back by 1
+   in the non-guard failure cases to point to the right instruction. */
+BCOffset deopt_instr_offset(
+    const DeoptMetadata& meta,
+    const DeoptFrameMetadata& frame_meta) {
+  return meta.reason == DeoptReason::kGuardFailure
+      ? frame_meta.next_instr_offset
+      : frame_meta.instr_offset();
+}
+
 Ref<> make_deopt_stats() {
   Runtime* runtime = Runtime::get();
   auto stats = Ref<>::steal(check(PyList_New(0)));
@@ -1120,14 +1604,7 @@ Ref<> make_deopt_stats() {
     BorrowedRef<PyCodeObject> code = frame_meta.code;
 
     auto func_qualname = code->co_qualname;
-    /* This is tricky: For guard failures, the `next_instr_offset` points to the
-       instruction itself, but for exceptions, the next_instr_offset is the
-       subsequent instruction. We need to pull the instruction pointer back by 1
-       in the non-guard failure cases to point to the right instruction in the
-       deopt lineno calculation. */
-    BCOffset line_offset = meta.reason == DeoptReason::kGuardFailure
-        ? frame_meta.next_instr_offset
-        : frame_meta.instr_offset();
+    BCOffset line_offset = deopt_instr_offset(meta, frame_meta);
     int lineno_raw = code->co_linetable != nullptr
         ? PyCode_Addr2Line(code, line_offset.value())
         : -1;
@@ -1179,6 +1656,334 @@ Ref<> make_deopt_stats() {
   return stats;
 }
 
+Ref<> make_auto_jit_stats() {
+  auto stats = Ref<>::steal(check(PyDict_New()));
+  auto set_item = [&](const char* key, size_t value) {
+    auto value_obj = Ref<>::steal(check(PyLong_FromSize_t(value)));
+    check(PyDict_SetItemString(stats, key, value_obj));
+  };
+  set_item("queued", auto_jit_stats.queued);
+  set_item("compiled", auto_jit_stats.compiled);
+  set_item("failed", auto_jit_stats.failed);
+  set_item("batches", auto_jit_stats.batches);
+  set_item(
+      "compile_time_ms",
+      std::chrono::duration_cast<std::chrono::milliseconds>(
+          auto_jit_stats.compile_time)
+          .count());
+  set_item("queue_length", jit_auto_queue.size());
+
+  auto_jit_stats = {};
+
+  return stats;
+}
+
+Ref<> make_recompile_stats() {
+  auto stats = Ref<>::steal(check(PyList_New(0)));
+  auto set_str = [](PyObject* dict, PyObject* key, const std::string& value) {
+    auto value_obj = Ref<>::steal(check(PyUnicode_FromString(value.c_str())));
+    check(PyDict_SetItem(dict, key, value_obj));
+  };
+  auto set_int = [](PyObject* dict, const char* key, long value) {
+    auto value_obj = Ref<>::steal(check(PyLong_FromLong(value)));
+    check(PyDict_SetItemString(dict, key, value_obj));
+  };
+
+  for (const RecompileEvent& event : jit_recompile_events) {
+    auto item = Ref<>::steal(check(PyDict_New()));
+    set_str(item, s_str_func_qualname, event.func_qualname);
+    set_str(item, s_str_filename, event.filename);
+    set_int(item, "recompiles", event.recompiles);
+    check(PyDict_SetItemString(
+        item, "capped", event.capped ? Py_True : Py_False));
+
+    auto guards = Ref<>::steal(check(PyList_New(0)));
+    for (const RecompileEvent::Guard& guard : event.guards) {
+      auto guard_item = Ref<>::steal(check(PyDict_New()));
+      set_str(guard_item, s_str_func_qualname, guard.func_qualname);
+      set_int(guard_item, "lineno", guard.lineno);
+      set_str(guard_item, s_str_description, guard.description);
+      set_int(guard_item, "count", guard.count);
+      check(PyList_Append(guards, guard_item));
+    }
+    check(PyDict_SetItemString(item, "guards", guards));
+    check(PyList_Append(stats, item));
+  }
+
+  jit_recompile_events.clear();
+
+  return stats;
+}
+
+Ref<> make_active_code_stats() {
+  auto stats = Ref<>::steal(check(PyDict_New()));
+  auto set_item = [](PyObject* dict, const char* key, size_t value) {
+    auto value_obj = Ref<>::steal(check(PyLong_FromSize_t(value)));
+    check(PyDict_SetItemString(dict, key, value_obj));
+  };
+  auto set_str = [](PyObject* dict, PyObject* key, const std::string& value) {
+    auto value_obj = Ref<>::steal(check(PyUnicode_FromString(value.c_str())));
+    check(PyDict_SetItem(dict, key, value_obj));
+  };
+
+  size_t active_bytes = 0;
+  if (jit_ctx != nullptr) {
+    for (auto& [key, compiled] : jit_ctx->compiled_codes) {
+      active_bytes += compiled->codeSize();
+    }
+  }
+  set_item(stats, "budget", jit_config.active_code_budget);
+  set_item(stats, "active_bytes", active_bytes);
+  set_item(stats, "sweeps", active_code_stats.sweeps);
+  set_item(stats, "deactivated_bytes", active_code_stats.deactivated_bytes);
+
+  auto deactivations = Ref<>::steal(check(PyList_New(0)));
+  for (const CodeDeactivation& deactivation : active_code_stats.deactivations) {
+    auto item = Ref<>::steal(check(PyDict_New()));
+    set_str(item, s_str_func_qualname, deactivation.func_qualname);
+    set_str(item, s_str_filename, deactivation.filename);
+    set_item(item, "code_size", deactivation.code_size);
+    set_item(item, "num_funcs", deactivation.num_funcs);
+    check(PyList_Append(deactivations, item));
+  }
+  check(PyDict_SetItemString(stats, "deactivations", deactivations));
+
+  active_code_stats = {};
+
+  return stats;
+}
+
+// Forget the guard failures in the current window, and stop the interpreter
+// profiling the code that contains them.
+void reset_failed_guards(RecompileState& state) {
+  for (const FailedGuard& guard : state.failed_guards) {
+    guard.code->co_mutable->profile_types = 0;
+  }
+  state.failed_guards.clear();
+  state.guard_failures = 0;
+}
+
+// Guard failure callback installed by jit-recompile-threshold. Once the guards
+// in a compiled code object have failed often enough within
+// jit-recompile-window-ms, the profile data at the failing guards is refreshed
+// or dropped and the compiled code is discarded, so the functions using it are
+// compiled again without the stale guards on their next call.
+//
+// While guards are failing, the interpreter profiles the types seen by the
+// code containing them, which runs in the interpreter after each deopt. That
+// is what the profile data is refreshed from.
+void recompile_on_guard_failures(const DeoptMetadata& meta) {
+  BorrowedRef<PyCodeObject> code = meta.frame_meta[0].code;
+  RecompileState& state = jit_recompile_states[code];
+  if (state.capped) {
+    return;
+  }
+
+  auto now = std::chrono::steady_clock::now();
+  if (jit_config.recompile_window_ms > 0 &&
+      now - state.window_start >
+          std::chrono::milliseconds(jit_config.recompile_window_ms)) {
+    reset_failed_guards(state);
+  }
+  if (state.guard_failures == 0) {
+    state.window_start = now;
+  }
+
+  const DeoptFrameMetadata& frame_meta = meta.frame_meta[meta.inline_depth()];
+  BCOffset bc_offset = deopt_instr_offset(meta, frame_meta);
+  auto it = std::find_if(
+      state.failed_guards.begin(),
+      state.failed_guards.end(),
+      [&](const FailedGuard& guard) {
+        return guard.code == frame_meta.code && guard.bc_offset == bc_offset;
+      });
+  if (it == state.failed_guards.end()) {
+    state.failed_guards.push_back(
+        FailedGuard{frame_meta.code, bc_offset, meta.descr, 1});
+    frame_meta.code->co_mutable->profile_types = 1;
+  } else {
+    it->count++;
+  }
+  if (++state.guard_failures < jit_config.recompile_threshold) {
+    return;
+  }
+
+  RecompileEvent event;
+  event.func_qualname = codeQualname(code);
+  event.filename = unicodeAsString(code->co_filename);
+  for (const FailedGuard& guard : state.failed_guards) {
+    int lineno = guard.code->co_linetable != nullptr
+        ? PyCode_Addr2Line(guard.code, guard.bc_offset.value())
+        : -1;
+    event.guards.push_back(RecompileEvent::Guard{
+        codeQualname(guard.code), lineno, guard.description, guard.count});
+  }
+
+  state.capped = state.recompiles >= jit_config.max_recompiles;
+  if (!state.capped) {
+    for (const FailedGuard& guard : state.failed_guards) {
+      updateProfileData(guard.code, guard.bc_offset);
+    }
+    int num_funcs = _PyJITContext_DiscardCode(jit_ctx, code);
+    state.recompiles++;
+    JIT_DLOG(
+        "Discarded compiled code for %s used by %d functions after %d guard "
+        "failures",
+        event.func_qualname,
+        num_funcs,
+        state.guard_failures);
+  }
+  event.recompiles = state.recompiles;
+  event.capped = state.capped;
+  jit_recompile_events.push_back(std::move(event));
+
+  reset_failed_guards(state);
+}
+
+// Get the entry for bc_offset in the "offsets" dict of get_code_report(),
+// creating it on first use. The returned reference is borrowed from offsets.
+PyObject* get_offset_report(
+    PyObject* offsets,
+    BorrowedRef<PyCodeObject> code,
+    int bc_offset) {
+  auto key = Ref<>::steal(check(PyLong_FromLong(bc_offset)));
+  PyObject* report = PyDict_GetItemWithError(offsets, key);
+  if (report != nullptr) {
+    return report;
+  }
+  if (PyErr_Occurred()) {
+    throw CAPIError();
+  }
+
+  auto new_report = Ref<>::steal(check(PyDict_New()));
+  // Deopts before the first instruction have a negative offset.
+  PyObject* opname = Py_None;
+  int lineno_raw = -1;
+  if (bc_offset >= 0 && bc_offset < PyBytes_GET_SIZE(code->co_code)) {
+    int opcode = _Py_OPCODE(PyBytes_AS_STRING(code->co_code)[bc_offset]);
+    if (s_opnames.at(opcode) != nullptr) {
+      opname = s_opnames.at(opcode);
+    }
+    if (code->co_linetable != nullptr) {
+      lineno_raw = PyCode_Addr2Line(code, bc_offset);
+    }
+  }
+  auto lineno = Ref<>::steal(check(PyLong_FromLong(lineno_raw)));
+  auto samples = Ref<>::steal(check(PyLong_FromLong(0)));
+  auto deopts = Ref<>::steal(check(PyList_New(0)));
+  auto inline_caches = Ref<>::steal(check(PyList_New(0)));
+  check(PyDict_SetItemString(new_report, "opname", opname));
+  check(PyDict_SetItemString(new_report, "lineno", lineno));
+  check(PyDict_SetItemString(new_report, "samples", samples));
+  check(PyDict_SetItemString(new_report, "polymorphic", Py_False));
+  check(PyDict_SetItemString(new_report, "deopts", deopts));
+  check(PyDict_SetItemString(new_report, "inline_caches", inline_caches));
+  check(PyDict_SetItem(offsets, key, new_report));
+  return new_report;
+}
+
+// Add the interpreter type profile samples for code to offsets, returning the
+// total number of profiled instructions executed.
+int64_t add_sample_reports(PyObject* offsets, BorrowedRef<PyCodeObject> code) {
+  TypeProfiles& profiles = Runtime::get()->typeProfiles();
+  auto it = profiles.find(Ref<PyCodeObject>::create(code));
+  if (it == profiles.end()) {
+    return 0;
+  }
+  const CodeProfile& code_profile = it->second;
+  for (auto& [bc_offset, profile] : code_profile.typed_hits) {
+    if (profile->empty()) {
+      continue;
+    }
+    long samples_raw = profile->other();
+    for (int row = 0; row < profile->rows() && profile->count(row) != 0;
+         ++row) {
+      samples_raw += profile->count(row);
+    }
+    PyObject* report = get_offset_report(offsets, code, bc_offset.value());
+    auto samples = Ref<>::steal(check(PyLong_FromLong(samples_raw)));
+    check(PyDict_SetItemString(report, "samples", samples));
+    check(PyDict_SetItemString(
+        report,
+        "polymorphic",
+        profile->isPolymorphic() ? Py_True : Py_False));
+  }
+  return code_profile.total_hits;
+}
+
+// Add the deopts recorded for code, including the deopts of its inlined
+// copies, to offsets.
+void add_deopt_reports(PyObject* offsets, BorrowedRef<PyCodeObject> code) {
+  Runtime* runtime = Runtime::get();
+  for (auto& [idx, stat] : runtime->deoptStats()) {
+    const DeoptMetadata& meta = runtime->getDeoptMetadata(idx);
+    const DeoptFrameMetadata& frame_meta = meta.frame_meta[meta.inline_depth()];
+    if (frame_meta.code != code) {
+      continue;
+    }
+    int bc_offset = deopt_instr_offset(meta, frame_meta).value();
+    PyObject* report = get_offset_report(offsets, code, bc_offset);
+
+    auto deopt = Ref<>::steal(check(PyDict_New()));
+    auto reason =
+        Ref<>::steal(check(PyUnicode_FromString(deoptReasonName(meta.reason))));
+    auto description = Ref<>::steal(check(PyUnicode_FromString(meta.descr)));
+    auto count = Ref<>::steal(check(PyLong_FromSize_t(stat.count)));
+    auto guilty_types = Ref<>::steal(check(PyDict_New()));
+    check(PyDict_SetItem(deopt, s_str_reason, reason));
+    check(PyDict_SetItem(deopt, s_str_description, description));
+    check(PyDict_SetItem(deopt, s_str_count, count));
+    check(PyDict_SetItemString(deopt, "guilty_types", guilty_types));
+
+    auto add_type = [&](size_t count_raw, const char* type_name) {
+      auto type_count = Ref<>::steal(check(PyLong_FromSize_t(count_raw)));
+      check(PyDict_SetItemString(guilty_types, type_name, type_count));
+    };
+    for (size_t i = 0; i < stat.types.size && stat.types.types[i] != nullptr;
+         ++i) {
+      add_type(stat.types.counts[i], typeFullname(stat.types.types[i]).c_str());
+    }
+    if (stat.types.other > 0) {
+      add_type(stat.types.other, "<other>");
+    }
+
+    PyObject* deopts = check(PyDict_GetItemString(report, "deopts"));
+    check(PyList_Append(deopts, deopt));
+  }
+}
+
+// Add the inline cache stats of one kind of cache in code to offsets.
+void add_inline_cache_reports(
+    PyObject* offsets,
+    BorrowedRef<PyCodeObject> code,
+    const char* kind,
+    const InlineCacheStats& all_stats) {
+  auto kind_str = Ref<>::steal(check(PyUnicode_InternFromString(kind)));
+  for (const CacheStats& cache_stats : all_stats) {
+    PyObject* report = get_offset_report(offsets, code, cache_stats.bc_offset);
+
+    auto cache = Ref<>::steal(check(PyDict_New()));
+    auto cached_types =
+        Ref<>::steal(check(PyLong_FromLong(cache_stats.cached_types)));
+    auto misses = Ref<>::steal(check(PyDict_New()));
+    check(PyDict_SetItemString(cache, "kind", kind_str));
+    check(PyDict_SetItemString(cache, "cached_types", cached_types));
+    check(PyDict_SetItemString(cache, "cache_misses", misses));
+    for (auto& [key, miss] : cache_stats.misses) {
+      auto miss_dict = Ref<>::steal(check(PyDict_New()));
+      auto count = Ref<>::steal(check(PyLong_FromLong(miss.count)));
+      auto reason = Ref<>::steal(check(PyUnicode_InternFromString(
+          std::string(cacheMissReason(miss.reason)).c_str())));
+      check(PyDict_SetItem(miss_dict, s_str_count, count));
+      check(PyDict_SetItem(miss_dict, s_str_reason, reason));
+      check(PyDict_SetItemString(misses, key.c_str(), miss_dict));
+    }
+
+    PyObject* caches = check(PyDict_GetItemString(report, "inline_caches"));
+    check(PyList_Append(caches, cache));
+  }
+}
+
 } // namespace
 
 static PyObject* get_and_clear_runtime_stats(PyObject* /* self */, PyObject*) {
@@ -1190,6 +1995,12 @@ static PyObject* get_and_clear_runtime_stats(PyObject* /* self */, PyObject*) {
   try {
     Ref<> deopt_stats = make_deopt_stats();
     check(PyDict_SetItemString(stats, "deopt", deopt_stats));
+    Ref<> auto_jit = make_auto_jit_stats();
+    check(PyDict_SetItemString(stats, "auto_jit", auto_jit));
+    Ref<> recompile = make_recompile_stats();
+    check(PyDict_SetItemString(stats, "recompile", recompile));
+    Ref<> active_code = make_active_code_stats();
+    check(PyDict_SetItemString(stats, "active_code", active_code));
   } catch (const CAPIError&) {
     return nullptr;
   }
@@ -1197,8 +2008,55 @@ static PyObject* get_and_clear_runtime_stats(PyObject* /* self */, PyObject*) {
   return stats.release();
 }
 
+static PyObject* get_code_report(PyObject* /* self */, PyObject* func) {
+  if (!PyFunction_Check(func)) {
+    PyErr_SetString(PyExc_TypeError, "arg 1 must be a function");
+    return nullptr;
+  }
+  BorrowedRef<PyCodeObject> code = reinterpret_cast<PyCodeObject*>(
+      reinterpret_cast<PyFunctionObject*>(func)->func_code);
+
+  int compiled =
+      jit_ctx == nullptr ? 0 : _PyJITContext_DidCompile(jit_ctx, func);
+  if (compiled < 0) {
+    return nullptr;
+  }
+
+  auto report = Ref<>::steal(PyDict_New());
+  if (report == nullptr) {
+    return nullptr;
+  }
+
+  try {
+    auto offsets = Ref<>::steal(check(PyDict_New()));
+    int64_t samples_raw = add_sample_reports(offsets, code);
+    add_deopt_reports(offsets, code);
+    Runtime* runtime = Runtime::get();
+    add_inline_cache_reports(
+        offsets, code, "load_method", runtime->getLoadMethodCacheStats(code));
+    add_inline_cache_reports(
+        offsets,
+        code,
+        "load_type_method",
+        runtime->getLoadTypeMethodCacheStats(code));
+
+    auto samples = Ref<>::steal(check(PyLong_FromLongLong(samples_raw)));
+    check(PyDict_SetItemString(
+        report, "compiled", compiled ? Py_True : Py_False));
+    check(PyDict_SetItemString(report, "samples", samples));
+    check(PyDict_SetItemString(report, "offsets", offsets));
+  } catch (const CAPIError&) {
+    return nullptr;
+  }
+
+  return report.release();
+}
+
 static PyObject* clear_runtime_stats(PyObject* /* self */, PyObject*) {
   Runtime::get()->clearDeoptStats();
+  auto_jit_stats = {};
+  jit_recompile_events.clear();
+  active_code_stats = {};
   Py_RETURN_NONE;
 }
 
@@ -1491,6 +2349,13 @@ static PyMethodDef jit_methods[] = {
      clear_runtime_stats,
      METH_NOARGS,
      "Clears runtime stats about JIT-compiled code without returning a value."},
+    {"get_code_report",
+     get_code_report,
+     METH_O,
+     "Return what the runtime knows about the performance of a function, by "
+     "bytecode offset: interpreter profiling samples, deopts and inline cache "
+     "misses. Samples need type profiling enabled and inline cache data needs "
+     "X flag jit-enable-inline-cache-stats-collection. Nothing is cleared."},
     {"get_and_clear_inline_cache_stats",
      get_and_clear_inline_cache_stats,
      METH_NOARGS,
@@ -1527,6 +2392,32 @@ static PyMethodDef jit_methods[] = {
      is_multithreaded_compile_test_enabled,
      METH_NOARGS,
      "Return True if multithreaded_compile_test mode is enabled"},
+    {"precompile_from_profile",
+     (PyCFunction)(void*)precompile_from_profile,
+     METH_VARARGS | METH_KEYWORDS,
+     "precompile_from_profile(path, workers=N) -> dict\n\n"
+     "Load the profile data at path, in addition to any already loaded, and "
+     "compile every live function it covers, using N worker threads "
+     "(compiling inline if N is 0). Intended to be called before forking "
+     "workers. Returns counts and timings."},
+    {"compile_auto_jit_queue",
+     compile_auto_jit_queue,
+     METH_NOARGS,
+     "Compile the functions queued by auto-JIT (with jit-auto-queue-size) "
+     "now, e.g. before forking, and return how many were compiled."},
+    {"set_auto_jit_thresholds",
+     (PyCFunction)(void*)set_auto_jit_thresholds,
+     METH_VARARGS | METH_KEYWORDS,
+     "set_auto_jit_thresholds(calls, backedges=0)\n\n"
+     "Change the number of calls or loop iterations after which auto-JIT "
+     "compiles a function. A backedge threshold of 0 doesn't count loop "
+     "iterations."},
+    {"write_profile",
+     write_profile,
+     METH_O,
+     "write_profile(path)\n\n"
+     "Write the interpreter type profiles recorded so far to path, in the "
+     "format read by -X jit-read-profile, without clearing them."},
     {"get_batch_compilation_time_ms",
      get_batch_compilation_time_ms,
      METH_NOARGS,
@@ -1934,6 +2825,9 @@ int _PyJIT_Initialize() {
   CodeAllocator::makeGlobalCodeAllocator();
 
   jit_ctx = new _PyJITContext();
+  if (jit_config.recompile_threshold > 0) {
+    Runtime::get()->setGuardFailureCallback(recompile_on_guard_failures);
+  }
 
   PyObject* mod = PyModule_Create(&jit_module);
   if (mod == nullptr) {
@@ -1993,6 +2887,22 @@ int _PyJIT_IsAutoJITEnabled() {
   return _PyJIT_AutoJITThreshold() > 0;
 }
 
+unsigned int _PyJIT_AutoJITBackedgeThresholdValue = 0;
+
+int _PyJIT_AutoJITEnqueue(PyFunctionObject* func) {
+  if (jit_config.auto_jit_queue_size == 0 || !_PyJIT_IsEnabled() ||
+      !_PyJIT_OnJitList(func)) {
+    return 0;
+  }
+  if (jit_auto_queue.emplace(reinterpret_cast<PyObject*>(func)).second) {
+    auto_jit_stats.queued++;
+  }
+  if (jit_auto_queue.size() >= jit_config.auto_jit_queue_size) {
+    drain_auto_jit_queue();
+  }
+  return 1;
+}
+
 void _PyJIT_EnableHIRInliner() {
   jit_config.hir_inliner_enabled = 1;
 }
@@ -2005,6 +2915,10 @@ int _PyJIT_IsHIRInlinerEnabled() {
   return jit_config.hir_inliner_enabled;
 }
 
+int _PyJIT_CountCompiledCalls() {
+  return jit_config.active_code_budget > 0;
+}
+
 int _PyJIT_MultipleCodeSectionsEnabled() {
   return jit_config.multiple_code_sections;
 }
@@ -2055,13 +2969,20 @@ _PyJIT_Result _PyJIT_CompileFunction(PyFunctionObject* func) {
     return _PyJITContext_CompilePreloader(jit_ctx, *(it->second));
   }
 
-  if (!_PyJIT_OnJitList(func)) {
+  if (!_PyJIT_OnJitList(func) || jit_deactivated_codes.count(func->func_code)) {
     return PYJIT_RESULT_CANNOT_SPECIALIZE;
   }
 
-  CompilationTimer timer(func);
-  jit_reg_units.erase(reinterpret_cast<PyObject*>(func));
-  return _PyJITContext_CompileFunction(jit_ctx, func);
+  _PyJIT_Result result;
+  {
+    CompilationTimer timer(func);
+    jit_reg_units.erase(reinterpret_cast<PyObject*>(func));
+    result = _PyJITContext_CompileFunction(jit_ctx, func);
+  }
+  if (result == PYJIT_RESULT_OK) {
+    enforce_active_code_budget();
+  }
+  return result;
 }
 
 // Recursively search the given co_consts tuple for any code objects that are
@@ -2223,6 +3144,7 @@ void _PyJIT_FuncDestroyed(PyFunctionObject* func) {
   if (_PyJIT_IsEnabled()) {
     auto func_obj = reinterpret_cast<PyObject*>(func);
     jit_reg_units.erase(func_obj);
+    jit_auto_queue.erase(func_obj);
     if (handle_unit_deleted_during_preload != nullptr) {
       handle_unit_deleted_during_preload(func_obj);
     }
@@ -2244,6 +3166,17 @@ void _PyJIT_CodeDestroyed(PyCodeObject* code) {
     auto code_obj = reinterpret_cast<PyObject*>(code);
     jit_reg_units.erase(code_obj);
     jit_code_data.erase(code);
+    auto recompile_state = jit_recompile_states.find(code);
+    if (recompile_state != jit_recompile_states.end()) {
+      reset_failed_guards(recompile_state->second);
+      jit_recompile_states.erase(recompile_state);
+    }
+    jit_code_last_call.erase(code);
+    jit_deactivated_codes.erase(code);
+    Runtime* runtime = Runtime::getUnchecked();
+    if (g_collect_inline_cache_stats && runtime != nullptr) {
+      runtime->forgetCacheStatsCode(code);
+    }
     if (handle_unit_deleted_during_preload != nullptr) {
       handle_unit_deleted_during_preload(code_obj);
     }
@@ -2310,6 +3243,13 @@ int _PyJIT_Finalize() {
     // Clear some global maps that reference Python data.
     jit_code_data.clear();
     jit_reg_units.clear();
+    jit_auto_queue.clear();
+    jit_recompile_states.clear();
+    jit_recompile_events.clear();
+    jit_code_last_call.clear();
+    jit_deactivated_codes.clear();
+    active_code_stats = {};
+    Runtime::get()->clearGuardFailureCallback();
     JIT_CHECK(
         jit_preloaders.empty(),
         "JIT cannot be finalized while multithreaded compilation is active");
@@ -2829,6 +3769,21 @@ void _PyJIT_ClearTypeProfiles() {
   jit::Runtime::get()->typeProfiles().clear();
 }
 
+int _PyJIT_WriteTypeProfiles(const char* path) {
+  std::string tmp_path = fmt::format("{}.tmp.{}", path, getpid());
+  if (!writeProfileData(tmp_path)) {
+    std::remove(tmp_path.c_str());
+    PyErr_Format(PyExc_OSError, "Failed to write profile data to %s", path);
+    return -1;
+  }
+  if (std::rename(tmp_path.c_str(), path) != 0) {
+    PyErr_SetFromErrnoWithFilename(PyExc_OSError, path);
+    std::remove(tmp_path.c_str());
+    return -1;
+  }
+  return 0;
+}
+
 PyFrameObject* _PyJIT_GetFrame(PyThreadState* tstate) {
   if (_PyJIT_IsInitialized()) {
     return jit::materializeShadowCallStack(tstate);
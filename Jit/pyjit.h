@@ -94,6 +94,23 @@ PyAPI_FUNC(int) _PyJIT_IsAutoJITEnabled(void);
  */
 PyAPI_FUNC(unsigned int) _PyJIT_AutoJITThreshold(void);
 
+/*
+ * The number of loop backedges after which auto-JIT considers a function hot,
+ * or 0 if backedges aren't counted towards hotness. Only checked when the
+ * function is next called. Set with the JIT config; a variable rather than a
+ * function because the interpreter tests it on every backward jump.
+ */
+PyAPI_DATA(unsigned int) _PyJIT_AutoJITBackedgeThresholdValue;
+
+/*
+ * Queue a hot function for batch compilation by auto-JIT. Returns 1 if the
+ * function was queued, or 0 if auto-JIT compiles functions as soon as they
+ * become hot, in which case the caller should compile it immediately.
+ *
+ * Compiles the queue if it is full.
+ */
+PyAPI_FUNC(int) _PyJIT_AutoJITEnqueue(PyFunctionObject* func);
+
 /*
    Enable the HIR inliner.
  */
@@ -109,6 +126,12 @@ PyAPI_FUNC(void) _PyJIT_DisableHIRInliner(void);
  */
 PyAPI_FUNC(int) _PyJIT_IsHIRInlinerEnabled(void);
 
+/*
+ * Returns 1 if compiled code counts how many times it is entered, for
+ * jit-active-code-budget, and 0 otherwise.
+ */
+PyAPI_FUNC(int) _PyJIT_CountCompiledCalls(void);
+
 /*
  * Returns 1 if the JIT will split code emission across multiple sections and 0
  * otherwise.
@@ -467,6 +490,15 @@ PyAPI_FUNC(void)
 PyAPI_FUNC(PyObject*) _PyJIT_GetAndClearTypeProfiles(void);
 PyAPI_FUNC(void) _PyJIT_ClearTypeProfiles(void);
 
+/*
+ * Write the type profiles recorded so far to path, in the format described in
+ * Jit/profile_data_format.txt, without clearing them. The file is replaced
+ * atomically, so readers never see a partial profile.
+ *
+ * Returns 0 on success, or -1 with an exception set.
+ */
+PyAPI_FUNC(int) _PyJIT_WriteTypeProfiles(const char* path);
+
 /*
  * Notify the JIT that type has been modified.
  */
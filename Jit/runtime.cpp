@@ -279,6 +279,7 @@ InlineCacheStats Runtime::getAndClearLoadMethodCacheStats() {
       continue;
     }
     stats.push_back(*cache.cacheStats());
+    stats.back().cached_types = cache.numCachedTypes();
     cache.clearCacheStats();
   }
   return stats;
@@ -293,11 +294,49 @@ InlineCacheStats Runtime::getAndClearLoadTypeMethodCacheStats() {
       continue;
     }
     stats.push_back(*cache.cacheStats());
+    stats.back().cached_types = cache.type != nullptr;
     cache.clearCacheStats();
   }
   return stats;
 }
 
+InlineCacheStats Runtime::getLoadMethodCacheStats(
+    BorrowedRef<PyCodeObject> code) {
+  InlineCacheStats stats;
+  for (auto& cache : load_method_caches_) {
+    const CacheStats* cache_stats = cache.cacheStats();
+    if (cache_stats == nullptr || cache_stats->code != code) {
+      continue;
+    }
+    stats.push_back(*cache_stats);
+    stats.back().cached_types = cache.numCachedTypes();
+  }
+  return stats;
+}
+
+InlineCacheStats Runtime::getLoadTypeMethodCacheStats(
+    BorrowedRef<PyCodeObject> code) {
+  InlineCacheStats stats;
+  for (auto& cache : load_type_method_caches_) {
+    const CacheStats* cache_stats = cache.cacheStats();
+    if (cache_stats == nullptr || cache_stats->code != code) {
+      continue;
+    }
+    stats.push_back(*cache_stats);
+    stats.back().cached_types = cache.type != nullptr;
+  }
+  return stats;
+}
+
+void Runtime::forgetCacheStatsCode(BorrowedRef<PyCodeObject> code) {
+  for (auto& cache : load_method_caches_) {
+    cache.forgetCode(code);
+  }
+  for (auto& cache : load_type_method_caches_) {
+    cache.forgetCode(code);
+  }
+}
+
 TypeProfiles& Runtime::typeProfiles() {
   return type_profiles_;
 }
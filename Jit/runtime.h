@@ -22,6 +22,7 @@
 #include <string_view>
 #include <unordered_map>
 #include <unordered_set>
+#include <utility>
 #include <vector>
 
 namespace jit {
@@ -238,6 +239,17 @@ class alignas(16) CodeRuntime {
     return &debug_info_;
   }
 
+  // The counter the compiled code increments each time it is entered, when
+  // _PyJIT_CountCompiledCalls() is true.
+  uint64_t* callCountAddr() {
+    return &call_count_;
+  }
+
+  // Return the number of calls counted since the last time this was called.
+  uint64_t takeCallCount() {
+    return std::exchange(call_count_, 0);
+  }
+
   static constexpr int64_t frameStateOffset() {
 #pragma GCC diagnostic push
 #pragma GCC diagnostic ignored "-Winvalid-offsetof"
@@ -259,6 +271,8 @@ class alignas(16) CodeRuntime {
 
   int frame_size_{-1};
 
+  uint64_t call_count_{0};
+
   DebugInfo debug_info_;
 };
 
@@ -373,6 +387,15 @@ class Runtime {
   InlineCacheStats getAndClearLoadMethodCacheStats();
   InlineCacheStats getAndClearLoadTypeMethodCacheStats();
 
+  // Get the inline cache stats for instructions in code, without clearing
+  // them.
+  InlineCacheStats getLoadMethodCacheStats(BorrowedRef<PyCodeObject> code);
+  InlineCacheStats getLoadTypeMethodCacheStats(BorrowedRef<PyCodeObject> code);
+
+  // Drop references to code, which is being destroyed, from the inline cache
+  // stats, so a new code object at the same address isn't attributed them.
+  void forgetCacheStatsCode(BorrowedRef<PyCodeObject> code);
+
   TypeProfiles& typeProfiles();
 
   using GuardFailureCallback = std::function<void(const DeoptMetadata&)>;
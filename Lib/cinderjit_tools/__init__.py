@@ -0,0 +1,7 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""Pure-Python tools for working with the Cinder JIT and its profiles.
+
+`cinderjit` itself is a built-in extension module, so helpers written in
+Python live here instead.
+"""
@@ -0,0 +1,274 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""Generate a JIT list from sampled interpreter type profiles.
+
+    python -m cinderjit_tools.autolist [options] PROFILE.json [PROFILE.json ...]
+
+Each input is a JSON dump of `cinder.get_and_clear_type_profiles()` (or of
+`cinder.get_and_clear_type_profiles_with_metadata()`), collected with
+`-X jit-profile-interp`. Functions are ranked by their sampled bytecode
+counts and emitted, hottest first, as `qualname@file:line` entries, which
+both `-X jit-list-file` and `cinderjit.jit_list_append` accept.
+
+Selection stops at the first function below `min_hits`, or once the selected
+functions cover `coverage` of all samples. With a `size_budget`, functions
+whose estimated compiled size doesn't fit in what's left of the budget are
+skipped, so the code cache goes to the functions that matter most.
+
+To generate a list in a running process, where the sizes of already-compiled
+functions are known exactly:
+
+    hits = aggregate_hits(cinder.get_and_clear_type_profiles())
+    entries = select_functions(hits, size_budget=..., size_of=SizeEstimator())
+    print(format_jit_list(entries))
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+from types import CodeType, FunctionType
+from typing import (
+    Callable,
+    Dict,
+    final,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+try:
+    import cinderjit
+except ImportError:
+    cinderjit = None
+
+# Rough size of JIT-compiled code per byte of bytecode, used to estimate the
+# size of functions when no compiled functions are available to measure.
+DEFAULT_BYTES_PER_BYTECODE = 40
+
+# Estimated size of a function whose code object can't be found.
+DEFAULT_FUNCTION_SIZE = 4096
+
+# (filename, firstlineno, qualname)
+CodeLocation = Tuple[str, int, str]
+
+
+class FunctionHits(NamedTuple):
+    filename: str
+    firstlineno: int
+    qualname: str
+    code_hash: int
+    hits: int
+
+    @property
+    def location(self) -> CodeLocation:
+        return (self.filename, self.firstlineno, self.qualname)
+
+    @property
+    def jit_list_entry(self) -> str:
+        filename = os.path.basename(self.filename)
+        return f"{self.qualname}@{filename}:{self.firstlineno}"
+
+
+def aggregate_hits(
+    profiles: Iterable[Mapping[str, Mapping[str, object]]]
+) -> List[FunctionHits]:
+    """Sum the sampled counts of each code object in the output of
+    `cinder.get_and_clear_type_profiles()`, hottest first."""
+    totals: Dict[Tuple[str, int, str, int], int] = {}
+    for item in profiles:
+        normal = item["normal"]
+        ints = item["int"]
+        key = (
+            str(normal["filename"]),
+            int(ints["firstlineno"]),
+            str(normal["func_qualname"]),
+            int(ints["code_hash"]),
+        )
+        totals[key] = totals.get(key, 0) + int(ints["count"])
+    ranked = [FunctionHits(*key, hits) for key, hits in totals.items()]
+    ranked.sort(key=lambda f: (-f.hits, f.filename, f.firstlineno, f.qualname))
+    return ranked
+
+
+def select_functions(
+    ranked: Sequence[FunctionHits],
+    min_hits: int = 1,
+    coverage: float = 1.0,
+    size_budget: Optional[int] = None,
+    size_of: Optional[Callable[[FunctionHits], int]] = None,
+) -> List[FunctionHits]:
+    """Pick the functions to JIT from `ranked` (as returned by
+    `aggregate_hits`), honoring the hotness thresholds and, if given, the
+    compiled size budget in bytes."""
+    if size_budget is not None and size_of is None:
+        size_of = SizeEstimator()
+    total = sum(f.hits for f in ranked)
+    selected = []
+    covered = 0
+    remaining = size_budget
+    for func in ranked:
+        if func.hits < min_hits or (total and covered >= coverage * total):
+            break
+        if remaining is not None:
+            assert size_of is not None
+            size = size_of(func)
+            if size > remaining:
+                continue
+            remaining -= size
+        selected.append(func)
+        covered += func.hits
+    return selected
+
+
+def format_jit_list(entries: Iterable[FunctionHits]) -> str:
+    lines = ["# Generated by cinderjit_tools.autolist, hottest first"]
+    lines.extend(entry.jit_list_entry for entry in entries)
+    return "\n".join(lines) + "\n"
+
+
+def _nested_codes(code: CodeType) -> Iterable[CodeType]:
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield const
+            yield from _nested_codes(const)
+
+
+@final
+class SizeEstimator:
+    """Estimate the compiled size of profiled functions.
+
+    Functions that are JIT-compiled in this process are measured with
+    `cinderjit.get_compiled_size`. Others are estimated from the length of
+    their bytecode, scaled by the average size of the compiled functions, with
+    code objects found among live functions or by compiling their source."""
+
+    def __init__(self, bytes_per_bytecode: Optional[float] = None) -> None:
+        self.functions: Dict[CodeLocation, FunctionType] = {}
+        compiled_size = bytecode_size = 0
+        for obj in gc.get_objects():
+            if not isinstance(obj, FunctionType):
+                continue
+            code = obj.__code__
+            location = (code.co_filename, code.co_firstlineno, obj.__qualname__)
+            self.functions[location] = obj
+            size = self.compiled_size(obj)
+            if size:
+                compiled_size += size
+                bytecode_size += len(code.co_code)
+        if bytes_per_bytecode is None:
+            bytes_per_bytecode = (
+                compiled_size / bytecode_size
+                if bytecode_size
+                else DEFAULT_BYTES_PER_BYTECODE
+            )
+        self.bytes_per_bytecode: float = bytes_per_bytecode
+        self._source_codes: Dict[str, Dict[Tuple[int, str], CodeType]] = {}
+
+    @staticmethod
+    def compiled_size(func: FunctionType) -> int:
+        if cinderjit is None or not cinderjit.is_jit_compiled(func):
+            return 0
+        return cinderjit.get_compiled_size(func)
+
+    def _code_from_source(self, location: CodeLocation) -> Optional[CodeType]:
+        filename, firstlineno, qualname = location
+        codes = self._source_codes.get(filename)
+        if codes is None:
+            codes = {}
+            try:
+                with open(filename, "rb") as f:
+                    module = compile(f.read(), filename, "exec", dont_inherit=True)
+            except (OSError, SyntaxError, ValueError):
+                pass
+            else:
+                for code in _nested_codes(module):
+                    codes[(code.co_firstlineno, code.co_name)] = code
+            self._source_codes[filename] = codes
+        return codes.get((firstlineno, qualname.rpartition(".")[2]))
+
+    def __call__(self, func: FunctionHits) -> int:
+        live = self.functions.get(func.location)
+        if live is not None:
+            size = self.compiled_size(live)
+            if size:
+                return size
+            code = live.__code__
+        else:
+            code = self._code_from_source(func.location)
+        if code is None:
+            return DEFAULT_FUNCTION_SIZE
+        return int(len(code.co_code) * self.bytes_per_bytecode)
+
+
+def load_profiles(paths: Iterable[str]) -> List[Mapping[str, Mapping[str, object]]]:
+    profiles = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data["profile"]
+        profiles.extend(data)
+    return profiles
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cinderjit_tools.autolist",
+        description="Generate a JIT list from interpreter type profiles",
+    )
+    parser.add_argument(
+        "profiles",
+        nargs="+",
+        help="JSON dumps of cinder.get_and_clear_type_profiles()",
+    )
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    parser.add_argument(
+        "--min-hits",
+        type=int,
+        default=1,
+        help="skip functions with fewer sampled bytecodes than this",
+    )
+    parser.add_argument(
+        "--coverage",
+        type=float,
+        default=1.0,
+        help="stop once the selected functions cover this fraction of samples",
+    )
+    parser.add_argument(
+        "--size-budget",
+        type=int,
+        help="maximum total estimated compiled size, in bytes",
+    )
+    parser.add_argument(
+        "--bytes-per-bytecode",
+        type=float,
+        help="compiled bytes per byte of bytecode, for size estimates",
+    )
+    args = parser.parse_args(argv)
+
+    ranked = aggregate_hits(load_profiles(args.profiles))
+    size_of = None
+    if args.size_budget is not None:
+        size_of = SizeEstimator(args.bytes_per_bytecode)
+    selected = select_functions(
+        ranked, args.min_hits, args.coverage, args.size_budget, size_of
+    )
+    jit_list = format_jit_list(selected)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(jit_list)
+    else:
+        sys.stdout.write(jit_list)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""Read, inspect, merge and write Cinder JIT profile files.
+
+    python -m cinderjit_tools.profile_tools show PROFILE
+    python -m cinderjit_tools.profile_tools diff OLD NEW
+    python -m cinderjit_tools.profile_tools merge -o OUT [options] PROFILE ...
+
+Profile files are written by `-X jit-write-profile`, `cinder.dump_type_profiles`
+or `cinderjit.write_profile`, and read by `-X jit-read-profile`. Their binary
+format is described in Jit/profile_data_format.txt.
+
+The format records, for each instruction, the operand types the interpreter
+saw, most frequent first, but not how often it saw them. Merging snapshots
+therefore counts the snapshots that saw each list of types: lists seen by more
+snapshots come first, and are the ones the JIT specializes for. Each input
+can be given a weight (e.g. the share of traffic its host served), in which
+case lists are ranked by the total weight of the inputs that saw them, and
+code keys seen by inputs with less than `min_weight` in total are dropped as
+cold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import struct
+import sys
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+MAGIC = 0x7265646E6963
+
+# The Python version a profile is for, as bits 16-31 of sys.hexversion.
+PYTHON_VERSION: int = sys.hexversion >> 16
+
+# Types of each operand of an instruction, as seen together by the
+# interpreter.
+TypeProfile = Tuple[str, ...]
+
+# Code key -> bytecode offset -> type profiles, most frequent first.
+CodeProfiles = Dict[str, Dict[int, List[TypeProfile]]]
+
+# Type name -> keys of the split dicts of its instances.
+DictKeys = Dict[str, List[str]]
+
+
+class ProfileError(Exception):
+    pass
+
+
+class Profile:
+    """The profile data for one Python version."""
+
+    def __init__(
+        self, codes: Optional[CodeProfiles] = None, dict_keys: Optional[DictKeys] = None
+    ) -> None:
+        self.codes: CodeProfiles = {} if codes is None else codes
+        self.dict_keys: DictKeys = {} if dict_keys is None else dict_keys
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Profile)
+            and self.codes == other.codes
+            and self.dict_keys == other.dict_keys
+        )
+
+    def __repr__(self) -> str:
+        return f"Profile(codes={self.codes!r}, dict_keys={self.dict_keys!r})"
+
+
+# Python version -> profile. Profiles in versions 1-3 of the format don't
+# record a Python version, and are keyed by None.
+ProfileFile = Dict[Optional[int], Profile]
+
+
+class CodeKey(NamedTuple):
+    filename: str
+    firstlineno: int
+    qualname: str
+    code_hash: int
+
+    @classmethod
+    def parse(cls, code_key: str) -> CodeKey:
+        """Split a code key, as built by jit::codeKey()."""
+        try:
+            filename, firstlineno, qualname, code_hash = code_key.rsplit(":", 3)
+            return cls(filename, int(firstlineno), qualname, int(code_hash))
+        except ValueError:
+            raise ProfileError(f"malformed code key {code_key!r}") from None
+
+    def __str__(self) -> str:
+        return f"{self.filename}:{self.firstlineno}:{self.qualname}:{self.code_hash}"
+
+
+class ProfileRecord(NamedTuple):
+    python_version: Optional[int]
+    code_key: CodeKey
+    bc_offset: int
+    types: List[TypeProfile]
+
+
+class ProfileChange(NamedTuple):
+    code_key: str
+    bc_offset: int
+    # Empty when the instruction has no profile on that side.
+    old: List[TypeProfile]
+    new: List[TypeProfile]
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def read(self, fmt: str) -> int:
+        size = struct.calcsize(fmt)
+        if self.pos + size > len(self.data):
+            raise ProfileError("truncated profile data")
+        (value,) = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += size
+        return value
+
+    def read_str(self) -> str:
+        size = self.read("<H")
+        if self.pos + size > len(self.data):
+            raise ProfileError("truncated profile data")
+        value = self.data[self.pos : self.pos + size].decode()
+        self.pos += size
+        return value
+
+    def read_codes(self, version: int) -> CodeProfiles:
+        codes: CodeProfiles = {}
+        for _ in range(self.read("<I")):
+            code_key = self.read_str()
+            locations = codes.setdefault(code_key, {})
+            for _ in range(self.read("<H")):
+                bc_offset = self.read("<H")
+                num_profiles = 1 if version == 1 else self.read("<B")
+                profiles = locations.setdefault(bc_offset, [])
+                for _ in range(num_profiles):
+                    num_types = self.read("<B")
+                    profiles.append(tuple(self.read_str() for _ in range(num_types)))
+        return codes
+
+    def read_dict_keys(self) -> DictKeys:
+        dict_keys: DictKeys = {}
+        for _ in range(self.read("<I")):
+            type_name = self.read_str()
+            keys = dict_keys.setdefault(type_name, [])
+            keys.extend(self.read_str() for _ in range(self.read("<H")))
+        return dict_keys
+
+
+def load_profile(data: bytes) -> ProfileFile:
+    reader = _Reader(data)
+    if reader.read("<Q") != MAGIC:
+        raise ProfileError("bad magic value in profile data")
+    version = reader.read("<I")
+    if version in (1, 2):
+        return {None: Profile(reader.read_codes(version))}
+    elif version == 3:
+        codes = reader.read_codes(version)
+        return {None: Profile(codes, reader.read_dict_keys())}
+    elif version == 4:
+        offsets = [
+            (reader.read("<H"), reader.read("<I")) for _ in range(reader.read("<B"))
+        ]
+        result: ProfileFile = {}
+        for py_version, offset in offsets:
+            reader.pos = offset
+            codes = reader.read_codes(version)
+            result[py_version] = Profile(codes, reader.read_dict_keys())
+        return result
+    raise ProfileError(f"unknown profile data version {version}")
+
+
+def read_profile(path: str) -> ProfileFile:
+    with open(path, "rb") as f:
+        return load_profile(f.read())
+
+
+def iter_records(profiles: ProfileFile) -> Iterator[ProfileRecord]:
+    for py_version, profile in profiles.items():
+        for code_key, locations in profile.codes.items():
+            parsed_key = CodeKey.parse(code_key)
+            for bc_offset, types in locations.items():
+                yield ProfileRecord(py_version, parsed_key, bc_offset, types)
+
+
+def _write_str(out: BinaryIO, value: str) -> None:
+    data = value.encode()
+    out.write(struct.pack("<H", len(data)))
+    out.write(data)
+
+
+def _write_body(out: BinaryIO, profile: Profile) -> None:
+    out.write(struct.pack("<I", len(profile.codes)))
+    for code_key, locations in profile.codes.items():
+        _write_str(out, code_key)
+        out.write(struct.pack("<H", len(locations)))
+        for bc_offset, profiles in locations.items():
+            out.write(struct.pack("<HB", bc_offset, len(profiles)))
+            for types in profiles:
+                out.write(struct.pack("<B", len(types)))
+                for type_name in types:
+                    _write_str(out, type_name)
+    out.write(struct.pack("<I", len(profile.dict_keys)))
+    for type_name, keys in profile.dict_keys.items():
+        _write_str(out, type_name)
+        out.write(struct.pack("<H", len(keys)))
+        for key in keys:
+            _write_str(out, key)
+
+
+def dump_profile(profiles: ProfileFile) -> bytes:
+    """Serialize `profiles` in version 4 of the format. Profiles without a
+    Python version are written for this one."""
+    bodies = []
+    for py_version, profile in profiles.items():
+        body = io.BytesIO()
+        _write_body(body, profile)
+        bodies.append(
+            (PYTHON_VERSION if py_version is None else py_version, body.getvalue())
+        )
+
+    header = struct.pack("<QIB", MAGIC, 4, len(bodies))
+    offset = len(header) + len(bodies) * struct.calcsize("<HI")
+    out = io.BytesIO()
+    out.write(header)
+    for py_version, body in bodies:
+        out.write(struct.pack("<HI", py_version, offset))
+        offset += len(body)
+    for _, body in bodies:
+        out.write(body)
+    return out.getvalue()
+
+
+def write_profile(path: str, profiles: ProfileFile) -> None:
+    with open(path, "wb") as f:
+        f.write(dump_profile(profiles))
+
+
+def _check_weights(num_inputs: int, weights: Optional[Sequence[float]]) -> None:
+    if weights is not None and len(weights) != num_inputs:
+        raise ValueError(f"got {len(weights)} weights for {num_inputs} profiles")
+
+
+def merge_profiles(
+    profiles: Iterable[Profile],
+    weights: Optional[Sequence[float]] = None,
+    min_weight: float = 0,
+) -> Profile:
+    """Merge profiles of the same Python version. At each instruction, the
+    type profiles seen by more of the inputs, or by inputs with more weight,
+    come first. Code keys seen by inputs with less than `min_weight` in total
+    are dropped. Raises ValueError if `weights` isn't one per input."""
+    profiles = list(profiles)
+    _check_weights(len(profiles), weights)
+    type_weights: Dict[str, Dict[int, Dict[TypeProfile, float]]] = {}
+    code_weights: Dict[str, float] = {}
+    dict_keys: DictKeys = {}
+    for i, profile in enumerate(profiles):
+        weight = 1 if weights is None else weights[i]
+        for code_key, locations in profile.codes.items():
+            code_weights[code_key] = code_weights.get(code_key, 0) + weight
+            code_types = type_weights.setdefault(code_key, {})
+            for bc_offset, type_profiles in locations.items():
+                offset_types = code_types.setdefault(bc_offset, {})
+                for types in type_profiles:
+                    offset_types[types] = offset_types.get(types, 0) + weight
+        for type_name, keys in profile.dict_keys.items():
+            merged_keys = dict_keys.setdefault(type_name, [])
+            merged_keys.extend(key for key in keys if key not in merged_keys)
+
+    codes: CodeProfiles = {}
+    for code_key, code_types in type_weights.items():
+        if code_weights[code_key] < min_weight:
+            continue
+        codes[code_key] = {
+            # sorted() is stable, so ties keep the order of the inputs.
+            bc_offset: sorted(offset_types, key=lambda t: -offset_types[t])
+            for bc_offset, offset_types in code_types.items()
+        }
+    return Profile(codes, dict_keys)
+
+
+def merge_profile_files(
+    files: Iterable[ProfileFile],
+    weights: Optional[Sequence[float]] = None,
+    min_weight: float = 0,
+) -> ProfileFile:
+    """Merge the profiles for each Python version in `files`, as
+    merge_profiles() does."""
+    files = list(files)
+    _check_weights(len(files), weights)
+    by_version: Dict[Optional[int], Tuple[List[Profile], List[float]]] = {}
+    for i, profile_file in enumerate(files):
+        for py_version, profile in profile_file.items():
+            version_profiles, version_weights = by_version.setdefault(
+                py_version, ([], [])
+            )
+            version_profiles.append(profile)
+            version_weights.append(1 if weights is None else weights[i])
+    return {
+        py_version: merge_profiles(profiles, version_weights, min_weight)
+        for py_version, (profiles, version_weights) in by_version.items()
+    }
+
+
+def diff_profiles(old: Profile, new: Profile) -> List[ProfileChange]:
+    """Return the instructions whose type profiles differ between `old` and
+    `new`, in the order of their code keys in `old`, then in `new`."""
+    changes = []
+    code_keys = list(old.codes)
+    code_keys.extend(k for k in new.codes if k not in old.codes)
+    for code_key in code_keys:
+        old_locations = old.codes.get(code_key, {})
+        new_locations = new.codes.get(code_key, {})
+        for bc_offset in sorted(old_locations.keys() | new_locations.keys()):
+            old_types = old_locations.get(bc_offset, [])
+            new_types = new_locations.get(bc_offset, [])
+            if old_types != new_types:
+                changes.append(ProfileChange(code_key, bc_offset, old_types, new_types))
+    return changes
+
+
+def format_types(types: List[TypeProfile]) -> str:
+    if not types:
+        return "-"
+    return " | ".join(f"({', '.join(t)})" for t in types)
+
+
+def _format_version(py_version: Optional[int]) -> str:
+    if py_version is None:
+        return "Python version unknown"
+    return f"Python {py_version >> 8}.{py_version & 0xFF}"
+
+
+def _show(args: argparse.Namespace) -> int:
+    profiles = read_profile(args.profile)
+    last_version = -1
+    for record in iter_records(profiles):
+        if record.python_version != last_version:
+            print(f"# {_format_version(record.python_version)}")
+            last_version = record.python_version
+        print(f"{record.code_key} @ {record.bc_offset}: {format_types(record.types)}")
+    for profile in profiles.values():
+        for type_name, keys in profile.dict_keys.items():
+            print(f"# {type_name} dict keys: {', '.join(keys)}")
+    return 0
+
+
+def _diff(args: argparse.Namespace) -> int:
+    old = read_profile(args.old)
+    new = read_profile(args.new)
+    py_versions = list(old)
+    py_versions.extend(v for v in new if v not in old)
+    found = False
+    for py_version in py_versions:
+        changes = diff_profiles(
+            old.get(py_version, Profile()), new.get(py_version, Profile())
+        )
+        if not changes:
+            continue
+        found = True
+        print(f"# {_format_version(py_version)}")
+        for change in changes:
+            print(
+                f"{change.code_key} @ {change.bc_offset}: "
+                f"{format_types(change.old)} -> {format_types(change.new)}"
+            )
+    return 1 if found else 0
+
+
+def _merge(args: argparse.Namespace) -> int:
+    files = [read_profile(path) for path in args.profiles]
+    merged = merge_profile_files(files, args.weight, args.min_weight)
+    write_profile(args.output, merged)
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cinderjit_tools.profile_tools",
+        description="Work with Cinder JIT profile files",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show = subparsers.add_parser("show", help="print the contents of a profile")
+    show.add_argument("profile")
+    show.set_defaults(func=_show)
+
+    diff = subparsers.add_parser(
+        "diff",
+        help="print the instructions whose profiles differ; "
+        "exits with 1 if there are any",
+    )
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.set_defaults(func=_diff)
+
+    merge = subparsers.add_parser("merge", help="merge profiles, e.g. from many hosts")
+    merge.add_argument("profiles", nargs="+", help="profile files to merge")
+    merge.add_argument("-o", "--output", required=True, help="file to write")
+    merge.add_argument(
+        "-w",
+        "--weight",
+        type=float,
+        action="append",
+        help="weight of each profile, in order (default: 1 each)",
+    )
+    merge.add_argument(
+        "--min-weight",
+        type=float,
+        default=0,
+        help="drop code keys seen by profiles with less total weight than this",
+    )
+    merge.set_defaults(func=_merge)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ProfileError, ValueError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""Measure the throughput of the compiler, phase by phase.
+
+    python -m compiler.benchmark [-g GENERATOR] [-c CORPUS] [-n REPEAT] [PATH ...]
+
+Compiles a fixed corpus of source files with each code generator and reports
+the time spent in each compiler phase (parse, AST optimization, declaration
+visit, future statements, symbol table, type binding, code generation, CFG
+optimization, stack depth, flattening and the rest of assembly), and the
+number of memory blocks each phase left allocated. Phases are timed by
+wrapping the methods that implement them; time spent in a nested phase (e.g.
+assembling a nested function while generating code for its parent) is
+attributed only to the innermost phase. Allocations are counted in a
+separate pass, so counting them doesn't skew the timings.
+
+Corpora are the compiler's own test corpus (`testcorpus`), the top-level
+stdlib modules (`stdlib`), the static Python benchmark libraries (`static`)
+and generated pathological modules: a huge dispatch function whose jumps need
+EXTENDED_ARG prefixes (`many_jumps`) and a kernel of deeply nested loops for
+type binding (`nested_loops`). Any other paths given are compiled as well.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import glob
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, final, Iterator, List, Optional, Sequence, Tuple
+
+from . import future, pyassem, pycodegen, symbols
+from .pycodegen import CinderCodeGenerator, CodeGenerator
+from .static import StaticCodeGenerator
+from .static.compiler import Compiler
+from .static.type_binder import TypeBinder
+from .strict import StrictCodeGenerator
+from .strict.feature_extractor import FeatureExtractor
+from .visitor import ASTVisitor
+
+PHASES: Tuple[str, ...] = (
+    "parse",
+    "ast_optimize",
+    "declaration",
+    "futures",
+    "symbols",
+    "feature_extraction",
+    "type_binding",
+    "codegen",
+    "optimize_cfg",
+    "stack_depth",
+    "flatten",
+    "assembly",
+)
+
+GENERATORS: Dict[str, type] = {
+    "cinder": CinderCodeGenerator,
+    "strict": StrictCodeGenerator,
+    "static": StaticCodeGenerator,
+}
+
+_LIB_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORPORA: Dict[str, str] = {
+    "testcorpus": os.path.join(_LIB_DIR, "test", "test_compiler", "testcorpus", "*.py"),
+    "stdlib": os.path.join(_LIB_DIR, "*.py"),
+    "static": os.path.join(
+        os.path.dirname(_LIB_DIR), "Tools", "benchmarks", "*_static_lib.py"
+    ),
+}
+
+
+def many_jumps_source(branches: int = 3000) -> bytes:
+    """A dispatch loop with a long series of branches: thousands of jumps, most
+    of them spanning enough code to need EXTENDED_ARG prefixes, like generated
+    protocol handlers. Each branch continues the loop rather than chaining
+    elifs, which would nest too deeply for the code generator."""
+    lines = ["def dispatch(op, x):", "    while x:"]
+    for i in range(branches):
+        lines.append(f"        if op == {i}:")
+        lines.append(f"            x = x - {i} if x > {i} else x + {i}")
+        lines.append("            continue")
+    lines += ["        break", "    return x", ""]
+    return "\n".join(lines).encode()
+
+
+def nested_loops_source(depth: int = 8) -> bytes:
+    """A numeric kernel with deeply nested loops, whose locals change type in
+    the innermost loop, so type binding has to iterate over every loop more
+    than once to reach a fixed point."""
+    lines = ["def kernel(n: int):", "    total = 0", "    scale = 1"]
+    indent = "    "
+    for level in range(depth):
+        lines.append(f"{indent}for i{level} in range(n):")
+        indent += "    "
+        lines.append(f"{indent}scale = scale + i{level}")
+    lines.append(f"{indent}total = total + scale * 0.5")
+    lines += ["    return total", ""]
+    return "\n".join(lines).encode()
+
+
+# Generated corpora, by name.
+SYNTHETIC_CORPORA: Dict[str, Callable[[], bytes]] = {
+    "many_jumps": many_jumps_source,
+    "nested_loops": nested_loops_source,
+}
+
+
+def _phase_targets() -> List[Tuple[object, str, str]]:
+    # (owner, attribute, phase) for everything that implements a phase.
+    return [
+        (pycodegen, "parse", "parse"),
+        (CodeGenerator, "optimize_tree", "ast_optimize"),
+        (Compiler, "add_module", "ast_optimize"),
+        (Compiler, "declare_module", "declaration"),
+        (future, "find_futures", "futures"),
+        (symbols.SymbolVisitor, "visitModule", "symbols"),
+        (FeatureExtractor, "visitModule", "feature_extraction"),
+        (TypeBinder, "visitModule", "type_binding"),
+        (CodeGenerator, "visitModule", "codegen"),
+        (StaticCodeGenerator, "visitModule", "codegen"),
+        (pyassem.PyFlowGraph, "optimizeCFG", "optimize_cfg"),
+        (pyassem.PyFlowGraph, "computeStackDepth", "stack_depth"),
+        (pyassem.PyFlowGraph, "flattenGraph", "flatten"),
+        (pyassem.PyFlowGraph, "getCode", "assembly"),
+    ]
+
+
+@final
+class PhaseTimer:
+    """Attributes elapsed time, and optionally the change in allocated memory
+    blocks, to the innermost active compiler phase."""
+
+    def __init__(self, count_blocks: bool = False) -> None:
+        self.count_blocks = count_blocks
+        self.times: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.blocks: Dict[str, int] = dict.fromkeys(PHASES, 0)
+        self._stack: List[str] = []
+        self._last_time = 0.0
+        self._last_blocks = 0
+
+    def _charge(self) -> None:
+        now = time.perf_counter()
+        blocks = sys.getallocatedblocks() if self.count_blocks else 0
+        if self._stack:
+            phase = self._stack[-1]
+            self.times[phase] += now - self._last_time
+            self.blocks[phase] += blocks - self._last_blocks
+        self._last_time = now
+        self._last_blocks = blocks
+
+    def enter(self, phase: str) -> None:
+        self._charge()
+        self._stack.append(phase)
+
+    def exit(self) -> None:
+        self._charge()
+        self._stack.pop()
+
+    def wrap(self, func: Callable[..., object], phase: str) -> Callable[..., object]:
+        @functools.wraps(func)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            self.enter(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.exit()
+
+        return wrapper
+
+    @contextmanager
+    def installed(self) -> Iterator[PhaseTimer]:
+        """Wrap the phase implementations for the duration of the block."""
+        targets = _phase_targets()
+        # Look everything up before patching anything, so that inherited
+        # methods aren't wrapped twice.
+        saved = [(owner, attr, vars(owner).get(attr)) for owner, attr, __ in targets]
+        originals = [getattr(owner, attr) for owner, attr, __ in targets]
+        for (owner, attr, own), (__, __, phase), original in zip(
+            saved, targets, originals
+        ):
+            if isinstance(own, classmethod):
+                setattr(owner, attr, classmethod(self.wrap(own.__func__, phase)))
+            else:
+                setattr(owner, attr, self.wrap(original, phase))
+        ASTVisitor.clear_dispatch_table()
+        try:
+            yield self
+        finally:
+            for owner, attr, own in reversed(saved):
+                if own is None:
+                    delattr(owner, attr)
+                else:
+                    setattr(owner, attr, own)
+            ASTVisitor.clear_dispatch_table()
+
+
+def find_corpus(names: Sequence[str], paths: Sequence[str]) -> List[str]:
+    files = []
+    for name in names:
+        if name in CORPORA:
+            files.extend(sorted(glob.glob(CORPORA[name])))
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                sorted(glob.glob(os.path.join(path, "**", "*.py"), recursive=True))
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def read_sources(files: Sequence[str]) -> List[Tuple[str, str, bytes]]:
+    """Return (module name, filename, source) for each file."""
+    sources = []
+    for filename in files:
+        with open(filename, "rb") as f:
+            source = f.read()
+        name = os.path.splitext(os.path.basename(filename))[0]
+        sources.append((name, filename, source))
+    return sources
+
+
+def compile_all(
+    generator: type, sources: Sequence[Tuple[str, str, bytes]]
+) -> List[str]:
+    """Compile every source, returning the filenames that failed to compile."""
+    failed = []
+    for name, filename, source in sources:
+        try:
+            pycodegen.make_compiler(
+                source, filename, "exec", generator=generator, modname=name
+            ).getCode()
+        except Exception:
+            failed.append(filename)
+    return failed
+
+
+@final
+class BenchmarkResult:
+    def __init__(self, generator: str, files: int, lines: int) -> None:
+        self.generator = generator
+        self.files = files
+        self.lines = lines
+        self.failed: List[str] = []
+        self.times: Dict[str, float] = {}
+        self.blocks: Dict[str, int] = {}
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.times.values())
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "generator": self.generator,
+            "files": self.files,
+            "lines": self.lines,
+            "failed": self.failed,
+            "total_time": self.total_time,
+            "times": self.times,
+            "blocks": self.blocks,
+        }
+
+
+def run_benchmark(
+    generator_name: str,
+    sources: Sequence[Tuple[str, str, bytes]],
+    repeat: int = 3,
+    count_blocks: bool = True,
+) -> BenchmarkResult:
+    """Compile `sources` `repeat` times with the named generator, keeping the
+    fastest time for each phase."""
+    generator = GENERATORS[generator_name]
+    # Sources that don't compile with this generator (e.g. static type errors)
+    # are left out of the measurements.
+    failed = set(compile_all(generator, sources))
+    sources = [source for source in sources if source[1] not in failed]
+    lines = sum(source.count(b"\n") for __, __, source in sources)
+    result = BenchmarkResult(generator_name, len(sources), lines)
+    result.failed = sorted(failed)
+
+    best: Dict[str, float] = {}
+    for __ in range(repeat):
+        timer = PhaseTimer()
+        with timer.installed():
+            compile_all(generator, sources)
+        for phase, elapsed in timer.times.items():
+            best[phase] = min(best.get(phase, elapsed), elapsed)
+    result.times = best
+
+    if count_blocks:
+        timer = PhaseTimer(count_blocks=True)
+        with timer.installed():
+            compile_all(generator, sources)
+        result.blocks = timer.blocks
+    return result
+
+
+def format_result(result: BenchmarkResult) -> str:
+    total = result.total_time
+    lines = [
+        f"{result.generator}: {result.files} files, {result.lines} lines, "
+        f"{total * 1000:.1f} ms ({result.lines / total if total else 0:.0f} lines/s)"
+    ]
+    if result.failed:
+        lines.append(f"  ({len(result.failed)} files failed to compile)")
+    lines.append(f"  {'phase':<20} {'ms':>10} {'%':>6} {'blocks':>10}")
+    for phase in PHASES:
+        elapsed = result.times.get(phase, 0.0)
+        if not elapsed:
+            continue
+        share = elapsed / total * 100 if total else 0.0
+        blocks = result.blocks.get(phase, "")
+        lines.append(
+            f"  {phase:<20} {elapsed * 1000:>10.2f} {share:>6.1f} {blocks:>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="compiler.benchmark",
+        description="Measure compiler throughput per phase",
+    )
+    parser.add_argument(
+        "paths", nargs="*", help="extra files or directories to compile"
+    )
+    parser.add_argument(
+        "-g",
+        "--generator",
+        action="append",
+        choices=sorted(GENERATORS),
+        help="code generator to benchmark (default: all; may be repeated)",
+    )
+    parser.add_argument(
+        "-c",
+        "--corpus",
+        action="append",
+        choices=sorted([*CORPORA, *SYNTHETIC_CORPORA]),
+        help="corpus to compile (default: testcorpus, or none if paths are "
+        "given; may be repeated)",
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=3, help="number of timed runs"
+    )
+    parser.add_argument(
+        "--no-blocks",
+        action="store_true",
+        help="don't count allocated memory blocks",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    corpus = args.corpus or ([] if args.paths else ["testcorpus"])
+    sources = read_sources(find_corpus(corpus, args.paths))
+    for name in corpus:
+        if name in SYNTHETIC_CORPORA:
+            sources.append((name, f"<{name}>", SYNTHETIC_CORPORA[name]()))
+    results = [
+        run_benchmark(generator, sources, args.repeat, not args.no_blocks)
+        for generator in args.generator or GENERATORS
+    ]
+    if args.json:
+        print(json.dumps([result.to_json() for result in results], indent=2))
+    else:
+        print("\n\n".join(format_result(result) for result in results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -61,11 +61,16 @@ def error_context(self, filename: str, node: AST) -> Generator[None, None, None]
         try:
             yield
         except TypedSyntaxError as exc:
-            if exc.filename is None:
-                exc.filename = filename
-            if (exc.lineno, exc.offset) == (None, None):
-                exc.lineno, exc.offset, exc.text = error_location(filename, node)
-            self.error(exc)
+            self.error_in_context(exc, filename, node)
+
+    def error_in_context(self, exc: TypedSyntaxError, filename: str, node: AST) -> None:
+        """Report an error raised while processing `node`, giving it the node's
+        location if it doesn't have one yet."""
+        if exc.filename is None:
+            exc.filename = filename
+        if (exc.lineno, exc.offset) == (None, None):
+            exc.lineno, exc.offset, exc.text = error_location(filename, node)
+        self.error(exc)
 
     def warn(self, warning: PerfWarning) -> None:
         pass
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+from .opcodes import opcode
 from .optimizer import safe_lshift, safe_mod, safe_multiply, safe_power
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
-    from typing import Dict, Optional, Tuple
+    from typing import Callable, Dict, Optional, Tuple
 
     from .pyassem import Block, Instruction, PyFlowGraph
 
@@ -23,6 +24,23 @@
 PyCmp_IS_NOT = 9
 PyCmp_EXC_MATCH = 10
 
+NOP: int = opcode.NOP
+LOAD_CONST: int = opcode.LOAD_CONST
+ROT_TWO: int = opcode.ROT_TWO
+ROT_THREE: int = opcode.ROT_THREE
+ROT_FOUR: int = opcode.ROT_FOUR
+ROT_N: int = opcode.ROT_N
+UNPACK_SEQUENCE: int = opcode.UNPACK_SEQUENCE
+JUMP_ABSOLUTE: int = opcode.JUMP_ABSOLUTE
+JUMP_FORWARD: int = opcode.JUMP_FORWARD
+JUMP_IF_FALSE_OR_POP: int = opcode.JUMP_IF_FALSE_OR_POP
+JUMP_IF_TRUE_OR_POP: int = opcode.JUMP_IF_TRUE_OR_POP
+POP_JUMP_IF_FALSE: int = opcode.POP_JUMP_IF_FALSE
+POP_JUMP_IF_TRUE: int = opcode.POP_JUMP_IF_TRUE
+FOR_ITER: int = opcode.FOR_ITER
+BUILD_TUPLE: int = opcode.BUILD_TUPLE
+RETURN_VALUE: int = opcode.RETURN_VALUE
+
 UNARY_OPS: Dict[str, object] = {
     "UNARY_INVERT": lambda v: ~v,
     "UNARY_NEGATIVE": lambda v: -v,
@@ -56,12 +74,13 @@ def __init__(
 
     def optimize_basic_block(self, block: Block) -> None:
         instr_index = 0
+        jumps = self.graph.opcode.tables.jumps
 
         while instr_index < len(block.insts):
             instr = block.insts[instr_index]
 
             target_instr: Instruction | None = None
-            if instr.is_jump(self.graph.opcode):
+            if jumps[instr.opcode]:
                 target = instr.target
                 assert target is not None
                 # Skip over empty basic blocks.
@@ -82,6 +101,8 @@ def optimize_basic_block(self, block: Block) -> None:
             )
             instr_index = instr_index + 1 if new_index is None else new_index
 
+        block.stack_summary = None
+
     def dispatch_instr(
         self,
         instr_index: int,
@@ -90,28 +111,9 @@ def dispatch_instr(
         target: Instruction | None,
         block: Block,
     ) -> Optional[int]:
-        if instr.opname == "JUMP_IF_FALSE_OR_POP":
-            return self.opt_jump_if_false_or_pop(
-                instr_index, instr, next_instr, target, block
-            )
-        elif instr.opname == "JUMP_IF_TRUE_OR_POP":
-            return self.opt_jump_if_true_or_pop(
-                instr_index, instr, next_instr, target, block
-            )
-        elif instr.opname in ("POP_JUMP_IF_TRUE", "POP_JUMP_IF_FALSE"):
-            return self.opt_pop_jump_if(instr_index, instr, next_instr, target, block)
-        elif instr.opname in ("JUMP_ABSOLUTE", "JUMP_FORWARD"):
-            return self.opt_jump(instr_index, instr, next_instr, target, block)
-        elif instr.opname == "FOR_ITER":
-            return self.opt_for_iter(instr_index, instr, next_instr, target, block)
-        elif instr.opname == "ROT_N":
-            return self.opt_rot_n(instr_index, instr, next_instr, target, block)
-        elif instr.opname == "LOAD_CONST":
-            return self.opt_load_const(instr_index, instr, next_instr, target, block)
-        elif instr.opname == "BUILD_TUPLE":
-            return self.opt_build_tuple(instr_index, instr, next_instr, target, block)
-        elif instr.opname == "RETURN_VALUE":
-            return self.opt_return_value(instr_index, instr, next_instr, target, block)
+        handler = self._handlers.get(instr.opcode)
+        if handler is not None:
+            return handler(self, instr_index, instr, next_instr, target, block)
 
     def clean_basic_block(self, block: Block, prev_lineno: int) -> None:
         """Remove all NOPs from a function when legal."""
@@ -119,7 +121,7 @@ def clean_basic_block(self, block: Block, prev_lineno: int) -> None:
         num_instrs = len(block.insts)
         for idx in range(num_instrs):
             instr = block.insts[idx]
-            if instr.opname == "NOP":
+            if instr.opcode == NOP:
                 lineno = instr.lineno
                 # Eliminate no-op if it doesn't have a line number
                 if lineno < 0:
@@ -146,7 +148,7 @@ def clean_basic_block(self, block: Block, prev_lineno: int) -> None:
             prev_lineno = instr.lineno
         block.insts = new_instrs
 
-    def jump_thread(self, instr: Instruction, target: Instruction, opname: str) -> int:
+    def jump_thread(self, instr: Instruction, target: Instruction, op: int) -> int:
         """Attempt to eliminate jumps to jumps by updating inst to jump to
         target->i_target using the provided opcode. Return 0 if successful, 1 if
         not; this makes it easier for our callers to revisit the same
@@ -155,7 +157,7 @@ def jump_thread(self, instr: Instruction, target: Instruction, opname: str) -> i
         assert target.is_jump(self.graph.opcode)
         if instr.lineno == target.lineno and instr.target != target.target:
             instr.target = target.target
-            instr.opname = opname
+            instr.opcode = op
             return 0
         return 1
 
@@ -168,15 +170,15 @@ def opt_jump_if_false_or_pop(
         block: Block,
     ) -> Optional[int]:
         assert target is not None
-        if target.opname == "POP_JUMP_IF_FALSE":
-            return instr_index + self.jump_thread(instr, target, "POP_JUMP_IF_FALSE")
-        elif target.opname in ("JUMP_ABSOLUTE", "JUMP_FORWARD", "JUMP_IF_FALSE_OR_POP"):
-            return instr_index + self.jump_thread(instr, target, "JUMP_IF_FALSE_OR_POP")
-        elif target.opname in ("JUMP_IF_TRUE_OR_POP", "POP_JUMP_IF_TRUE"):
+        if target.opcode == POP_JUMP_IF_FALSE:
+            return instr_index + self.jump_thread(instr, target, POP_JUMP_IF_FALSE)
+        elif target.opcode in (JUMP_ABSOLUTE, JUMP_FORWARD, JUMP_IF_FALSE_OR_POP):
+            return instr_index + self.jump_thread(instr, target, JUMP_IF_FALSE_OR_POP)
+        elif target.opcode in (JUMP_IF_TRUE_OR_POP, POP_JUMP_IF_TRUE):
             if instr.lineno == target.lineno:
                 target_block = instr.target
                 assert target_block and target_block != target_block.next
-                instr.opname = "POP_JUMP_IF_FALSE"
+                instr.opcode = POP_JUMP_IF_FALSE
                 instr.target = target_block.next
                 return instr_index
             return instr_index + 1
@@ -190,15 +192,15 @@ def opt_jump_if_true_or_pop(
         block: Block,
     ) -> Optional[int]:
         assert target is not None
-        if target.opname == "POP_JUMP_IF_TRUE":
-            return instr_index + self.jump_thread(instr, target, "POP_JUMP_IF_TRUE")
-        elif target.opname in ("JUMP_ABSOLUTE", "JUMP_FORWARD", "JUMP_IF_TRUE_OR_POP"):
-            return instr_index + self.jump_thread(instr, target, "JUMP_IF_TRUE_OR_POP")
-        elif target.opname in ("JUMP_IF_FALSE_OR_POP", "POP_JUMP_IF_FALSE"):
+        if target.opcode == POP_JUMP_IF_TRUE:
+            return instr_index + self.jump_thread(instr, target, POP_JUMP_IF_TRUE)
+        elif target.opcode in (JUMP_ABSOLUTE, JUMP_FORWARD, JUMP_IF_TRUE_OR_POP):
+            return instr_index + self.jump_thread(instr, target, JUMP_IF_TRUE_OR_POP)
+        elif target.opcode in (JUMP_IF_FALSE_OR_POP, POP_JUMP_IF_FALSE):
             if instr.lineno == target.lineno:
                 target_block = instr.target
                 assert target_block and target_block != target_block.next
-                instr.opname = "POP_JUMP_IF_TRUE"
+                instr.opcode = POP_JUMP_IF_TRUE
                 instr.target = target_block.next
                 return instr_index
             return instr_index + 1
@@ -212,8 +214,8 @@ def opt_pop_jump_if(
         block: Block,
     ) -> Optional[int]:
         assert target is not None
-        if target.opname in ("JUMP_ABSOLUTE", "JUMP_FORWARD"):
-            return instr_index + self.jump_thread(instr, target, instr.opname)
+        if target.opcode in (JUMP_ABSOLUTE, JUMP_FORWARD):
+            return instr_index + self.jump_thread(instr, target, instr.opcode)
 
     def opt_jump(
         self,
@@ -224,8 +226,8 @@ def opt_jump(
         block: Block,
     ) -> Optional[int]:
         assert target is not None
-        if target.opname in ("JUMP_ABSOLUTE", "JUMP_FORWARD"):
-            return instr_index + self.jump_thread(instr, target, "JUMP_ABSOLUTE")
+        if target.opcode in (JUMP_ABSOLUTE, JUMP_FORWARD):
+            return instr_index + self.jump_thread(instr, target, JUMP_ABSOLUTE)
 
     def opt_for_iter(
         self,
@@ -236,8 +238,8 @@ def opt_for_iter(
         block: Block,
     ) -> Optional[int]:
         assert target is not None
-        if target.opname == "JUMP_FORWARD":
-            return instr_index + self.jump_thread(instr, target, "FOR_ITER")
+        if target.opcode == JUMP_FORWARD:
+            return instr_index + self.jump_thread(instr, target, FOR_ITER)
 
     def opt_rot_n(
         self,
@@ -249,14 +251,14 @@ def opt_rot_n(
     ) -> Optional[int]:
         if instr.ioparg < 2:
             pass
-            instr.opname = "NOP"
+            instr.opcode = NOP
             return
         elif instr.ioparg == 2:
-            instr.opname = "ROT_TWO"
+            instr.opcode = ROT_TWO
         elif instr.ioparg == 3:
-            instr.opname = "ROT_THREE"
+            instr.opcode = ROT_THREE
         elif instr.ioparg == 4:
-            instr.opname = "ROT_FOUR"
+            instr.opcode = ROT_FOUR
         if instr_index >= instr.ioparg - 1:
             self.fold_rotations(
                 block.insts[instr_index - instr.ioparg + 1 : instr_index + 1],
@@ -265,20 +267,20 @@ def opt_rot_n(
 
     def fold_rotations(self, instrs: list[Instruction], n: int) -> None:
         for instr in instrs:
-            if instr.opname == "ROT_N":
+            if instr.opcode == ROT_N:
                 rot = instr.ioparg
-            elif instr.opname == "ROT_FOUR":
+            elif instr.opcode == ROT_FOUR:
                 rot = 4
-            elif instr.opname == "ROT_THREE":
+            elif instr.opcode == ROT_THREE:
                 rot = 3
-            elif instr.opname == "ROT_TWO":
+            elif instr.opcode == ROT_TWO:
                 rot = 2
             else:
                 return
             if rot != n:
                 return
         for instr in instrs:
-            instr.opname = "NOP"
+            instr.opcode = NOP
 
     def opt_load_const(
         self,
@@ -292,28 +294,28 @@ def opt_load_const(
         const = instr.oparg
         if next_instr is None:
             return
-        if next_instr.opname in (
-            "POP_JUMP_IF_FALSE",
-            "POP_JUMP_IF_TRUE",
+        if next_instr.opcode in (
+            POP_JUMP_IF_FALSE,
+            POP_JUMP_IF_TRUE,
         ):
             is_true = bool(const)
-            instr.opname = "NOP"
-            jump_if_true = next_instr.opname == "POP_JUMP_IF_TRUE"
+            instr.opcode = NOP
+            jump_if_true = next_instr.opcode == POP_JUMP_IF_TRUE
             if is_true == jump_if_true:
-                next_instr.opname = "JUMP_ABSOLUTE"
+                next_instr.opcode = JUMP_ABSOLUTE
                 block.no_fallthrough = True
             else:
-                next_instr.opname = "NOP"
+                next_instr.opcode = NOP
                 next_instr.target = None
-        elif next_instr.opname in ("JUMP_IF_FALSE_OR_POP", "JUMP_IF_TRUE_OR_POP"):
+        elif next_instr.opcode in (JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP):
             is_true = bool(const)
-            jump_if_true = next_instr.opname == "JUMP_IF_TRUE_OR_POP"
+            jump_if_true = next_instr.opcode == JUMP_IF_TRUE_OR_POP
             if is_true == jump_if_true:
-                next_instr.opname = "JUMP_ABSOLUTE"
+                next_instr.opcode = JUMP_ABSOLUTE
                 block.no_fallthrough = True
             else:
-                instr.opname = "NOP"
-                next_instr.opname = "NOP"
+                instr.opcode = NOP
+                next_instr.opcode = NOP
                 next_instr.target = None
 
     def opt_build_tuple(
@@ -326,18 +328,18 @@ def opt_build_tuple(
     ) -> Optional[int]:
         if (
             next_instr
-            and next_instr.opname == "UNPACK_SEQUENCE"
+            and next_instr.opcode == UNPACK_SEQUENCE
             and instr.ioparg == next_instr.ioparg
         ):
             if instr.ioparg == 1:
-                instr.opname = "NOP"
-                next_instr.opname = "NOP"
+                instr.opcode = NOP
+                next_instr.opcode = NOP
             elif instr.ioparg == 2:
-                instr.opname = "ROT_TWO"
-                next_instr.opname = "NOP"
+                instr.opcode = ROT_TWO
+                next_instr.opcode = NOP
             elif instr.ioparg == 3:
-                instr.opname = "ROT_THREE"
-                next_instr.opname = "ROT_TWO"
+                instr.opcode = ROT_THREE
+                next_instr.opcode = ROT_TWO
             return
         if instr_index >= instr.ioparg:
             self.fold_tuple_on_constants(instr_index, instr, block)
@@ -348,13 +350,13 @@ def fold_tuple_on_constants(
         load_const_instrs = []
         for i in range(instr_index - instr.ioparg, instr_index):
             maybe_load_const = block.insts[i]
-            if maybe_load_const.opname != "LOAD_CONST":
+            if maybe_load_const.opcode != LOAD_CONST:
                 return
             load_const_instrs.append(maybe_load_const)
         newconst = tuple(lc.oparg for lc in load_const_instrs)
         for lc in load_const_instrs:
-            lc.opname = "NOP"
-        instr.opname = "LOAD_CONST"
+            lc.opcode = NOP
+        instr.opcode = LOAD_CONST
         instr.oparg = newconst
         instr.ioparg = self.graph.convertArg("LOAD_CONST", newconst)
 
@@ -367,3 +369,18 @@ def opt_return_value(
         block: Block,
     ) -> Optional[int]:
         block.insts = block.insts[: instr_index + 1]
+
+    # Peephole optimizations by opcode of the instruction they start at.
+    _handlers: Dict[int, Callable[..., Optional[int]]] = {
+        JUMP_IF_FALSE_OR_POP: opt_jump_if_false_or_pop,
+        JUMP_IF_TRUE_OR_POP: opt_jump_if_true_or_pop,
+        POP_JUMP_IF_TRUE: opt_pop_jump_if,
+        POP_JUMP_IF_FALSE: opt_pop_jump_if,
+        JUMP_ABSOLUTE: opt_jump,
+        JUMP_FORWARD: opt_jump,
+        FOR_ITER: opt_for_iter,
+        ROT_N: opt_rot_n,
+        LOAD_CONST: opt_load_const,
+        BUILD_TUPLE: opt_build_tuple,
+        RETURN_VALUE: opt_return_value,
+    }
@@ -74,22 +74,33 @@ def get_features(self):
         return self.found.keys()
 
 
+def check_future_placement(node):
+    """Raise SyntaxError if node is a future statement that FutureParser
+    didn't find at the beginning of the module"""
+    if hasattr(node, "valid_future"):
+        return
+    if node.module != "__future__":
+        return
+    raise SyntaxError(
+        "from __future__ imports must occur at the beginning of the file"
+    )
+
+
 class BadFutureParser(ASTVisitor):
     """Check for invalid future statements"""
 
     def visitImportFrom(self, node):
-        if hasattr(node, "valid_future"):
-            return
-        if node.module != "__future__":
-            return
-        raise SyntaxError(
-            "from __future__ imports must occur at the beginning of the file"
-        )
+        check_future_placement(node)
+
 
+def find_futures(node, check_placement=True):
+    """Return the features enabled by future statements in the module.
 
-def find_futures(node):
+    Checking that there are no future statements elsewhere takes a walk of the
+    whole tree; callers that walk it anyway can pass check_placement=False and
+    call check_future_placement on each ImportFrom themselves."""
     p1 = FutureParser()
-    p2 = BadFutureParser()
     walk(node, p1)
-    walk(node, p2)
+    if check_placement:
+        walk(node, BadFutureParser())
     return p1.get_features()
@@ -1,3 +1,31 @@
+from __future__ import annotations
+
+# Opcode sets only ever add opcodes to the base set without renumbering, so a
+# single mapping between opcode names and numbers serves all of them. This lets
+# flow graph instructions store integer opcodes no matter which set their graph
+# uses. Names that aren't real opcodes (e.g. markers used by tests) are given
+# numbers from PSEUDO_OPCODE_BASE up.
+PSEUDO_OPCODE_BASE = 256
+OPCODE_NUMBERS: dict[str, int] = {}
+OPCODE_NAMES: list[str] = ["<%r>" % (op,) for op in range(PSEUDO_OPCODE_BASE)]
+
+
+def opcode_number(name: str) -> int:
+    op = OPCODE_NUMBERS.get(name)
+    if op is None:
+        op = OPCODE_NUMBERS[name] = len(OPCODE_NAMES)
+        OPCODE_NAMES.append(name)
+    return op
+
+
+def _register_opcode(name: str, op: int) -> None:
+    existing = OPCODE_NUMBERS.get(name)
+    if existing is not None and existing != op:
+        raise ValueError(f"opcode {name} is already numbered {existing}, not {op}")
+    OPCODE_NUMBERS[name] = op
+    OPCODE_NAMES[op] = name
+
+
 class Opcode:
     CMP_OP = (
         "<",
@@ -34,6 +62,7 @@ def __init__(self) -> None:
         self.opmap: dict[str, int] = {}
         self.opname: list[str] = ["<%r>" % (op,) for op in range(256)]
         self.stack_effects: dict[str, object] = {}
+        self._tables: OpcodeTables | None = None
 
     def stack_effect(self, opcode: int, oparg, jump: int) -> int:  # pyre-ignore[2]
         oparg_int = 0
@@ -65,8 +94,10 @@ def stack_effect_raw(self, opname: str, oparg, jump: int) -> int:  # pyre-ignore
             return effect(oparg, jump)  # pyre-ignore[29]
 
     def def_op(self, name: str, op: int) -> None:
+        _register_opcode(name, op)
         self.opname[op] = name
         self.opmap[name] = op
+        self._tables = None
         setattr(self, name, op)
 
     def name_op(self, name: str, op: int) -> None:
@@ -81,6 +112,15 @@ def jabs_op(self, name: str, op: int) -> None:
         self.def_op(name, op)
         self.hasjabs.add(op)
 
+    @property
+    def tables(self) -> OpcodeTables:
+        """Per-opcode tables for the assembler, built on first use; the opcode
+        set (including `stack_effects`) must be complete by then."""
+        tables = self._tables
+        if tables is None:
+            tables = self._tables = OpcodeTables(self)
+        return tables
+
     def has_jump(self, op: int) -> bool:
         return op in self.hasjrel or op in self.hasjabs
 
@@ -101,6 +141,7 @@ def remove_op(self, opname: str) -> None:
         self.opmap.pop(opname)
         self.opname[op] = None  # pyre-ignore[6]
         self.stack_effects.pop(opname)
+        self._tables = None
         delattr(self, opname)
 
     def copy(self) -> "Opcode":
@@ -119,3 +160,22 @@ def copy(self) -> "Opcode":
         for name, op in self.opmap.items():
             setattr(result, name, op)
         return result
+
+
+class OpcodeTables:
+    """Lists indexed by opcode number, so that the assembler can look up
+    properties of instructions without hashing their names."""
+
+    __slots__ = ("jumps", "relative_jumps", "stack_effects")
+
+    def __init__(self, opcode: Opcode) -> None:
+        size = PSEUDO_OPCODE_BASE
+        self.jumps: list[bool] = [opcode.has_jump(op) for op in range(size)]
+        self.relative_jumps: list[bool] = [op in opcode.hasjrel for op in range(size)]
+        # An int for constant effects, a function of (oparg, jump) otherwise,
+        # or None for opcodes without a known effect.
+        self.stack_effects: list[object] = [None] * size
+        for name, effect in opcode.stack_effects.items():
+            op = opcode.opmap.get(name)
+            if op is not None:
+                self.stack_effects[op] = effect
@@ -5,11 +5,12 @@
 from __future__ import annotations
 
 import sys
+from bisect import bisect_right
 from contextlib import contextmanager
 from types import CodeType
-from typing import ClassVar, Generator, List, Optional
+from typing import ClassVar, Generator, List, Optional, Tuple
 
-from . import opcode_cinder, opcodes
+from . import opcode_cinder, opcode_static, opcodes
 from .consts import (
     CO_ASYNC_GENERATOR,
     CO_COROUTINE,
@@ -19,11 +20,27 @@
     CO_SUPPRESS_JIT,
 )
 from .flow_graph_optimizer import FlowGraphOptimizer
-from .opcodebase import Opcode
+from .opcodebase import Opcode, OPCODE_NAMES, opcode_number
 
 
 MAX_COPY_SIZE = 4
 
+# Every opcode set numbers opcodes the same way; the static set is the most
+# complete, so take the numbers the assembler needs from it.
+_ops: Opcode = opcode_static.opcode
+NOP: int = _ops.NOP
+JUMP_ABSOLUTE: int = _ops.JUMP_ABSOLUTE
+JUMP_FORWARD: int = _ops.JUMP_FORWARD
+
+# TODO(T128853358): The RETURN_PRIMITIVE logic should live in the Static flow graph.
+RETURN_OPCODES = frozenset((_ops.RETURN_VALUE, _ops.RETURN_PRIMITIVE))
+EXIT_OPCODES = RETURN_OPCODES | {_ops.RAISE_VARARGS, _ops.RERAISE}
+UNCONDITIONAL_JUMP_OPCODES = frozenset((JUMP_ABSOLUTE, JUMP_FORWARD))
+# Code after these in a block is dead.
+TERMINATOR_OPCODES = EXIT_OPCODES | UNCONDITIONAL_JUMP_OPCODES
+# Jumps that set up exception handlers, rather than transfer control.
+SETUP_OPCODES = frozenset((_ops.SETUP_ASYNC_WITH, _ops.SETUP_WITH, _ops.SETUP_FINALLY))
+
 
 def sign(a):
     if not isinstance(a, float):
@@ -60,7 +77,8 @@ def cast_signed_byte_to_unsigned(i):
 
 
 class Instruction:
-    __slots__ = ("opname", "oparg", "target", "ioparg", "lineno")
+    # Instructions store the integer opcode; `opname` is derived from it.
+    __slots__ = ("opcode", "oparg", "target", "ioparg", "lineno")
 
     def __init__(
         self,
@@ -70,12 +88,20 @@ def __init__(
         lineno: int = -1,
         target: Optional[Block] = None,
     ):
-        self.opname = opname
+        self.opcode: int = opcode_number(opname)
         self.oparg = oparg
         self.lineno = lineno
         self.ioparg = ioparg
         self.target = target
 
+    @property
+    def opname(self) -> str:
+        return OPCODE_NAMES[self.opcode]
+
+    @opname.setter
+    def opname(self, opname: str) -> None:
+        self.opcode = opcode_number(opname)
+
     def __repr__(self):
         args = [
             f"{self.opname!r}",
@@ -89,15 +115,39 @@ def __repr__(self):
         return f"Instruction({', '.join(args)})"
 
     def is_jump(self, opcode: Opcode) -> bool:
-        op = opcode.opmap[self.opname]
-        return opcode.has_jump(op)
+        return opcode.tables.jumps[self.opcode]
 
     def copy(self) -> Instruction:
         return Instruction(
-            self.opname, self.oparg, self.ioparg, self.lineno, self.target
+            OPCODE_NAMES[self.opcode], self.oparg, self.ioparg, self.lineno, self.target
         )
 
 
+class StackSummary:
+    """The effect of a block's instructions on the stack, relative to the depth
+    the block starts at, so that stack depth analysis only has to walk each
+    block once."""
+
+    __slots__ = ("peak", "net", "falls_through", "jumps")
+
+    def __init__(
+        self,
+        peak: Optional[int],
+        net: int,
+        falls_through: bool,
+        jumps: List[Tuple[Instruction, int]],
+    ) -> None:
+        # Deepest the stack gets after any instruction (None if the block is
+        # empty), and the depth when control falls off the end of the block.
+        self.peak = peak
+        self.net = net
+        self.falls_through = falls_through
+        # Each jump out of the block and the depth its target starts at. The
+        # jump instructions themselves are kept so that retargeting them
+        # doesn't invalidate the summary.
+        self.jumps = jumps
+
+
 class CompileScope:
     START_MARKER = "compile-scope-start-marker"
     __slots__ = "blocks"
@@ -283,6 +333,9 @@ def __init__(self, label=""):
         self.is_exit: bool = False
         self.no_fallthrough: bool = False
         self.num_predecessors: int = 0
+        # Computed on demand by PyFlowGraph.get_stack_summary; passes that
+        # change the block's instructions must reset it to None.
+        self.stack_summary: StackSummary | None = None
         self.alloc_id: int = Block.allocated_block_count
         Block.allocated_block_count += 1
 
@@ -304,8 +357,7 @@ def __str__(self):
         return f"<block label={self.label} bid={self.bid} startdepth={self.startdepth}: {insts}>"
 
     def emit(self, instr: Instruction) -> None:
-        # TODO(T128853358): The RETURN_PRIMITIVE logic should live in the Static flow graph.
-        if instr.opname in ("RETURN_VALUE", "RETURN_PRIMITIVE"):
+        if instr.opcode in RETURN_OPCODES:
             self.returns = True
 
         self.insts.append(instr)
@@ -329,11 +381,7 @@ def removeNext(self):
         self.next = None
 
     def has_return(self):
-        # TODO(T128853358): The RETURN_PRIMITIVE logic should live in the Static flow graph.
-        return self.insts and self.insts[-1].opname in (
-            "RETURN_VALUE",
-            "RETURN_PRIMITIVE",
-        )
+        return self.insts and self.insts[-1].opcode in RETURN_OPCODES
 
     def get_children(self):
         return list(self.outEdges) + ([self.next] if self.next is not None else [])
@@ -434,6 +482,7 @@ class PyFlowGraph(FlowGraph):
 
     super_init = FlowGraph.__init__
     opcode = opcodes.opcode
+    flow_graph_optimizer = FlowGraphOptimizer
 
     def __init__(
         self,
@@ -605,58 +654,72 @@ def push_block(self, worklist: List[Block], block: Block, depth: int):
             block.startdepth = depth
             worklist.append(block)
 
+    def get_stack_summary(self, block: Block) -> StackSummary:
+        summary = block.stack_summary
+        if summary is not None:
+            return summary
+        tables = self.opcode.tables
+        jumps = tables.jumps
+        stack_effects = tables.stack_effects
+        depth = 0
+        peak = None
+        falls_through = True
+        block_jumps = []
+        for instr in block.getInstructions():
+            op = instr.opcode
+            effect = stack_effects[op]
+            if effect is None:
+                # Not in this opcode set; the slow path raises a descriptive
+                # error if the effect isn't known at all.
+                effect = self.opcode.stack_effect_raw(instr.opname, instr.oparg, False)
+            if isinstance(effect, int):
+                delta = effect
+            else:
+                delta = effect(instr.oparg, False)
+            new_depth = depth + delta
+            if peak is None or new_depth > peak:
+                peak = new_depth
+
+            if jumps[op]:
+                if not isinstance(effect, int):
+                    delta = effect(instr.oparg, True)
+                target_depth = depth + delta
+                if target_depth > peak:
+                    peak = target_depth
+                block_jumps.append((instr, target_depth))
+
+            depth = new_depth
+
+            if op in TERMINATOR_OPCODES:
+                # Remaining code is dead
+                falls_through = False
+                break
+
+        summary = block.stack_summary = StackSummary(
+            peak, depth, falls_through, block_jumps
+        )
+        return summary
+
     def stackdepth_walk(self, block):
         maxdepth = 0
         worklist = []
         self.push_block(worklist, block, 0 if self.gen_kind is None else 1)
         while worklist:
             block = worklist.pop()
-            next = block.next
             depth = block.startdepth
             assert depth >= 0
 
-            for instr in block.getInstructions():
-                delta = self.opcode.stack_effect_raw(instr.opname, instr.oparg, False)
-                new_depth = depth + delta
-                if new_depth > maxdepth:
-                    maxdepth = new_depth
-
-                assert depth >= 0
-
-                op = self.opcode.opmap[instr.opname]
-                if self.opcode.has_jump(op):
-                    delta = self.opcode.stack_effect_raw(
-                        instr.opname, instr.oparg, True
-                    )
+            summary = self.get_stack_summary(block)
+            if summary.peak is not None and depth + summary.peak > maxdepth:
+                maxdepth = depth + summary.peak
 
-                    target_depth = depth + delta
-                    if target_depth > maxdepth:
-                        maxdepth = target_depth
+            for instr, delta in summary.jumps:
+                target_depth = depth + delta
+                assert target_depth >= 0
+                self.push_block(worklist, instr.target, target_depth)
 
-                    assert target_depth >= 0
-
-                    self.push_block(worklist, instr.target, target_depth)
-
-                depth = new_depth
-
-                # TODO(T128853358): The RETURN_PRIMITIVE logic should live in the Static flow graph.
-                if instr.opname in (
-                    "JUMP_ABSOLUTE",
-                    "JUMP_FORWARD",
-                    "RETURN_VALUE",
-                    "RETURN_PRIMITIVE",
-                    "RAISE_VARARGS",
-                    "RERAISE",
-                ):
-                    # Remaining code is dead
-                    next = None
-                    break
-
-            # TODO(dinoviehland): we could save the delta we came up with here and
-            # reapply it on subsequent walks rather than having to walk all of the
-            # instructions again.
-            if next:
-                self.push_block(worklist, next, depth)
+            if summary.falls_through and block.next:
+                self.push_block(worklist, block.next, depth + summary.net)
 
         return maxdepth
 
@@ -676,51 +739,104 @@ def computeStackDepth(self):
     def flattenGraph(self):
         """Arrange the blocks in order and resolve jumps"""
         assert self.stage == FINAL, self.stage
-        # This is an awful hack that could hurt performance, but
-        # on the bright side it should work until we come up
-        # with a better solution.
-        #
-        # The issue is that in the first loop blocksize() is called
-        # which calls instrsize() which requires i_oparg be set
-        # appropriately. There is a bootstrap problem because
-        # i_oparg is calculated in the second loop.
-        #
-        # So we loop until we stop seeing new EXTENDED_ARGs.
-        # The only EXTENDED_ARGs that could be popping up are
-        # ones in jump instructions.  So this should converge
-        # fairly quickly.
-        extended_arg_recompile = True
-        while extended_arg_recompile:
-            extended_arg_recompile = False
-            self.insts = insts = []
-            pc = 0
-            for b in self.getBlocksInOrder():
-                b.offset = pc
-
-                for inst in b.getInstructions():
-                    insts.append(inst)
-                    pc += instrsize(inst.ioparg)
-
-            pc = 0
-            for inst in insts:
-                pc += instrsize(inst.ioparg)
-                op = self.opcode.opmap[inst.opname]
-                if self.opcode.has_jump(op):
-                    oparg = inst.ioparg
-                    target = inst.target
-
-                    offset = target.offset
-                    if op in self.opcode.hasjrel:
-                        offset -= pc
+        # A jump's oparg depends on block offsets, which depend on how many
+        # EXTENDED_ARGs every jump needs, so this is a fixed point problem.
+        # Only jumps change size, and only ever grow, so we lay out the code
+        # once as a sequence of "points" (block starts and jumps) with the
+        # fixed size of the code between them, then grow jumps until they
+        # fit. After each round only the jumps whose oparg could have changed
+        # (those spanning or targeting code after a jump that grew) are
+        # revisited. This reaches the same fixed point as repeatedly laying
+        # out the whole graph until no jump changes size.
+        tables = self.opcode.tables
+        jumps = tables.jumps
+        relative_jumps = tables.relative_jumps
+
+        self.insts = insts = []
+        blocks = self.getBlocksInOrder()
+        block_points = {}
+        jump_points = []
+        # Per point: the instruction (None for a block start), the size of the
+        # non-jump code before it, its own size, and its start offset.
+        point_insts = []
+        gaps = []
+        sizes = []
+        gap = 0
+        for b in blocks:
+            block_points[b] = len(point_insts)
+            point_insts.append(None)
+            gaps.append(gap)
+            sizes.append(0)
+            gap = 0
+            for inst in b.getInstructions():
+                insts.append(inst)
+                if jumps[inst.opcode]:
+                    jump_points.append(len(point_insts))
+                    point_insts.append(inst)
+                    gaps.append(gap)
+                    sizes.append(instrsize(inst.ioparg))
+                    gap = 0
+                else:
+                    gap += instrsize(inst.ioparg)
 
-                    if instrsize(oparg) != instrsize(offset):
-                        extended_arg_recompile = True
+        starts = [0] * len(point_insts)
+        self._layout_points(starts, gaps, sizes, 0)
 
-                    assert offset >= 0, "Offset value: %d" % offset
-                    inst.ioparg = offset
+        # (jump point, target point, relative)
+        worklist = [
+            (
+                k,
+                block_points[point_insts[k].target],
+                relative_jumps[point_insts[k].opcode],
+            )
+            for k in jump_points
+        ]
+        pending = worklist
+        while pending:
+            grown = []
+            for k, target, relative in pending:
+                offset = starts[target]
+                if relative:
+                    offset -= starts[k] + sizes[k]
+                assert offset >= 0, "Offset value: %d" % offset
+                point_insts[k].ioparg = offset
+                size = instrsize(offset)
+                if size != sizes[k]:
+                    sizes[k] = size
+                    grown.append(k)
+            if not grown:
+                break
+            self._layout_points(starts, gaps, sizes, grown[0] + 1)
+            # Absolute jumps move if anything before their target grew;
+            # relative ones only if something between them and their target did.
+            first_grown = grown[0]
+            pending = []
+            for jump in worklist:
+                k, target, relative = jump
+                if relative:
+                    i = bisect_right(grown, k)
+                    if i < len(grown) and grown[i] < target:
+                        pending.append(jump)
+                elif first_grown < target:
+                    pending.append(jump)
+
+        for b in blocks:
+            b.offset = starts[block_points[b]]
 
         self.stage = FLAT
 
+    @staticmethod
+    def _layout_points(starts, gaps, sizes, first):
+        """Recompute the start offsets of points from `first` on."""
+        if first == 0:
+            pc = 0
+        else:
+            pc = starts[first - 1] + sizes[first - 1]
+        for k in range(first, len(starts)):
+            pc += gaps[k]
+            starts[k] = pc
+            pc += sizes[k]
+
     def sort_cellvars(self):
         self.closure = self.cellvars + self.freevars
 
@@ -826,7 +942,7 @@ def _convert_DEREF(self, arg: object) -> int:
     _const_opcodes = set()
     for op, converter in _converters.items():
         if converter in _const_converters:
-            _const_opcodes.add(op)
+            _const_opcodes.add(opcode_number(op))
 
     # Opcodes which do not add names to co_consts/co_names/co_varnames in dead code (self.do_not_emit_bytecode)
     _quiet_opcodes = {
@@ -857,7 +973,7 @@ def makeByteCode(self):
                 lnotab.addCode(self.opcode.EXTENDED_ARG, (oparg >> 16) & 0xFF)
             if oparg > 0xFF:
                 lnotab.addCode(self.opcode.EXTENDED_ARG, (oparg >> 8) & 0xFF)
-            lnotab.addCode(self.opcode.opmap[t.opname], oparg & 0xFF)
+            lnotab.addCode(t.opcode, oparg & 0xFF)
 
         # Since the linetable format writes the end offset of bytecodes, we can't commit the
         # last write until all the instructions are iterated over.
@@ -931,12 +1047,11 @@ def propagate_line_numbers(self):
                 if next_instr.lineno < 0:
                     next_instr.lineno = prev_lineno
             last_instr = block.insts[-1]
-            if last_instr.is_jump(self.opcode) and last_instr.opname not in {
-                # Only actual jumps, not exception handlers
-                "SETUP_ASYNC_WITH",
-                "SETUP_WITH",
-                "SETUP_FINALLY",
-            }:
+            # Only actual jumps, not exception handlers
+            if (
+                last_instr.is_jump(self.opcode)
+                and last_instr.opcode not in SETUP_OPCODES
+            ):
                 target = last_instr.target
                 if target.num_predecessors == 1:
                     assert target.insts
@@ -952,8 +1067,7 @@ def guarantee_lineno_for_exits(self):
                 continue
             last_instr = block.insts[-1]
             if last_instr.lineno < 0:
-                # TODO(T128853358): The RETURN_PRIMITIVE logic should live in the Static flow graph.
-                if last_instr.opname in ("RETURN_VALUE", "RETURN_PRIMITIVE"):
+                if last_instr.opcode in RETURN_OPCODES:
                     for instr in block.insts:
                         assert instr.lineno < 0
                         instr.lineno = lineno
@@ -975,7 +1089,7 @@ def duplicate_exits_without_lineno(self):
         append_after = {}
         for block in self.blocks_in_reverse_allocation_order():
             if block.insts and (last := block.insts[-1]).is_jump(self.opcode):
-                if last.opname in {"SETUP_ASYNC_WITH", "SETUP_WITH", "SETUP_FINALLY"}:
+                if last.opcode in SETUP_OPCODES:
                     continue
                 target = last.target
                 assert target.insts
@@ -1009,16 +1123,16 @@ def normalize_jumps(self):
             if not block.insts:
                 continue
             last = block.insts[-1]
-            if last.opname == "JUMP_ABSOLUTE" and last.target.bid not in seen_blocks:
-                last.opname = "JUMP_FORWARD"
-            elif last.opname == "JUMP_FORWARD" and last.target.bid in seen_blocks:
-                last.opname = "JUMP_ABSOLUTE"
+            if last.opcode == JUMP_ABSOLUTE and last.target.bid not in seen_blocks:
+                last.opcode = JUMP_FORWARD
+            elif last.opcode == JUMP_FORWARD and last.target.bid in seen_blocks:
+                last.opcode = JUMP_ABSOLUTE
 
     def optimizeCFG(self):
         """Optimize a well-formed CFG."""
         assert self.stage == CLOSED, self.stage
 
-        optimizer = FlowGraphOptimizer(self)
+        optimizer = self.flow_graph_optimizer(self)
         for block in self.ordered_blocks:
             optimizer.optimize_basic_block(block)
             optimizer.clean_basic_block(block, -1)
@@ -1046,13 +1160,14 @@ def optimizeCFG(self):
             if not block.insts:
                 continue
             last = block.insts[-1]
-            if last.opname not in {"JUMP_ABSOLUTE", "JUMP_FORWARD"}:
+            if last.opcode not in UNCONDITIONAL_JUMP_OPCODES:
                 continue
             if last.target == block.next:
                 block.no_fallthrough = False
-                last.opname = "NOP"
+                last.opcode = NOP
                 last.oparg = last.ioparg = 0
                 last.target = None
+                block.stack_summary = None
                 optimizer.clean_basic_block(block, -1)
                 maybe_empty_blocks = True
 
@@ -1110,20 +1225,16 @@ def remove_unreachable_basic_blocks(self):
     def normalize_basic_block(self, block: Block) -> None:
         """Sets the `fallthrough` and `exit` properties of a block, and ensures that the targets of
         any jumps point to non-empty blocks by following the next pointer of empty blocks."""
+        jumps = self.opcode.tables.jumps
         for instr in block.getInstructions():
-            # TODO(T128853358): The RETURN_PRIMITIVE logic should live in the Static flow graph.
-            if instr.opname in (
-                "RETURN_VALUE",
-                "RETURN_PRIMITIVE",
-                "RAISE_VARARGS",
-                "RERAISE",
-            ):
+            op = instr.opcode
+            if op in EXIT_OPCODES:
                 block.is_exit = True
                 block.no_fallthrough = True
                 continue
-            elif instr.opname in ("JUMP_ABSOLUTE", "JUMP_FORWARD"):
+            elif op in UNCONDITIONAL_JUMP_OPCODES:
                 block.no_fallthrough = True
-            elif not instr.is_jump(self.opcode):
+            elif not jumps[op]:
                 continue
             while not instr.target.insts:
                 instr.target = instr.target.next
@@ -1135,7 +1246,7 @@ def extend_block(self, block: Block) -> None:
         if len(block.insts) == 0:
             return
         last = block.insts[-1]
-        if last.opname not in ("JUMP_ABSOLUTE", "JUMP_FORWARD"):
+        if last.opcode not in UNCONDITIONAL_JUMP_OPCODES:
             return
         target = last.target
         assert target is not None
@@ -1144,11 +1255,12 @@ def extend_block(self, block: Block) -> None:
         if len(target.insts) > MAX_COPY_SIZE:
             return
         last = block.insts[-1]
-        last.opname = "NOP"
+        last.opcode = NOP
         last.oparg = last.ioparg = 0
         last.target = None
         for instr in target.insts:
             block.insts.append(instr.copy())
+        block.stack_summary = None
         block.next = None
         block.is_exit = True
         block.no_fallthrough = True
@@ -1161,7 +1273,7 @@ def trim_unused_consts(self) -> None:
         for block in self.ordered_blocks:
             for instr in block.insts:
                 if (
-                    instr.opname in self._const_opcodes
+                    instr.opcode in self._const_opcodes
                     and instr.ioparg > max_const_index
                 ):
                     max_const_index = instr.ioparg
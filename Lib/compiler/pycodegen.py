@@ -190,9 +190,9 @@ def all_items_const(seq, begin, end):
     return True
 
 
-def find_futures(flags: int, node: ast.Module) -> int:
+def find_futures(flags: int, node: ast.Module, check_placement: bool = True) -> int:
     future_flags = flags & consts.PyCF_MASK
-    for feature in future.find_futures(node):
+    for feature in future.find_futures(node, check_placement):
         if feature == "barry_as_FLUFL":
             future_flags |= consts.CO_FUTURE_BARRY_AS_BDFL
         elif feature == "annotations":
@@ -46,6 +46,7 @@
 from .compiler import Compiler
 from .definite_assignment_checker import DefiniteAssignmentVisitor
 from .effects import NarrowingEffect, TypeState
+from .flow_graph_optimizer import FlowGraphOptimizerStatic
 from .module_table import ModuleFlag, ModuleTable
 from .type_binder import UsedRefinementField
 from .types import (
@@ -98,6 +99,7 @@ def exec_static(
 
 class PyFlowGraph38Static(PyFlowGraphCinder):
     opcode: Opcode = opcode_static.opcode
+    flow_graph_optimizer = FlowGraphOptimizerStatic
 
 
 class InitSubClassGenerator:
@@ -1086,13 +1088,26 @@ def visitIf(self, node: ast.If) -> None:
         test_type = self.get_type(node.test)
 
         test_const = self.get_bool_const(node.test)
+        final_test = None
+        if test_const is None:
+            final_test = test_const = self.cur_mod.fold_final_test(
+                node.test, self.scope
+            )
 
         end = self.newBlock("if_end")
         orelse = None
         if node.orelse:
             orelse = self.newBlock("if_else")
 
-        self.compileJumpIf(node.test, orelse or end, False)
+        if final_test is None:
+            self.compileJumpIf(node.test, orelse or end, False)
+        else:
+            # The test only reads constants, so jump on its value, which the
+            # flow graph optimizer then folds away along with the dead branch.
+            self.set_lineno(node.test)
+            self.emit("LOAD_CONST", final_test)
+            self.emit("POP_JUMP_IF_FALSE", orelse or end)
+            self.nextBlock()
         if test_const is not False:
             self.visitStatements(node.body)
 
@@ -4,9 +4,12 @@
 
 import ast
 import builtins
+import hashlib
+import sys
 from ast import AST
+from collections import OrderedDict
 from types import CodeType
-from typing import Any, Dict, Optional, Tuple, Type, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, TYPE_CHECKING
 
 from .. import consts
 from ..errors import ErrorSink
@@ -79,14 +82,31 @@ def bind_subscr(
         visitor.set_type(node, type)
 
 
+def _digest(tree: AST) -> bytes:
+    dump = ast.dump(tree, include_attributes=True)
+    return hashlib.sha256(dump.encode()).digest()
+
+
 class Compiler:
     def __init__(
         self,
         code_generator: Type[Static38CodeGenerator],
         error_sink: Optional[ErrorSink] = None,
+        max_retained_asts: Optional[int] = None,
     ) -> None:
         self.modules: Dict[str, ModuleTable] = {}
         self.ast_cache: Dict[str, ast.Module] = {}
+        # If set, the ASTs of at most this many compiled modules are kept, the
+        # most recently compiled ones, and the node data recorded while binding
+        # a module is dropped once its code is generated. The other modules
+        # are released along with their node data, keeping the declarations
+        # in `modules` that dependents need.
+        self.max_retained_asts = max_retained_asts
+        self.compiled_asts: OrderedDict[str, None] = OrderedDict()
+        self.released_asts = 0
+        # Digests of the ASTs of released modules, to tell whether the
+        # declarations they kept still match if they're compiled again.
+        self.released_digests: Dict[str, bytes] = {}
         self.code_generator = code_generator
         self.error_sink: ErrorSink = error_sink or ErrorSink()
         self.type_env: TypeEnvironment = TypeEnvironment()
@@ -460,6 +480,21 @@ def add_module(
         self, name: str, filename: str, tree: AST, optimize: int
     ) -> ast.Module:
         tree = AstOptimizer(optimize=optimize > 0).visit(tree)
+        digest = self.released_digests.pop(name, None)
+        module = self.modules.get(name)
+        if digest is not None and module is not None and _digest(tree) == digest:
+            # Declaring the module again would give dependents that are already
+            # bound against its types different ones to check against.
+            reattached = module.reattach_declarations(tree)
+            if reattached is not None:
+                self.ast_cache[name] = reattached
+                return reattached
+        return self.declare_module(name, filename, tree, optimize)
+
+    def declare_module(
+        self, name: str, filename: str, tree: ast.Module, optimize: int
+    ) -> ast.Module:
+        """Run the declaration visit over an already-optimized module AST."""
         self.ast_cache[name] = tree
 
         decl_visit = DeclarationVisitor(name, filename, self, optimize)
@@ -490,9 +525,11 @@ def _bind(
             tree = self.add_module(name, filename, tree, optimize)
         else:
             tree = cached_tree
-        # Analyze variable scopes
-        future_flags = find_futures(0, tree)
-        s = self.code_generator._SymbolVisitor(future_flags)
+        # Analyze variable scopes. Future statements are found at the top of
+        # the module, and the symbol walk checks there are none elsewhere, so
+        # that the whole tree is only walked once.
+        future_flags = find_futures(0, tree, check_placement=False)
+        s = self.code_generator._SymbolVisitor(future_flags, check_futures=True)
         s.visit(tree)
 
         # Analyze the types of objects within local scopes
@@ -539,8 +576,6 @@ def code_gen(
         graph.setFlag(consts.CO_STATICALLY_COMPILED)
         graph.extra_consts.append(tuple(self.modules[name].imported_from.items()))
 
-        future_flags = find_futures(0, tree)
-
         code_gen = self.code_generator(
             None,
             tree,
@@ -552,10 +587,62 @@ def code_gen(
             optimization_lvl=optimize,
             enable_patching=enable_patching,
             builtins=builtins,
-            future_flags=future_flags,
+            future_flags=s.future_flags,
         )
         code_gen.visit(tree)
+        if self.max_retained_asts is not None:
+            self.modules[name].release_node_data()
+            self.compiled_asts[name] = None
+            self.compiled_asts.move_to_end(name)
+            while len(self.compiled_asts) > self.max_retained_asts:
+                evicted, __ = self.compiled_asts.popitem(last=False)
+                self.release_module(evicted)
         return code_gen
 
+    def release_module(self, name: str) -> None:
+        """Drop the AST of a module and the data recorded for its nodes while
+        binding it, keeping its declarations. Compiling the module again
+        parses it and, if it hasn't changed, puts the nodes its declarations
+        refer to back in the new AST, so that its types stay the same."""
+        tree = self.ast_cache.pop(name, None)
+        if tree is not None:
+            self.released_asts += 1
+            self.released_digests[name] = _digest(tree)
+        self.compiled_asts.pop(name, None)
+        module = self.modules.get(name)
+        if module is not None:
+            module.release_node_data()
+
+    def get_retention_stats(self) -> Dict[str, int]:
+        """Report what the compiler is keeping alive, with estimated sizes in
+        bytes. This walks every retained AST, so it isn't cheap. The ASTs of
+        function and method definitions count even for released modules,
+        since their declarations still refer to them."""
+        roots: List[AST] = list(self.ast_cache.values())
+        for module in self.modules.values():
+            roots.extend(module.declaration_nodes())
+        seen: Set[int] = set()
+        ast_bytes = 0
+        for root in roots:
+            if id(root) in seen:
+                continue
+            for node in ast.walk(root):
+                if id(node) not in seen:
+                    seen.add(id(node))
+                    ast_bytes += sys.getsizeof(node) + sys.getsizeof(vars(node))
+        node_data_bytes = sum(
+            sys.getsizeof(module.types) for module in self.modules.values()
+        )
+        return {
+            "modules": len(self.modules),
+            "asts": len(self.ast_cache),
+            "compiled_asts": len(self.compiled_asts),
+            "released_asts": self.released_asts,
+            "node_entries": sum(len(module.types) for module in self.modules.values()),
+            "ast_bytes": ast_bytes,
+            "node_data_bytes": node_data_bytes,
+            "retained_bytes": ast_bytes + node_data_bytes,
+        }
+
     def import_module(self, name: str, optimize: int) -> Optional[ModuleTable]:
         pass
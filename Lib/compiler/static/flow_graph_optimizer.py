@@ -0,0 +1,198 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+from __future__ import annotations
+
+from _static import TYPED_BOOL, TYPED_DOUBLE, TYPED_INT64, TYPED_OBJECT
+
+from ..flow_graph_optimizer import FlowGraphOptimizer, NOP
+from ..opcode_static import opcode
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Optional
+
+    from ..pyassem import Block, Instruction
+
+    from .types import TypeDescr
+
+
+CAST: int = opcode.CAST
+DUP_TOP: int = opcode.DUP_TOP
+LOAD_CONST: int = opcode.LOAD_CONST
+LOAD_LOCAL: int = opcode.LOAD_LOCAL
+PRIMITIVE_BOX: int = opcode.PRIMITIVE_BOX
+PRIMITIVE_UNBOX: int = opcode.PRIMITIVE_UNBOX
+REFINE_TYPE: int = opcode.REFINE_TYPE
+STORE_LOCAL: int = opcode.STORE_LOCAL
+
+# Type descr suffixes marking exact and optional types.
+EXACT = "!"
+OPTIONAL = "?"
+
+# Primitives whose values are left unchanged by STORE_LOCAL and by boxing and
+# unboxing. Narrower integers are truncated to their width by STORE_LOCAL and
+# overflow checked by PRIMITIVE_UNBOX, so those can't be peepholed away.
+FULL_WIDTH_PRIMITIVES = (TYPED_INT64, TYPED_DOUBLE)
+FULL_WIDTH_PRIMITIVE_DESCRS = (
+    ("__static__", "int64", "#"),
+    ("__static__", "double", "#"),
+)
+
+
+def cast_is_redundant(source: TypeDescr, target: TypeDescr) -> bool:
+    """Whether a value whose exact type is `source` (a plain, non-generic type
+    descr) always passes a CAST to `target`."""
+    if target[:2] != source:
+        return False
+    return all(marker in (EXACT, OPTIONAL) for marker in target[2:])
+
+
+class FlowGraphOptimizerStatic(FlowGraphOptimizer):
+    """Adds peepholes for the Static Python opcodes to the generic ones.
+
+    These rely on what the static compiler emits, rather than on a type
+    analysis of the graph: PRIMITIVE_BOX pushes an exact int or float, a
+    LOAD_CONST pushes a constant of a known exact type, a CAST guarantees the
+    type it casts to, and locals accessed with LOAD_LOCAL and STORE_LOCAL are
+    only touched by those opcodes."""
+
+    def next_instr_index(self, block: Block, instr_index: int) -> Optional[int]:
+        """Return the index of the first instruction after `instr_index` in
+        `block` that isn't a NOP left behind by an earlier peephole."""
+        for index in range(instr_index + 1, len(block.insts)):
+            if block.insts[index].opcode != NOP:
+                return index
+        return None
+
+    def exact_type_descr(self, instr: Instruction) -> Optional[TypeDescr]:
+        """The type descr of the exact type of the value `instr` pushes, if
+        it's known."""
+        if instr.opcode == PRIMITIVE_BOX:
+            if instr.ioparg == TYPED_DOUBLE:
+                return ("builtins", "float")
+            elif instr.ioparg not in (TYPED_BOOL, TYPED_OBJECT):
+                return ("builtins", "int")
+        elif instr.opcode == LOAD_CONST:
+            const_type = type(instr.oparg)
+            if const_type.__module__ == "builtins":
+                return ("builtins", const_type.__qualname__)
+        elif instr.opcode == CAST:
+            descr = instr.oparg
+            if len(descr) == 3 and descr[2] == EXACT:
+                return descr[:2]
+
+    def nop(self, instr: Instruction) -> None:
+        instr.opcode = NOP
+        instr.oparg = instr.ioparg = 0
+
+    def opt_known_type(
+        self,
+        instr_index: int,
+        instr: Instruction,
+        next_instr: Instruction | None,
+        target: Instruction | None,
+        block: Block,
+    ) -> Optional[int]:
+        # Remove casts (and type refinements for the JIT) of values whose type
+        # is known to pass them: an exact type, or the same cast again.
+        next_index = self.next_instr_index(block, instr_index)
+        if next_index is None:
+            return
+        next_instr = block.insts[next_index]
+        if next_instr.opcode not in (CAST, REFINE_TYPE):
+            return
+        descr = self.exact_type_descr(instr)
+        if (descr is not None and cast_is_redundant(descr, next_instr.oparg)) or (
+            instr.opcode == CAST and instr.oparg == next_instr.oparg
+        ):
+            self.nop(next_instr)
+            return instr_index
+
+    def opt_load_const(
+        self,
+        instr_index: int,
+        instr: Instruction,
+        next_instr: Instruction | None,
+        target: Instruction | None,
+        block: Block,
+    ) -> Optional[int]:
+        super().opt_load_const(instr_index, instr, next_instr, target, block)
+        if instr.opcode == LOAD_CONST:
+            return self.opt_known_type(instr_index, instr, next_instr, target, block)
+
+    def opt_primitive_box(
+        self,
+        instr_index: int,
+        instr: Instruction,
+        next_instr: Instruction | None,
+        target: Instruction | None,
+        block: Block,
+    ) -> Optional[int]:
+        # PRIMITIVE_BOX t; PRIMITIVE_UNBOX t: the primitive is already on the
+        # stack (any cast in between was removed by opt_known_type), and for a
+        # full width t, can't overflow.
+        new_index = self.opt_known_type(instr_index, instr, next_instr, target, block)
+        if new_index is not None:
+            return new_index
+        next_index = self.next_instr_index(block, instr_index)
+        if next_index is None:
+            return
+        next_instr = block.insts[next_index]
+        if (
+            next_instr.opcode == PRIMITIVE_UNBOX
+            and next_instr.ioparg == instr.ioparg
+            and instr.ioparg in FULL_WIDTH_PRIMITIVES
+        ):
+            self.nop(instr)
+            self.nop(next_instr)
+
+    def opt_load_local(
+        self,
+        instr_index: int,
+        instr: Instruction,
+        next_instr: Instruction | None,
+        target: Instruction | None,
+        block: Block,
+    ) -> Optional[int]:
+        # LOAD_LOCAL x; STORE_LOCAL x stores back the value already there.
+        if (
+            next_instr is not None
+            and next_instr.opcode == STORE_LOCAL
+            and next_instr.oparg == instr.oparg
+        ):
+            self.nop(instr)
+            self.nop(next_instr)
+
+    def opt_store_local(
+        self,
+        instr_index: int,
+        instr: Instruction,
+        next_instr: Instruction | None,
+        target: Instruction | None,
+        block: Block,
+    ) -> Optional[int]:
+        # STORE_LOCAL x; LOAD_LOCAL x -> DUP_TOP; STORE_LOCAL x, keeping the
+        # value on the stack instead of reloading it. Only done for full width
+        # primitives, whose stores don't truncate, and within a line, so that
+        # line events stay where they were.
+        if (
+            instr.oparg[1] in FULL_WIDTH_PRIMITIVE_DESCRS
+            and next_instr is not None
+            and next_instr.opcode == LOAD_LOCAL
+            and next_instr.oparg == instr.oparg
+            and next_instr.lineno == instr.lineno
+        ):
+            next_instr.opcode = STORE_LOCAL
+            next_instr.ioparg = instr.ioparg
+            instr.opcode = DUP_TOP
+            instr.oparg = instr.ioparg = 0
+            return instr_index + 2
+
+    _handlers: Dict[int, Callable[..., Optional[int]]] = {
+        **FlowGraphOptimizer._handlers,
+        LOAD_CONST: opt_load_const,
+        CAST: opt_known_type,
+        PRIMITIVE_BOX: opt_primitive_box,
+        LOAD_LOCAL: opt_load_local,
+        STORE_LOCAL: opt_store_local,
+    }
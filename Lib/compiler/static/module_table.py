@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import ast
+import sys
 from ast import (
     AST,
     Attribute,
@@ -20,6 +21,8 @@
     cast,
     ContextManager,
     Dict,
+    final,
+    Iterable,
     List,
     Optional,
     overload,
@@ -53,6 +56,7 @@
     UnknownDecoratedMethod,
     Value,
 )
+from .util import COMPARE_OPS
 from .visitor import GenericVisitor
 
 if TYPE_CHECKING:
@@ -68,6 +72,166 @@ class ModuleTableException(Exception):
     pass
 
 
+def _bound_names(tree: ast.Module) -> Dict[str, int]:
+    """Count the bindings of each name anywhere in `tree`, in any scope."""
+    counts: Dict[str, int] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, Name):
+            if isinstance(node.ctx, ast.Load):
+                continue
+            names = [node.id]
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ClassDef)):
+            names = [node.name]
+        elif isinstance(node, ast.Import):
+            names = [alias.asname or alias.name.split(".")[0] for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [alias.asname or alias.name for alias in node.names]
+        elif isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)):
+            names = [node.name] if node.name else []
+        elif isinstance(node, ast.MatchMapping):
+            names = [node.rest] if node.rest else []
+        else:
+            continue
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+_Position = Tuple[type, int, int, Optional[int], Optional[int]]
+
+
+def _position(node: AST) -> Optional[_Position]:
+    lineno = getattr(node, "lineno", None)
+    if lineno is None:
+        return None
+    return (type(node), lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+
+
+class _Reattacher(ast.NodeTransformer):
+    """Replaces the nodes of a tree with the node of the same type and
+    position in `nodes`, if there is one."""
+
+    def __init__(self, nodes: Dict[_Position, AST]) -> None:
+        self.nodes = nodes
+
+    def visit(self, node: AST) -> AST:
+        position = _position(node)
+        if position is not None:
+            replacement = self.nodes.get(position)
+            if replacement is not None:
+                return replacement
+        return self.generic_visit(node)
+
+
+# Attribute holding an AST node's id in the NodeTable of its module.
+_NODE_ID = "_static_node_id"
+
+
+@final
+class NodeTable:
+    """The types and other data recorded for the AST nodes of a module.
+
+    Each node is given a dense id, stored on the node, the first time anything
+    is recorded for it. Types are kept in a list indexed by id, and other data
+    in a dict per kind keyed by id, so lookups neither hash nodes nor build
+    (node, kind) tuples. Nodes that already have an id in another module's
+    table (e.g. shared with a function inlined from that module) are found
+    through `foreign` instead.
+
+    Indexing the table with a node gets or sets its type."""
+
+    __slots__ = ("nodes", "types", "data", "foreign")
+
+    def __init__(self) -> None:
+        self.nodes: List[AST] = []
+        self.types: List[Optional[Value]] = []
+        self.data: Dict[object, Dict[int, object]] = {}
+        self.foreign: Dict[AST, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __sizeof__(self) -> int:
+        return (
+            object.__sizeof__(self)
+            + sys.getsizeof(self.nodes)
+            + sys.getsizeof(self.types)
+            + sys.getsizeof(self.data)
+            + sum(sys.getsizeof(data) for data in self.data.values())
+            + sys.getsizeof(self.foreign)
+        )
+
+    def find(self, node: AST) -> int:
+        """Return the id of node, or -1 if nothing is recorded for it."""
+        node_id = getattr(node, _NODE_ID, -1)
+        if 0 <= node_id < len(self.nodes) and self.nodes[node_id] is node:
+            return node_id
+        return self.foreign.get(node, -1)
+
+    def add(self, node: AST) -> int:
+        node_id = self.find(node)
+        if node_id < 0:
+            node_id = len(self.nodes)
+            if hasattr(node, _NODE_ID):
+                self.foreign[node] = node_id
+            else:
+                setattr(node, _NODE_ID, node_id)
+            self.nodes.append(node)
+            self.types.append(None)
+        return node_id
+
+    def __getitem__(self, node: AST) -> Value:
+        node_id = self.find(node)
+        typ = self.types[node_id] if node_id >= 0 else None
+        if typ is None:
+            raise KeyError(node)
+        return typ
+
+    def __setitem__(self, node: AST, typ: Value) -> None:
+        self.types[self.add(node)] = typ
+
+    def __contains__(self, node: AST) -> bool:
+        node_id = self.find(node)
+        return node_id >= 0 and self.types[node_id] is not None
+
+    def get(self, node: AST, default: Optional[Value] = None) -> Optional[Value]:
+        node_id = self.find(node)
+        typ = self.types[node_id] if node_id >= 0 else None
+        return default if typ is None else typ
+
+    def get_data(self, node: AST, data_type: object) -> object:
+        node_id = self.find(node)
+        data = self.data.get(data_type)
+        if node_id < 0 or data is None or node_id not in data:
+            raise KeyError((node, data_type))
+        return data[node_id]
+
+    def get_opt_data(self, node: AST, data_type: object) -> object:
+        data = self.data.get(data_type)
+        if data is None:
+            return None
+        return data.get(self.find(node))
+
+    def set_data(self, node: AST, data_type: object, value: object) -> None:
+        data = self.data.get(data_type)
+        if data is None:
+            data = self.data[data_type] = {}
+        data[self.add(node)] = value
+
+    def truncate(self, size: int) -> None:
+        """Forget everything recorded for the nodes added after the first
+        `size`, and remove their ids, so the table no longer refers to them."""
+        for node_id in range(size, len(self.nodes)):
+            node = self.nodes[node_id]
+            if node not in self.foreign:
+                delattr(node, _NODE_ID)
+        del self.nodes[size:]
+        del self.types[size:]
+        for kind, data in self.data.items():
+            self.data[kind] = {k: v for k, v in data.items() if k < size}
+        self.foreign = {k: v for k, v in self.foreign.items() if v < size}
+
+
 class ReferenceVisitor(GenericVisitor[Optional[Value]]):
     def __init__(self, module: ModuleTable) -> None:
         super().__init__(module)
@@ -210,8 +374,12 @@ def __init__(
         if members is not None:
             self._children.update(members)
         self.compiler = compiler
-        self.types: Dict[AST, Value] = {}
-        self.node_data: Dict[Tuple[AST, object], object] = {}
+        # Types and other data for the nodes of the module, filled in by the
+        # declaration visit and type binding, and used by code generation.
+        self.types = NodeTable()
+        # Number of nodes recorded by the declaration visit, which are kept
+        # when the rest of the node data is released.
+        self.declared_nodes = 0
         self.flags: Set[ModuleFlag] = set()
         self.decls: List[Tuple[AST, Optional[str], Optional[Value]]] = []
         self.implicit_decl_names: Set[str] = set()
@@ -222,6 +390,9 @@ def __init__(
         # TODO: final constants should be typed to literals, and
         # this should be removed in the future
         self.named_finals: Dict[str, ast.Constant] = {}
+        # Names in `imported_from` that are bound again somewhere in the
+        # module, so can't be replaced by the Final they were imported as
+        self.rebound_imports: Set[str] = set()
         # Have we completed our first pass through the module, populating
         # imports and types defined in the module? Until we have, resolving
         # type annotations is not safe.
@@ -342,9 +513,19 @@ def finish_bind(self) -> None:
         for name in self.implicit_decl_names:
             if name not in self._children:
                 self._children[name] = self.compiler.type_env.DYNAMIC
+        if self.imported_from:
+            tree = self.compiler.ast_cache.get(self.name)
+            if tree is None:
+                self.rebound_imports = set(self.imported_from)
+            else:
+                counts = _bound_names(tree)
+                self.rebound_imports = {
+                    name for name in self.imported_from if counts.get(name, 0) > 1
+                }
         # We don't need these anymore...
         self.decls.clear()
         self.implicit_decl_names.clear()
+        self.declared_nodes = len(self.types)
 
     def resolve_type(self, node: ast.AST) -> Optional[Class]:
         typ = self.ann_visitor.visit(node)
@@ -396,6 +577,8 @@ def get_final_literal(self, node: AST, scope: Scope) -> Optional[ast.Constant]:
             return None
 
         final_val = self.named_finals.get(node.id, None)
+        if final_val is None:
+            final_val = self.get_imported_final(node.id)
         if (
             final_val is not None
             and isinstance(node.ctx, ast.Load)
@@ -407,6 +590,72 @@ def get_final_literal(self, node: AST, scope: Scope) -> Optional[ast.Constant]:
         ):
             return final_val
 
+    def get_imported_final(self, name: str) -> Optional[ast.Constant]:
+        """The Final constant `name` was imported as, following from-imports
+        through static modules, or None if it isn't one or it's rebound in a
+        module along the way. Only Finals assigned a constant are found, not
+        ones assigned other expressions, even if their type is a literal."""
+        module = self
+        seen: Set[Tuple[str, str]] = set()
+        while name not in module.named_finals:
+            source = module.imported_from.get(name)
+            if (
+                source is None
+                or name in module.rebound_imports
+                or (module.name, name) in seen
+            ):
+                return None
+            seen.add((module.name, name))
+            next_module = self.compiler.modules.get(source[0])
+            if next_module is None:
+                return None
+            module, name = next_module, source[1]
+        return module.named_finals[name]
+
+    def fold_final_test(self, node: ast.expr, scope: Scope) -> Optional[bool]:
+        """The truth value of a test made only of constants, Final literals
+        (including imported ones), `not`, `and`/`or` and comparisons, or None
+        if it can't be determined at compile time."""
+        folded = self._fold_final_expr(node, scope)
+        return None if folded is None else bool(folded.value)
+
+    def _fold_final_expr(self, node: ast.expr, scope: Scope) -> Optional[Constant]:
+        if isinstance(node, Constant):
+            return node
+        elif isinstance(node, Name):
+            return self.get_final_literal(node, scope)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = self._fold_final_expr(node.operand, scope)
+            if operand is not None:
+                return Constant(not operand.value)
+        elif isinstance(node, ast.BoolOp):
+            is_or = isinstance(node.op, ast.Or)
+            folded = None
+            for value in node.values:
+                folded = self._fold_final_expr(value, scope)
+                if folded is None or bool(folded.value) == is_or:
+                    return folded
+            return folded
+        elif isinstance(node, ast.Compare):
+            left = self._fold_final_expr(node.left, scope)
+            for op, comparator in zip(node.ops, node.comparators):
+                # `is` depends on the identity of the objects, which constants
+                # in code objects don't preserve.
+                compare = COMPARE_OPS.get(type(op))
+                if compare is None or isinstance(op, (ast.Is, ast.IsNot)):
+                    return None
+                right = self._fold_final_expr(comparator, scope)
+                if left is None or right is None:
+                    return None
+                try:
+                    result = compare(left.value, right.value)
+                except Exception:
+                    return None
+                if not result:
+                    return Constant(False)
+                left = right
+            return Constant(True)
+
     def declare_import(
         self, name: str, source: Tuple[str, str] | None, val: Value | DeferredValue
     ) -> None:
@@ -435,13 +684,58 @@ def declare_variables(self, node: ast.Assign, module: ModuleTable) -> None:
                 self.implicit_decl_names.add(target.id)
 
     def get_node_data(self, key: AST, data_type: Type[TType]) -> TType:
-        return cast(TType, self.node_data[key, data_type])
+        return cast(TType, self.types.get_data(key, data_type))
 
     def get_opt_node_data(self, key: AST, data_type: Type[TType]) -> TType | None:
-        return cast(Optional[TType], self.node_data.get((key, data_type)))
+        return cast(Optional[TType], self.types.get_opt_data(key, data_type))
 
     def set_node_data(self, key: AST, data_type: Type[TType], value: TType) -> None:
-        self.node_data[key, data_type] = value
+        self.types.set_data(key, data_type, value)
+
+    def release_node_data(self) -> None:
+        """Drop the types and data recorded while binding the module, once its
+        code has been generated. What the declaration visit recorded is kept,
+        so the module's AST can still be bound and compiled again."""
+        self.types.truncate(self.declared_nodes)
+
+    def reattach_declarations(self, tree: ast.Module) -> Optional[ast.Module]:
+        """Put the nodes the declaration visit recorded, which outlive the
+        module's AST when the compiler releases it, in place of their
+        counterparts in `tree`, a new AST of the same source. Returns the
+        resulting tree, or None if some of them can't be placed, in which
+        case the module has to be declared again."""
+        declared = self.types.nodes[: self.declared_nodes]
+        declared.extend(node for node, __, __ in self.decls)
+        by_position: Dict[_Position, AST] = {}
+        for node in declared:
+            position = _position(node)
+            if position is None or by_position.setdefault(position, node) is not node:
+                return None
+        tree = _Reattacher(by_position).visit(tree)
+        present = {id(node) for node in ast.walk(tree)}
+        if not all(id(node) in present for node in declared):
+            return None
+        return tree
+
+    def declaration_nodes(self) -> Iterable[AST]:
+        """Yield the AST nodes kept alive by the module's declarations, such as
+        the definitions of its functions and methods. These outlive the
+        module's AST when the compiler releases it."""
+        pending: List[object] = list(self._children.values())
+        seen: Set[int] = set()
+        while pending:
+            value = pending.pop()
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+            node = getattr(value, "node", None)
+            if isinstance(node, AST):
+                yield node
+            if isinstance(value, Class) and value.type_name.module == self.name:
+                pending.extend(value.members.values())
+            function = getattr(value, "function", None)
+            if function is not None:
+                pending.append(function)
 
     def mark_known_boolean_test(self, node: ast.expr, *, value: bool) -> None:
         """
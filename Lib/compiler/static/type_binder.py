@@ -58,6 +58,7 @@
     Optional,
     Sequence,
     Set,
+    Tuple,
     Type,
     TYPE_CHECKING,
     Union,
@@ -287,6 +288,112 @@ class TerminalKind(IntEnum):
     RaiseOrReturn = 2
 
 
+# Number of iterations over a loop body after which the types of locals that
+# are still changing get widened to their non-literal types, and after twice
+# as many, to their declared types, so that fixed-point iteration converges.
+# Locals first assigned in the loop body have no declared type, so they become
+# dynamic: a loop that used to converge after 9 to 50 iterations now compiles
+# those locals as dynamic rather than with their narrowed types. Primitive
+# locals are never widened to dynamic.
+FIXED_POINT_WIDENING_ITERATIONS = 4
+
+# Placeholder for a local with no type in the state recorded by LoopStatementMemo.
+_UNBOUND = object()
+
+
+def loop_statement_names(stmt: ast.stmt) -> Optional[Tuple[str, ...]]:
+    """Return the names that binding `stmt` may read or bind, or None if they
+    can't all be found syntactically (e.g. zero-argument super())."""
+    names = set()
+    for node in ast.walk(stmt):
+        if isinstance(node, Name):
+            if node.id == "super":
+                return None
+            names.add(node.id)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).partition(".")[0])
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(
+            node,
+            (
+                FunctionDef,
+                AsyncFunctionDef,
+                ClassDef,
+                ast.ExceptHandler,
+                ast.MatchAs,
+                ast.MatchStar,
+            ),
+        ):
+            if node.name:
+                names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return tuple(sorted(names))
+
+
+class LoopStatementMemo:
+    """What binding a statement of a loop body read and wrote the last time it
+    was bound during fixed-point iteration: the types and declarations of the
+    locals it names, and the refined fields. If its inputs are unchanged, the
+    statement can be skipped and its outputs replayed."""
+
+    def __init__(
+        self, binder: TypeBinder, names: Tuple[str, ...], inputs: LoopStatementState
+    ) -> None:
+        self.names = names
+        self.inputs = inputs
+        self.outputs: LoopStatementState = self.capture(binder, names)
+        self.output_decls: Tuple[Optional[TypeDeclaration], ...] = tuple(
+            binder.decl_types.get(name) for name in names
+        )
+
+    @staticmethod
+    def capture(binder: TypeBinder, names: Tuple[str, ...]) -> LoopStatementState:
+        local_types = binder.type_state.local_types
+        decl_types = binder.decl_types
+        decls = []
+        for name in names:
+            decl = decl_types.get(name)
+            decls.append(None if decl is None else (decl.type, decl.is_final))
+        return (
+            tuple(local_types.get(name, _UNBOUND) for name in names),
+            tuple(decls),
+            {
+                key: dict(fields)
+                for key, fields in binder.type_state.refined_fields.items()
+            },
+        )
+
+    def replay(self, binder: TypeBinder) -> None:
+        local_types = binder.type_state.local_types
+        decl_types = binder.decl_types
+        types, __, refined_fields = self.outputs
+        for name, typ, decl in zip(self.names, types, self.output_decls):
+            if typ is _UNBOUND:
+                local_types.pop(name, None)
+            else:
+                local_types[name] = typ
+            if decl is None:
+                decl_types.pop(name, None)
+            else:
+                decl_types[name] = decl
+        binder.type_state.refined_fields = {
+            key: dict(fields) for key, fields in refined_fields.items()
+        }
+
+
+if TYPE_CHECKING:
+    # (local types, declarations, refined fields)
+    LoopStatementState = Tuple[
+        Tuple[object, ...],
+        Tuple[Optional[Tuple[Value, bool]], ...],
+        Dict[str, Dict[str, object]],
+    ]
+
+
 class TypeBinder(GenericVisitor[Optional[NarrowingEffect]]):
     """Walks an AST and produces an optionally strongly typed AST, reporting errors when
     operations are occuring that are not sound.  Strong types are based upon places where
@@ -316,6 +423,9 @@ def __init__(
         self.loop_may_break: Set[AST] = set()
         self.visiting_assignment_target = False
         self._refined_tmpvar_indices: Dict[str, int] = {}
+        # Kept while binding the outermost loop; see bind_loop_body.
+        self._loop_statement_memos: Dict[AST, Optional[LoopStatementMemo]] = {}
+        self._loop_statement_names: Dict[AST, Optional[Tuple[str, ...]]] = {}
 
     @property
     def nodes_default_dynamic(self) -> bool:
@@ -1860,19 +1970,23 @@ def visitExceptHandler(self, node: ast.ExceptHandler) -> None:
     def iterate_to_fixed_point(
         self, body: Sequence[ast.stmt], test: ast.expr | None = None
     ) -> None:
-        """Iterate given loop body until local types reach a fixed point."""
+        """Iterate given loop body until local types reach a fixed point.
+
+        Only the statements whose inputs changed since they were last bound
+        are bound again (see bind_loop_body), and locals that keep changing
+        are widened, so nested loops don't multiply the work."""
         branch: LocalsBranch | None = None
         counter = 0
         entry_decls = self.decl_types.copy()
         while (not branch) or branch.changed():
+            if branch is not None and counter >= FIXED_POINT_WIDENING_ITERATIONS:
+                self.widen_loop_locals(
+                    branch, to_declared=counter >= 2 * FIXED_POINT_WIDENING_ITERATIONS
+                )
             branch = self.binding_scope.branch()
             counter += 1
             if counter > 50:
-                # TODO today it should not be possible to hit this case, but in
-                # the future with more complex types or more accurate tracking
-                # of literal types (think `x += 1` in a loop) it could become
-                # possible, and we'll need a smarter approach here: union all
-                # types seen? fall back to declared type?
+                # Widening to declared types should make this impossible.
                 raise AssertionError("Too many loops in fixed-point iteration.")
             with self.temporary_error_sink(CollectingErrorSink()):
                 if test is not None:
@@ -1880,11 +1994,63 @@ def iterate_to_fixed_point(
                     effect.apply(self.type_state)
                     self.clear_refinements_for_nonbool_test(test)
 
-                terminates = self.visit_check_terminal(body)
+                self.bind_loop_body(body)
                 # reset any declarations from the loop body to avoid redeclaration errors
                 self.binding_scope.decl_types = entry_decls.copy()
             branch.merge()
 
+    def widen_loop_locals(self, branch: LocalsBranch, to_declared: bool) -> None:
+        """Widen the locals whose types changed in the last iteration over a
+        loop body to their non-literal types, or to their declared types."""
+        local_types = self.type_state.local_types
+        entry_types = branch.entry_type_state.local_types
+        for name, typ in local_types.items():
+            if entry_types.get(name) == typ:
+                continue
+            if to_declared:
+                decl = self.get_target_decl(name)
+                if decl is not None:
+                    local_types[name] = decl.type
+                elif isinstance(typ, CInstance):
+                    # Primitives can't be boxed implicitly, so never dynamic.
+                    local_types[name] = typ.nonliteral()
+                else:
+                    # Locals declared in the loop body are inferred, so dynamic.
+                    local_types[name] = self.type_env.DYNAMIC
+            else:
+                local_types[name] = typ.nonliteral()
+
+    def bind_loop_body(self, body: Sequence[ast.stmt]) -> None:
+        """Bind the statements of a loop body for fixed-point iteration.
+
+        A statement whose inputs (the types and declarations of the locals it
+        names, and the refined fields) are the same as the last time it was
+        bound, in this iteration over the loop or an earlier one, is skipped,
+        and its outputs are replayed instead. Statements that inline calls
+        read locals they don't name, so they are always bound."""
+        for stmt in body:
+            if stmt in self._loop_statement_names:
+                names = self._loop_statement_names[stmt]
+            else:
+                names = self._loop_statement_names[stmt] = loop_statement_names(stmt)
+            if names is None:
+                self.visit(stmt)
+                continue
+
+            inputs = LoopStatementMemo.capture(self, names)
+            memo = self._loop_statement_memos.get(stmt)
+            if memo is not None and memo.inputs == inputs:
+                memo.replay(self)
+                continue
+
+            inline_calls = self.inline_calls
+            self.visit(stmt)
+            self._loop_statement_memos[stmt] = (
+                LoopStatementMemo(self, names, inputs)
+                if self.inline_calls == inline_calls
+                else None
+            )
+
     @contextmanager
     def in_loop(self, node: AST) -> Generator[None, None, None]:
         orig = self.current_loop
@@ -1893,6 +2059,8 @@ def in_loop(self, node: AST) -> Generator[None, None, None]:
             yield
         finally:
             self.current_loop = orig
+            if orig is None:
+                self._loop_statement_memos.clear()
 
     def visitWhile(self, node: While) -> None:
         self.set_node_data(node, PreserveRefinedFields, PRESERVE_REFINED_FIELDS)
@@ -0,0 +1,191 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""A content-addressed, cross-process cache of strict module analysis results.
+
+`StrictModuleLoader.check_source` runs the full strict module analysis, which
+dominates the cost of regenerating a pyc whose source didn't actually change
+(e.g. after a `git checkout` bumped its mtime). This cache stores the parts of
+the `StrictAnalysisResult` the compiler needs, keyed by everything that goes
+into the analysis of a single file: its source, name and path, the stubs, the
+allow-list configuration, and the sources of the modules on the import path
+that it imports at module level, directly or not.
+
+Like the strict module loader, the cache assumes sources don't change while a
+compiler is alive: the sources of imported modules are only read once.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib.util
+import io
+import os
+import pickle
+import symtable
+
+# pyre-ignore[21]: There's no stub for this one.
+from importlib._bootstrap_external import _write_atomic
+from typing import Callable, Dict, List, Optional, Tuple
+
+from _strictmodule import StrictAnalysisResult
+
+from .common import MAGIC_NUMBER, module_level_imports
+from .interface import _ASTUnpickler
+
+# Bump this whenever the contents of cache entries change.
+ANALYSIS_CACHE_VERSION = 1
+
+
+def _imports(source: bytes, filename: str, package: str) -> List[str]:
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        # The analysis will report the error.
+        return []
+    names = []
+    for imported in module_level_imports(tree.body, package):
+        # `import a.b.c` also imports `a` and `a.b`.
+        parts = imported.split(".")
+        names.extend(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+    return names
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        cache_dir: str,
+        loader_config: bytes,
+        find_source: Callable[[str], Optional[str]],
+    ) -> None:
+        """`loader_config` is the loader_config_hash() of the stubs and
+        allow-list the cached modules are analyzed with, and `find_source`
+        returns the path of a module's source on the import path, if any."""
+        self.cache_dir = cache_dir
+        self.find_source = find_source
+        self.hits = 0
+        self.misses = 0
+        # The source hash and imports of each module looked up on the import
+        # path, or None if it isn't there.
+        self._modules: Dict[str, Optional[Tuple[bytes, List[str]]]] = {}
+        h = hashlib.sha256()
+        h.update(importlib.util.MAGIC_NUMBER)
+        h.update(MAGIC_NUMBER.to_bytes(2, "little"))
+        h.update(ANALYSIS_CACHE_VERSION.to_bytes(2, "little"))
+        h.update(loader_config)
+        # Everything but the module itself; computed once per compiler.
+        self.config_hash: bytes = h.digest()
+
+    def key(
+        self,
+        source: str | bytes,
+        filename: str,
+        name: str,
+        submodule_search_locations: List[str],
+        force_strict: bool,
+    ) -> str:
+        if isinstance(source, str):
+            source = source.encode()
+        h = hashlib.sha256(self.config_hash)
+        module = (filename, name, submodule_search_locations, force_strict)
+        h.update(repr(module).encode())
+        h.update(hashlib.sha256(source).digest())
+
+        # The analysis follows imports into the strict modules on the import
+        # path, so their sources are part of the key too.
+        package = name if submodule_search_locations else name.rpartition(".")[0]
+        pending = _imports(source, filename, package)
+        seen = {name}
+        deps = []
+        while pending:
+            dep = pending.pop()
+            if dep in seen:
+                continue
+            seen.add(dep)
+            info = self._module(dep)
+            if info is not None:
+                deps.append((dep, info[0]))
+                pending.extend(info[1])
+        for dep, digest in sorted(deps):
+            h.update(dep.encode() + b"\0" + digest)
+        return h.hexdigest()
+
+    def _module(self, name: str) -> Optional[Tuple[bytes, List[str]]]:
+        if name in self._modules:
+            return self._modules[name]
+        info = None
+        path = self.find_source(name)
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    source = f.read()
+            except OSError:
+                source = None
+            if source is not None:
+                is_package = os.path.basename(path) == "__init__.py"
+                package = name if is_package else name.rpartition(".")[0]
+                info = (
+                    hashlib.sha256(source).digest(),
+                    _imports(source, path, package),
+                )
+        self._modules[name] = info
+        return info
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str, source: str | bytes) -> Optional[StrictAnalysisResult]:
+        """Return the cached analysis of `source`, or None on a miss."""
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            (
+                module_name,
+                file_name,
+                module_kind,
+                stub_kind,
+                tree,
+                tree_preprocessed,
+                errors,
+            ) = _ASTUnpickler(io.BytesIO(data)).load()
+            # Symbol tables can't be pickled, but are cheap to rebuild.
+            symbols = symtable.symtable(source, file_name, "exec")
+            result = StrictAnalysisResult(
+                module_name,
+                file_name,
+                module_kind,
+                stub_kind,
+                tree,
+                tree_preprocessed,
+                # pyre-ignore[16]: `SymbolTable` has no attribute `_table`.
+                symbols._table,
+                errors,
+            )
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: StrictAnalysisResult) -> None:
+        """Cache a successful analysis. Failures to write are ignored."""
+        if not result.is_valid:
+            return
+        try:
+            data = pickle.dumps(
+                (
+                    result.module_name,
+                    result.file_name,
+                    result.module_kind,
+                    result.stub_kind,
+                    result.ast,
+                    result.ast_preprocessed,
+                    [tuple(error) for error in result.errors],
+                ),
+                pickle.HIGHEST_PROTOCOL,
+            )
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, data)
+        except (OSError, pickle.PicklingError, RecursionError):
+            pass
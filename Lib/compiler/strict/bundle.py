@@ -0,0 +1,273 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""Serve many compiled modules from one memory-mapped bundle file.
+
+    python -m compiler.strict.bundle -o OUTPUT [-p PATH] SOURCE [SOURCE ...]
+
+A bundle holds the marshalled code of many modules, compiled with the strict
+loader (so strict and static modules keep their semantics), followed by an
+index of module name to location. `install_bundle` maps the file once and
+puts a `BundleFinder` at the front of `sys.meta_path`; after that, importing a
+bundled module needs no `stat` or `open` calls, and its code is only
+unmarshalled when the module is actually executed. Because the file is mapped
+read-only and shared, forked workers share its pages in the page cache.
+
+This supersedes the Experiments/icepack prototype, which needed code objects
+backed by the buffer protocol. Bundles instead store ordinary marshal data.
+
+Layout (little-endian):
+
+    header: b"PYBUNDLE", importlib MAGIC_NUMBER, strict MAGIC_NUMBER (u16),
+            BUNDLE_VERSION (u16), flags (u32), index offset (u64),
+            index size (u64)
+    marshalled code objects, one per module
+    index: marshal of {name: (code offset, code size, flags, filename)}
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import marshal
+import mmap
+import os
+import struct
+import sys
+
+# pyre-ignore[21]: There's no stub for this one.
+from importlib._bootstrap_external import _write_atomic
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import ModuleSpec
+from types import CodeType, ModuleType
+from typing import (
+    Callable,
+    Dict,
+    final,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from .batch import find_sources
+from .common import MAGIC_NUMBER
+from .loader import exec_strict_module, get_module_name, StrictSourceFileLoader
+
+BUNDLE_VERSION = 1
+
+_HEADER = struct.Struct("<8s4sHHIQQ")
+_BUNDLE_MAGIC = b"PYBUNDLE"
+
+# Bundle flags
+_BUNDLE_PATCHING = 1
+
+# Module flags
+_MODULE_PACKAGE = 1
+_MODULE_STRICT = 2
+
+# (code offset, code size, flags, filename)
+BundleEntry = Tuple[int, int, int, str]
+
+InitCachedProperties = Callable[
+    [Mapping[str, "str | Tuple[str, bool]"]],
+    Callable[[Type[object]], Type[object]],
+]
+
+
+def build_bundle(
+    output: str,
+    sources: Iterable[str],
+    loader_options: Optional[Dict[str, str | int | bool]] = None,
+) -> List[str]:
+    """Compile `sources` with the strict loader and write them to a bundle at
+    `output`. Module names are derived from `sys.path`. Existing up-to-date
+    `.strict.pyc` files are reused. Returns the bundled module names."""
+    loader_options = loader_options or {}
+    flags = _BUNDLE_PATCHING if loader_options.get("enable_patching") else 0
+    index: Dict[str, BundleEntry] = {}
+    chunks: List[bytes] = []
+    offset = _HEADER.size
+    for source in sources:
+        name = get_module_name(source)
+        loader = StrictSourceFileLoader(
+            name, source, import_path=sys.path, **loader_options
+        )
+        code = loader.get_code(name)
+        data = marshal.dumps(code)
+        module_flags = _MODULE_STRICT if loader.strict else 0
+        if os.path.basename(source) == "__init__.py":
+            module_flags |= _MODULE_PACKAGE
+        index[name] = (offset, len(data), module_flags, source)
+        chunks.append(data)
+        offset += len(data)
+
+    index_data = marshal.dumps(index)
+    header = _HEADER.pack(
+        _BUNDLE_MAGIC,
+        importlib.util.MAGIC_NUMBER,
+        MAGIC_NUMBER,
+        BUNDLE_VERSION,
+        flags,
+        offset,
+        len(index_data),
+    )
+    _write_atomic(output, b"".join([header, *chunks, index_data]))
+    return list(index)
+
+
+@final
+class BundleFinder(MetaPathFinder):
+    def __init__(
+        self,
+        path: str,
+        init_cached_properties: Optional[InitCachedProperties] = None,
+    ) -> None:
+        self.path = path
+        self.init_cached_properties = init_cached_properties
+        with open(path, "rb") as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (
+                magic,
+                py_magic,
+                strict_magic,
+                version,
+                flags,
+                index_offset,
+                index_size,
+            ) = _HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = None
+        if (
+            magic != _BUNDLE_MAGIC
+            or py_magic != importlib.util.MAGIC_NUMBER
+            or strict_magic != MAGIC_NUMBER
+            or version != BUNDLE_VERSION
+        ):
+            self._map.close()
+            raise ImportError(f"{path} is not a compatible module bundle", path=path)
+        self.enable_patching: bool = bool(flags & _BUNDLE_PATCHING)
+        self.index: Dict[str, BundleEntry] = marshal.loads(
+            self._map[index_offset : index_offset + index_size]
+        )
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Optional[Sequence[str]] = None,
+        target: Optional[ModuleType] = None,
+    ) -> Optional[ModuleSpec]:
+        entry = self.index.get(fullname)
+        if entry is None:
+            return None
+        __, __, flags, filename = entry
+        is_package = bool(flags & _MODULE_PACKAGE)
+        spec = ModuleSpec(
+            fullname,
+            BundleLoader(self, fullname, entry),
+            origin=filename,
+            is_package=is_package,
+        )
+        spec.has_location = True
+        if is_package:
+            # Submodules which aren't bundled can still be found on disk.
+            spec.submodule_search_locations = [os.path.dirname(filename)]
+        return spec
+
+    def get_code(self, entry: BundleEntry) -> CodeType:
+        offset, size, __, __ = entry
+        with memoryview(self._map) as view:
+            return marshal.loads(view[offset : offset + size])
+
+    def close(self) -> None:
+        self._map.close()
+
+
+@final
+class BundleLoader(Loader):
+    def __init__(self, finder: BundleFinder, name: str, entry: BundleEntry) -> None:
+        self.finder = finder
+        self.name = name
+        self.entry = entry
+
+    def create_module(self, spec: ModuleSpec) -> Optional[ModuleType]:
+        return None
+
+    def is_package(self, fullname: str) -> bool:
+        return bool(self.entry[2] & _MODULE_PACKAGE)
+
+    def get_filename(self, fullname: str) -> str:
+        return self.entry[3]
+
+    def get_code(self, fullname: str) -> CodeType:
+        return self.finder.get_code(self.entry)
+
+    def get_source(self, fullname: str) -> Optional[str]:
+        # Only used for tracebacks and inspect; the source may not be deployed.
+        try:
+            with open(self.entry[3], "rb") as f:
+                return importlib.util.decode_source(f.read())
+        except OSError:
+            return None
+
+    def exec_module(self, module: ModuleType) -> None:
+        code = self.get_code(module.__name__)
+        if self.entry[2] & _MODULE_STRICT:
+            exec_strict_module(
+                module,
+                code,
+                self.finder.enable_patching,
+                self.finder.init_cached_properties,
+            )
+        else:
+            exec(code, module.__dict__)
+
+
+def install_bundle(
+    path: str, init_cached_properties: Optional[InitCachedProperties] = None
+) -> BundleFinder:
+    """Serve the modules in the bundle at `path` ahead of all other finders."""
+    finder = BundleFinder(path, init_cached_properties)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="compiler.strict.bundle",
+        description="Compile modules into a single memory-mappable bundle",
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="source files or directories to bundle"
+    )
+    parser.add_argument("-o", "--output", required=True, help="bundle file to write")
+    parser.add_argument(
+        "-p",
+        "--path",
+        action="append",
+        default=[],
+        help="directory to prepend to sys.path; module names are computed "
+        "relative to sys.path (may be repeated)",
+    )
+    parser.add_argument(
+        "--enable-patching",
+        action="store_true",
+        help="compile strict modules to allow patching",
+    )
+    args = parser.parse_args(argv)
+
+    sys.path[:0] = [os.path.abspath(p) for p in args.path]
+    loader_options: Dict[str, str | int | bool] = {}
+    if args.enable_patching:
+        loader_options["enable_patching"] = True
+    sources = [os.path.abspath(s) for s in find_sources(args.sources)]
+    names = build_bundle(args.output, sources, loader_options)
+    print(f"Wrote {len(names)} modules to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,10 +31,12 @@
     Dict,
     final,
     Generic,
+    Iterator,
     List,
     Mapping,
     MutableMapping,
     Optional,
+    Sequence,
     Type,
     TypeVar,
 )
@@ -252,6 +254,42 @@ def imported_name(name: alias) -> str:
     return name.asname or name.name.partition(".")[0]
 
 
+def module_level_imports(
+    body: Sequence[ast.stmt], package: Optional[str] = None
+) -> Iterator[str]:
+    """Yield the names of the modules imported at module level by `body`,
+    including the would-be submodules named by `from` imports. Relative imports
+    are resolved against `package`, or skipped without one."""
+    # Imports nested in functions are resolved at runtime, and neither the
+    # DeclarationVisitor nor the strict module analysis follows them.
+    for node in body:
+        if isinstance(node, ast.Import):
+            for name in node.names:
+                yield name.name
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module
+            if node.level:
+                parts = package.split(".") if package else []
+                if node.level - 1 >= len(parts):
+                    continue
+                base = ".".join(parts[: len(parts) - (node.level - 1)])
+                module = f"{base}.{module}" if module else base
+            if not module:
+                continue
+            yield module
+            for name in node.names:
+                yield f"{module}.{name.name}"
+        elif isinstance(node, ast.If):
+            yield from module_level_imports(node.body, package)
+            yield from module_level_imports(node.orelse, package)
+        elif isinstance(node, ast.Try):
+            yield from module_level_imports(node.body, package)
+            for handler in node.handlers:
+                yield from module_level_imports(handler.body, package)
+            yield from module_level_imports(node.orelse, package)
+            yield from module_level_imports(node.finalbody, package)
+
+
 @final
 class ScopeContextManager(Generic[TVar, TScopeData]):
     def __init__(
@@ -32,11 +32,15 @@
 )
 
 from ..errors import TypedSyntaxError
+from ..optimizer import AstOptimizer
 from ..pycodegen import compile as python_compile
 from ..static import Compiler as StaticCompiler, ModuleTable, StaticCodeGenerator
 from . import _static_module_ported, strict_compile
+from .analysis_cache import AnalysisCache
 from .class_conflict_checker import check_class_conflict
 from .common import StrictModuleError
+from .deps import ModuleInterfaces
+from .interface import loader_config_hash, read_interface, write_interface
 from .rewriter import remove_annotations, rewrite
 
 if _static_module_ported:
@@ -72,8 +76,23 @@ def __init__(
         loader_factory: StrictModuleLoaderFactory = StrictModuleLoader,
         use_py_compiler: bool = False,
         allow_list_regex: Optional[Iterable[str]] = None,
+        use_interface_cache: bool = False,
+        analysis_cache_dir: Optional[str] = None,
+        max_retained_asts: Optional[int] = None,
     ) -> None:
-        super().__init__(StaticCodeGenerator)
+        if max_retained_asts is None:
+            retained = os.getenv("PYTHONSTRICTMAXRETAINEDASTS") or sys._xoptions.get(
+                "strict-max-retained-asts"
+            )
+            if isinstance(retained, str):
+                try:
+                    max_retained_asts = int(retained)
+                except ValueError:
+                    pass
+            # A malformed or negative limit keeps every AST, the default.
+            if max_retained_asts is not None and max_retained_asts < 0:
+                max_retained_asts = None
+        super().__init__(StaticCodeGenerator, max_retained_asts=max_retained_asts)
         self.import_path: List[str] = list(import_path)
         self.stub_root = stub_root
         self.allow_list_prefix = allow_list_prefix
@@ -87,6 +106,29 @@ def __init__(
             os.getenv("PYTHONSTRICTDISABLEANALYSIS")
             or sys._xoptions.get("strict-disable-analysis") is True
         )
+        self.use_interface_cache: bool = use_interface_cache or bool(
+            os.getenv("PYTHONSTRICTINTERFACECACHE")
+            or sys._xoptions.get("strict-interface-cache") is True
+        )
+        analysis_cache_dir = (
+            analysis_cache_dir
+            or os.getenv("PYTHONSTRICTANALYSISCACHE")
+            or sys._xoptions.get("strict-analysis-cache")
+        )
+        # Both caches hold results that depend on the stubs and allow-list.
+        self.loader_config: bytes = b""
+        if self.use_interface_cache or isinstance(analysis_cache_dir, str):
+            self.loader_config = loader_config_hash(
+                str(stub_root),
+                allow_list_prefix,
+                allow_list_exact,
+                self.allow_list_regex,
+            )
+        self.analysis_cache: Optional[AnalysisCache] = None
+        if isinstance(analysis_cache_dir, str):
+            self.analysis_cache = AnalysisCache(
+                analysis_cache_dir, self.loader_config, self._find_source
+            )
         self.loader: IStrictModuleLoader = loader_factory(
             self.import_path,
             str(stub_root),
@@ -105,6 +147,9 @@ def __init__(
         self.use_py_compiler = use_py_compiler
         self.original_builtins: Dict[str, object] = dict(__builtins__)
         self.logger: logging.Logger = self._setup_logging()
+        # Interfaces of modules whose ASTs were released, which dependency
+        # records of the modules compiled against them still need.
+        self.released_interfaces: Dict[str, ModuleInterfaces] = {}
 
     def import_module(self, name: str, optimize: int) -> Optional[ModuleTable]:
         res = self.modules.get(name)
@@ -114,6 +159,26 @@ def import_module(self, name: str, optimize: int) -> Optional[ModuleTable]:
         if name in self.not_static:
             return None
 
+        source_path: Optional[str] = None
+        source: Optional[bytes] = None
+        if self.use_interface_cache:
+            source_path = self._find_source(name)
+            if source_path is not None:
+                with open(source_path, "rb") as f:
+                    source = f.read()
+                interface = read_interface(
+                    source_path,
+                    source,
+                    optimize,
+                    self.track_import_call,
+                    self.loader_config,
+                )
+                if interface is not None:
+                    filename, root = interface
+                    with self._declaration_timer(name, filename):
+                        self.declare_module(name, filename, root, optimize)
+                    return self.modules.get(name)
+
         mod = self.loader.check(name)
         if mod.is_valid and name not in self.modules and len(mod.errors) == 0:
             modKind = mod.module_kind
@@ -123,19 +188,49 @@ def import_module(self, name: str, optimize: int) -> Optional[ModuleTable]:
                 if STUB_KIND_MASK_TYPING & stubKind:
                     root = remove_annotations(root)
                 root = self._get_rewritten_ast(name, mod, root, optimize)
-                log = self.log_time_func
-                ctx = (
-                    log()(name, mod.file_name, "declaration_visit")
-                    if log
-                    else nullcontext()
-                )
-                with ctx:
-                    root = self.add_module(name, mod.file_name, root, optimize)
+                root = AstOptimizer(optimize=optimize > 0).visit(root)
+                # Only cache declarations which were analyzed from the source
+                # we hashed (and not, e.g., from a stub). The tree is written
+                # before the declaration visit stores the ids of its nodes in
+                # this module's NodeTable, which would make them foreign to the
+                # table of the process that loads it.
+                if source is not None and mod.file_name == source_path:
+                    write_interface(
+                        source_path,
+                        source,
+                        mod.file_name,
+                        root,
+                        optimize,
+                        self.track_import_call,
+                        self.loader_config,
+                    )
+                with self._declaration_timer(name, mod.file_name):
+                    self.declare_module(name, mod.file_name, root, optimize)
             else:
                 self.not_static.add(name)
 
         return self.modules.get(name)
 
+    def release_module(self, name: str) -> None:
+        tree = self.ast_cache.get(name)
+        if tree is not None:
+            self.released_interfaces[name] = ModuleInterfaces(tree)
+        super().release_module(name)
+
+    def _declaration_timer(self, name: str, filename: str) -> ContextManager[None]:
+        log = self.log_time_func
+        return log()(name, filename, "declaration_visit") if log else nullcontext()
+
+    def _find_source(self, name: str) -> Optional[str]:
+        # Mirror FileFinder's lookup order: packages before plain modules.
+        parts = name.split(".")
+        for dir in self.import_path:
+            base = os.path.join(dir, *parts)
+            for path in (os.path.join(base, "__init__.py"), base + ".py"):
+                if os.path.isfile(path):
+                    return path
+        return None
+
     def _get_rewritten_ast(
         self, name: str, mod: StrictAnalysisResult, root: ast.Module, optimize: int
     ) -> ast.Module:
@@ -170,8 +265,8 @@ def load_compiled_module_from_source(
         if force_strict:
             self.logger.debug(f"Forcibly treating module {name} as strict")
             self.loader.set_force_strict_by_name(name)
-        mod = self.loader.check_source(
-            source, filename, name, submodule_search_locations or []
+        mod = self._check_source(
+            source, filename, name, submodule_search_locations or [], force_strict
         )
         errors = mod.errors
         is_valid_strict = (
@@ -205,6 +300,32 @@ def load_compiled_module_from_source(
 
         return code, is_valid_strict
 
+    def _check_source(
+        self,
+        source: str | bytes,
+        filename: str,
+        name: str,
+        submodule_search_locations: List[str],
+        force_strict: bool,
+    ) -> StrictAnalysisResult:
+        cache = self.analysis_cache
+        if cache is None:
+            return self.loader.check_source(
+                source, filename, name, submodule_search_locations
+            )
+        key = cache.key(
+            source, filename, name, submodule_search_locations, force_strict
+        )
+        mod = cache.get(key, source)
+        if mod is None:
+            mod = self.loader.check_source(
+                source, filename, name, submodule_search_locations
+            )
+            cache.put(key, mod)
+        else:
+            self.logger.debug(f"Using cached strict analysis of {name}")
+        return mod
+
     def _compile_basic(
         self, name: str, root: ast.Module, filename: str, optimize: int
     ) -> CodeType:
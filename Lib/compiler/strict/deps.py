@@ -0,0 +1,323 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""Dependency records for incremental recompilation of static modules.
+
+A static module's bytecode can bake in facts about the modules it imports
+from: the types of imported names, the values of `Final` constants, and the
+vtable layout of imported classes. So a change to one module can invalidate
+the `.strict.pyc` of another even though the latter's source didn't change.
+
+When the strict loader writes a `.strict.pyc` it also writes a `.strict.deps`
+file next to it, recording the hash of the module's own source and a
+fingerprint of every declaration it consumed from other modules. A module
+only needs recompiling if its source changed or one of those fingerprints
+no longer matches the declarations the compiler builds today.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+
+# pyre-ignore[21]: There's no stub for this one.
+from importlib._bootstrap_external import _write_atomic
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    from .compiler import Compiler
+
+DEPS_VERSION = 1
+
+# The declaration name used for a dependency on a whole module, e.g. one
+# imported with a plain `import a.b`.
+WHOLE_MODULE = "*"
+
+# Map of module name -> declaration name -> fingerprint.
+ConsumedInterfaces = Dict[str, Dict[str, str]]
+
+# A digest of the interface of the statements binding a declaration, and the
+# names they reference.
+Interface = Tuple[str, Tuple[str, ...]]
+
+
+def deps_path(strict_cfile: str) -> str:
+    """Return the path of the dependency record for a `.strict.pyc` file."""
+    base, __, __ = strict_cfile.rpartition(".")
+    return f"{base}.deps"
+
+
+def _declarations(
+    body: Sequence[ast.stmt], decls: Optional[Dict[str, List[ast.stmt]]] = None
+) -> Dict[str, List[ast.stmt]]:
+    # Mirrors the DeclarationVisitor: top-level statements, including those
+    # nested in if/try blocks, declare module members.
+    decls = {} if decls is None else decls
+    for node in body:
+        names: Iterable[str] = ()
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            names = (node.name,)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = {
+                n.id
+                for target in targets
+                for n in ast.walk(target)
+                if isinstance(n, ast.Name)
+            }
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = {alias.asname or alias.name.split(".")[0] for alias in node.names}
+        elif isinstance(node, ast.If):
+            _declarations(node.body, decls)
+            _declarations(node.orelse, decls)
+        elif isinstance(node, ast.Try):
+            _declarations(node.body, decls)
+            for handler in node.handlers:
+                _declarations(handler.body, decls)
+            _declarations(node.orelse, decls)
+            _declarations(node.finalbody, decls)
+        for name in names:
+            decls.setdefault(name, []).append(node)
+    return decls
+
+
+def _is_inline(decorator: ast.expr) -> bool:
+    return (isinstance(decorator, ast.Name) and decorator.id == "inline") or (
+        isinstance(decorator, ast.Attribute) and decorator.attr == "inline"
+    )
+
+
+def _attribute_declarations(
+    func: ast.FunctionDef | ast.AsyncFunctionDef,
+) -> List[ast.stmt]:
+    # Assignments to attributes in a method can declare instance fields: any
+    # annotated one, and unannotated ones in __init__, whose type is inferred.
+    decls: List[ast.stmt] = []
+    for node in ast.walk(func):
+        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Attribute):
+            decls.append(
+                ast.AnnAssign(
+                    target=node.target,
+                    annotation=node.annotation,
+                    value=None,
+                    simple=node.simple,
+                )
+            )
+        elif (
+            func.name == "__init__"
+            and isinstance(node, ast.Assign)
+            and any(isinstance(t, ast.Attribute) for t in node.targets)
+        ):
+            decls.append(node)
+    return decls
+
+
+def _interface(stmt: ast.stmt) -> ast.stmt:
+    # Strip a statement down to what code compiled against it can depend on:
+    # signatures, annotations, decorators, assigned values (and so Finals),
+    # and class layout, but not function bodies, unless they are inlined.
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        if any(_is_inline(d) for d in stmt.decorator_list):
+            return stmt
+        return type(stmt)(
+            name=stmt.name,
+            args=stmt.args,
+            body=_attribute_declarations(stmt),
+            decorator_list=stmt.decorator_list,
+            returns=stmt.returns,
+            type_comment=None,
+        )
+    elif isinstance(stmt, ast.ClassDef):
+        return ast.ClassDef(
+            name=stmt.name,
+            bases=stmt.bases,
+            keywords=stmt.keywords,
+            body=[
+                _interface(s)
+                for s in stmt.body
+                if not isinstance(s, (ast.Expr, ast.Pass))
+            ],
+            decorator_list=stmt.decorator_list,
+        )
+    return stmt
+
+
+def _interface_of(stmts: Iterable[ast.stmt]) -> Interface:
+    h = hashlib.sha256()
+    referenced = set()
+    for stmt in stmts:
+        interface = _interface(stmt)
+        h.update(ast.dump(interface).encode())
+        for node in ast.walk(interface):
+            if isinstance(node, ast.Name):
+                referenced.add(node.id)
+            elif isinstance(node, ast.alias):
+                referenced.add(node.asname or node.name.split(".")[0])
+    return h.hexdigest(), tuple(sorted(referenced))
+
+
+class ModuleInterfaces:
+    """The parts of a static module's AST that dependency records are built
+    from: the interface of every declaration and the names the module
+    imports. The compiler keeps these when it releases the module's AST, so
+    modules compiled against it can still fingerprint what they consume."""
+
+    def __init__(self, tree: ast.Module) -> None:
+        self.consumed: Tuple[Tuple[str, str], ...] = tuple(_consumed_names(tree))
+        self.declarations: Dict[str, Interface] = {
+            name: _interface_of(stmts)
+            for name, stmts in _declarations(tree.body).items()
+        }
+        self.declarations[WHOLE_MODULE] = _interface_of(tree.body)
+
+    def get(self, name: str) -> Interface:
+        return self.declarations.get(name) or _interface_of(())
+
+
+def _declaration_interface(
+    compiler: Compiler, module: str, name: str
+) -> Optional[Interface]:
+    tree = compiler.ast_cache.get(module)
+    if tree is not None:
+        if name == WHOLE_MODULE:
+            return _interface_of(tree.body)
+        return _interface_of(_declarations(tree.body).get(name, ()))
+    released = compiler.released_interfaces.get(module)
+    return released.get(name) if released is not None else None
+
+
+def _consumed(compiler: Compiler, name: str) -> Optional[Iterable[Tuple[str, str]]]:
+    tree = compiler.ast_cache.get(name)
+    if tree is not None:
+        return _consumed_names(tree)
+    released = compiler.released_interfaces.get(name)
+    return released.consumed if released is not None else None
+
+
+def declaration_fingerprint(
+    compiler: Compiler,
+    module: str,
+    name: str,
+    _seen: Optional[Set[Tuple[str, str]]] = None,
+) -> str:
+    """Fingerprint the declaration of `name` in `module`, as seen by code
+    compiled against `compiler`. Pass WHOLE_MODULE to fingerprint the entire
+    module.
+
+    The fingerprint covers the interface of the statements binding the name
+    (function bodies are left out) and, recursively, the declarations they
+    reference through the module's `imported_from`, e.g. the base class of an
+    imported class, or the original of a re-exported name. Non-static modules
+    have no declarations and fingerprint to the empty string."""
+    mod = compiler.modules.get(module)
+    interface = _declaration_interface(compiler, module, name)
+    if mod is None or interface is None:
+        return ""
+    seen = set() if _seen is None else _seen
+    seen.add((module, name))
+
+    digest, referenced = interface
+    h = hashlib.sha256(digest.encode())
+    for ref in referenced:
+        source = mod.imported_from.get(ref)
+        if source is not None and source not in seen:
+            h.update(f"\0{source[0]}.{source[1]}=".encode())
+            h.update(declaration_fingerprint(compiler, *source, seen).encode())
+    return h.hexdigest()
+
+
+def _consumed_names(tree: ast.Module) -> Iterable[Tuple[str, str]]:
+    # `imported_from` only records top-level from-imports, but the type
+    # binder also resolves imports nested in functions, so walk everything.
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                # `import a.b.c` binds `a` and gives access to `a.b` and `a.b.c`.
+                parts = alias.name.split(".")
+                for i in range(1, len(parts) + 1):
+                    yield ".".join(parts[:i]), WHOLE_MODULE
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or not node.module:
+                continue
+            for alias in node.names:
+                yield node.module, alias.name
+
+
+def consumed_interfaces(compiler: Compiler, name: str) -> ConsumedInterfaces:
+    """Fingerprint every declaration that the static module `name` consumes
+    from other modules. Imports of non-static modules are recorded too, since
+    their becoming static changes the code generated for `name`."""
+    consumed: ConsumedInterfaces = {}
+    names = _consumed(compiler, name)
+    if names is None:
+        return consumed
+    for module, decl in names:
+        if decl != WHOLE_MODULE and f"{module}.{decl}" in compiler.modules:
+            # `from a import b` where `b` is a static submodule of `a`.
+            module, decl = f"{module}.{decl}", WHOLE_MODULE
+        if module == name:
+            continue
+        decls = consumed.setdefault(module, {})
+        if decl not in decls:
+            decls[decl] = declaration_fingerprint(compiler, module, decl)
+    return consumed
+
+
+def write_deps(
+    strict_cfile: str, name: str, source: bytes, consumed: ConsumedInterfaces
+) -> None:
+    """Write the dependency record for the `.strict.pyc` at `strict_cfile`.
+    Failures are ignored, just like failures to write a pyc."""
+    data = {
+        "version": DEPS_VERSION,
+        "module": name,
+        "source_hash": importlib.util.source_hash(source).hex(),
+        "consumes": consumed,
+    }
+    try:
+        _write_atomic(
+            deps_path(strict_cfile), json.dumps(data, sort_keys=True).encode()
+        )
+    except OSError:
+        pass
+
+
+def is_stale(
+    compiler: Compiler, strict_cfile: str, name: str, source: bytes, optimize: int
+) -> bool:
+    """Return True if the `.strict.pyc` at `strict_cfile`, compiled from
+    `source` at the given optimization level, needs rebuilding. Dependencies
+    are declared in `compiler` as needed to recompute the fingerprints of
+    what the module consumed."""
+    if not os.path.exists(strict_cfile):
+        return True
+    try:
+        with open(deps_path(strict_cfile), "rb") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return True
+    if (
+        not isinstance(data, dict)
+        or data.get("version") != DEPS_VERSION
+        or data.get("module") != name
+        or data.get("source_hash") != importlib.util.source_hash(source).hex()
+    ):
+        return True
+
+    for module, decls in data.get("consumes", {}).items():
+        compiler.import_module(module, optimize)
+        for decl, fingerprint in decls.items():
+            if declaration_fingerprint(compiler, module, decl) != fingerprint:
+                return True
+    return False
@@ -0,0 +1,164 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates. (http://www.meta.com)
+
+"""On-disk declaration ("interface") files for static modules.
+
+When a static module is imported only for its declarations, the compiler has
+to run the strict-module analysis, rewrite the resulting AST and run the AST
+optimizer before it can even start the declaration visit.  An interface file
+caches the output of those steps (the optimized module AST) next to the
+module's `.strict.pyc`, so the next process can load it and go straight to
+the `DeclarationVisitor`.
+
+Interface files are keyed by the source hash, the strict compiler magic
+number, the Python bytecode magic number, the options which affect the
+rewritten AST and the stubs and allow-list the module was analyzed with.  Any
+mismatch is treated as a cache miss.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib.util
+import io
+import os
+import pickle
+import sys
+
+# pyre-ignore[21]: There's no stub for this one.
+from importlib._bootstrap_external import _write_atomic
+from typing import Iterable, Optional, Tuple
+
+from .common import MAGIC_NUMBER
+
+# Bump this whenever the contents of interface files change in a way that
+# isn't already captured by the strict MAGIC_NUMBER.
+INTERFACE_VERSION = 1
+
+_INTERFACE_MAGIC: bytes = (
+    b"SDCL"
+    + importlib.util.MAGIC_NUMBER
+    + MAGIC_NUMBER.to_bytes(2, "little")
+    + INTERFACE_VERSION.to_bytes(2, "little")
+)
+
+
+def interface_path(source_path: str, optimize: int) -> str:
+    """Return the path of the interface file for the given source file."""
+    pyc = importlib.util.cache_from_source(
+        source_path, optimization=optimize if optimize >= 1 else ""
+    )
+    base, __, __ = pyc.rpartition(".")
+    return f"{base}.strict.decl"
+
+
+def _hash_tree(h: hashlib._Hash, root: str) -> None:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            h.update(os.path.relpath(path, root).encode() + b"\0")
+            try:
+                with open(path, "rb") as f:
+                    h.update(hashlib.sha256(f.read()).digest())
+            except OSError:
+                pass
+
+
+def loader_config_hash(
+    stub_root: str,
+    allow_list_prefix: Iterable[str],
+    allow_list_exact: Iterable[str],
+    allow_list_regex: Iterable[str],
+) -> bytes:
+    """Hash the strict module loader configuration which, besides the source
+    itself, decides how a module is analyzed and rewritten: the stubs and the
+    allow-list."""
+    h = hashlib.sha256()
+    for allow_list in (allow_list_prefix, allow_list_exact, allow_list_regex):
+        h.update(repr(sorted(allow_list)).encode())
+    _hash_tree(h, stub_root)
+    return h.digest()
+
+
+def _header(
+    source: bytes, optimize: int, track_import_call: bool, loader_config: bytes
+) -> bytes:
+    return (
+        _INTERFACE_MAGIC
+        + bytes((max(optimize, 0), int(track_import_call)))
+        + loader_config
+        + importlib.util.source_hash(source)
+    )
+
+
+# Globals which can appear as the values of ast.Constant nodes.
+_CONSTANT_GLOBALS = {"Ellipsis", "complex", "frozenset"}
+
+
+class _ASTUnpickler(pickle.Unpickler):
+    """Only allow AST node types (and the few builtins that can appear in
+    constants) to be materialized from an interface file."""
+
+    def find_class(self, module: str, name: str) -> object:
+        if module in ("ast", "_ast"):
+            obj = getattr(ast, name, None)
+            if isinstance(obj, type) and issubclass(obj, ast.AST):
+                return obj
+        elif module == "builtins" and name in _CONSTANT_GLOBALS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"unexpected global {module}.{name}")
+
+
+def read_interface(
+    source_path: str,
+    source: bytes,
+    optimize: int,
+    track_import_call: bool,
+    loader_config: bytes,
+) -> Optional[Tuple[str, ast.Module]]:
+    """Load the interface file for `source_path`, whose current contents are
+    `source`, for a loader whose configuration hashes to `loader_config` (see
+    loader_config_hash()). Returns the filename the module was declared with
+    and its optimized AST, or None if there is no interface file or it is
+    stale."""
+    try:
+        with open(interface_path(source_path, optimize), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    header = _header(source, optimize, track_import_call, loader_config)
+    if not data.startswith(header):
+        return None
+    try:
+        filename, tree = _ASTUnpickler(io.BytesIO(data[len(header) :])).load()
+    except Exception:
+        return None
+    if not isinstance(filename, str) or not isinstance(tree, ast.Module):
+        return None
+    return filename, tree
+
+
+def write_interface(
+    source_path: str,
+    source: bytes,
+    filename: str,
+    tree: ast.Module,
+    optimize: int,
+    track_import_call: bool,
+    loader_config: bytes,
+) -> None:
+    """Write the interface file for `source_path`, whose contents were `source`
+    when `tree` was produced.  Failures are ignored, just like failures to
+    write a pyc."""
+    if sys.dont_write_bytecode:
+        return
+    try:
+        header = _header(source, optimize, track_import_call, loader_config)
+        data = header + pickle.dumps((filename, tree), pickle.HIGHEST_PROTOCOL)
+        path = interface_path(source_path, optimize)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, data)
+    except (OSError, pickle.PicklingError, RecursionError):
+        pass
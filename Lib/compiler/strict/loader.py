@@ -9,7 +9,7 @@
 import os
 import sys
 
-from cinder import StrictModule, watch_sys_modules
+from cinder import _get_qualname, StrictModule, watch_sys_modules
 from enum import Enum
 from importlib.abc import Loader
 from importlib.machinery import (
@@ -38,6 +38,7 @@
     List,
     Mapping,
     Optional,
+    Set,
     Tuple,
     Type,
 )
@@ -46,6 +47,7 @@
 from ..strict import _static_module_ported
 from .common import DEFAULT_STUB_PATH, FIXED_MODULES, MAGIC_NUMBER
 from .compiler import Compiler, TIMING_LOGGER_TYPE
+from .deps import consumed_interfaces, ConsumedInterfaces, write_deps
 from .track_import_call import tracker
 
 
@@ -224,6 +226,9 @@ def __init__(
         self.init_cached_properties = init_cached_properties
         self.log_time_func = log_time_func
         self.use_py_compiler = use_py_compiler
+        # The source of the last module compiled and the declarations it
+        # consumed, recorded next to its pyc for incremental rebuilds.
+        self.deps: Optional[Tuple[bytes, ConsumedInterfaces]] = None
 
     @classmethod
     def ensure_compiler(
@@ -249,6 +254,17 @@ def ensure_compiler(
             )
         return comp
 
+    def get_compiler(self) -> Compiler:
+        return self.ensure_compiler(
+            self.import_path,
+            self.stub_path,
+            self.allow_list_prefix,
+            self.allow_list_exact,
+            self.log_time_func,
+            self.enable_patching,
+            self.allow_list_regex,
+        )
+
     def get_data(self, path: bytes | str) -> bytes:
         assert isinstance(path, str)
         is_pyc = False
@@ -282,6 +298,21 @@ def set_data(self, path: bytes | str, data: bytes, *, _mode=0o666) -> None:
             data = magic + data
         return super().set_data(path, data, _mode=_mode)
 
+    def _cache_bytecode(
+        self, source_path: str, bytecode_path: str, data: bytes
+    ) -> None:
+        # pyre-ignore[16]: `SourceFileLoader` has no attribute `_cache_bytecode`.
+        super()._cache_bytecode(source_path, bytecode_path, data)
+        deps = self.deps
+        if deps is not None:
+            source, consumed = deps
+            write_deps(
+                add_strict_tag(bytecode_path, self.enable_patching),
+                self.name,
+                source,
+                consumed,
+            )
+
     def should_force_strict(self) -> bool:
         return False
 
@@ -295,6 +326,8 @@ def source_to_code(
             log_source_load(path, self.bytecode_path, self.bytecode_found)
         # pyre-ignore[28]: typeshed doesn't know about _optimize arg
         code = super().source_to_code(data, path, _optimize=_optimize)
+        source = data.encode() if isinstance(data, str) else data
+        self.deps = (source, {})
         force = self.should_force_strict()
         if force or "__strict__" in code.co_names or "__static__" in code.co_names:
             # Since a namespace package will never call `source_to_code` (there
@@ -316,15 +349,8 @@ def source_to_code(
             # Let the ast transform attempt to validate the strict module.  This
             # will return an unmodified module if import __strict__ isn't
             # actually at the top-level
-            code, is_valid_strict = self.ensure_compiler(
-                self.import_path,
-                self.stub_path,
-                self.allow_list_prefix,
-                self.allow_list_exact,
-                self.log_time_func,
-                self.enable_patching,
-                self.allow_list_regex,
-            ).load_compiled_module_from_source(
+            compiler = self.get_compiler()
+            code, is_valid_strict = compiler.load_compiled_module_from_source(
                 data,
                 path,
                 self.name,
@@ -335,6 +361,8 @@ def source_to_code(
             )
             self.strict = is_valid_strict
             assert code is not None
+            if code.co_flags & CO_STATICALLY_COMPILED:
+                self.deps = (source, consumed_interfaces(compiler, self.name))
             return code
         self.strict = False
 
@@ -371,24 +399,13 @@ def exec_module(self, module: ModuleType) -> None:
             tracker.enter_import()
 
         if self.strict:
-            if spec is None:
-                raise ImportError(f"Missing module spec for {module.__name__}")
-
-            new_dict = {
-                "<fixed-modules>": cast(object, FIXED_MODULES),
-                "<builtins>": builtins.__dict__,
-                "<init-cached-properties>": self.init_cached_properties,
-            }
-            if code.co_flags & CO_STATICALLY_COMPILED:
-                self._ensure_static_python_builtins_enabled()
-                new_dict["<imported-from>"] = code.co_consts[-1]
-
-            new_dict.update(module.__dict__)
-            strict_mod = StrictModule(new_dict, self.enable_patching)
-
-            sys.modules[module.__name__] = strict_mod
-
-            exec(code, new_dict)
+            exec_strict_module(
+                module,
+                code,
+                self.enable_patching,
+                self.init_cached_properties,
+                self._ensure_static_python_builtins_enabled,
+            )
         else:
             exec(code, module.__dict__)
 
@@ -396,6 +413,40 @@ def exec_module(self, module: ModuleType) -> None:
             tracker.exit_import()
 
 
+def exec_strict_module(
+    module: ModuleType,
+    code: CodeType,
+    enable_patching: bool = False,
+    init_cached_properties: Optional[
+        Callable[
+            [Mapping[str, str | Tuple[str, bool]]],
+            Callable[[Type[object]], Type[object]],
+        ]
+    ] = None,
+    ensure_static_python_builtins_enabled: Callable[[], None] = watch_sys_modules,
+) -> None:
+    """Run the compiled body of a strict module, replacing `module` in
+    sys.modules with the resulting StrictModule."""
+    if module.__spec__ is None:
+        raise ImportError(f"Missing module spec for {module.__name__}")
+
+    new_dict = {
+        "<fixed-modules>": cast(object, FIXED_MODULES),
+        "<builtins>": builtins.__dict__,
+        "<init-cached-properties>": init_cached_properties,
+    }
+    if code.co_flags & CO_STATICALLY_COMPILED:
+        ensure_static_python_builtins_enabled()
+        new_dict["<imported-from>"] = code.co_consts[-1]
+
+    new_dict.update(module.__dict__)
+    strict_mod = StrictModule(new_dict, enable_patching)
+
+    sys.modules[module.__name__] = strict_mod
+
+    exec(code, new_dict)
+
+
 def add_strict_tag(path: str, enable_patching: bool) -> str:
     base, __, ext = path.rpartition(".")
     enable_patching_marker = ".patch" if enable_patching else ""
@@ -414,6 +465,60 @@ def _get_supported_file_loaders() -> List[Tuple[Loader, List[str]]]:
     return cast(List[Tuple[Loader, List[str]]], [extensions, source, bytecode])
 
 
+def get_module_name(file: str, path: Optional[Iterable[str]] = None) -> str:
+    """Return the dotted module name for the source `file`, relative to the
+    first entry of `path` (defaulting to sys.path) that it lives under."""
+    modname = file
+    for dir in sys.path if path is None else path:
+        if file.startswith(dir):
+            modname = file[len(dir) :]
+            break
+
+    modname = modname.replace("/", ".")
+    if modname.endswith("__init__.py"):
+        modname = modname[: -len("__init__.py")]
+    elif modname.endswith(".py"):
+        modname = modname[: -len(".py")]
+    return modname.strip(".")
+
+
+def _marshalled_objects(code: CodeType) -> List[object]:
+    """Return the objects marshal writes for `code`.
+
+    marshal only emits a reference for objects whose refcount is above one, so
+    its output depends on what else in the process holds on to the strings and
+    tuples in `code`. Holding an extra reference to each of them while
+    marshalling makes the output depend on `code` alone.
+    """
+    objects: List[object] = []
+    seen: Set[int] = set()
+    stack: List[object] = [code]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        objects.append(obj)
+        if isinstance(obj, CodeType):
+            stack.extend(
+                (
+                    obj.co_code,
+                    obj.co_consts,
+                    obj.co_names,
+                    obj.co_varnames,
+                    obj.co_freevars,
+                    obj.co_cellvars,
+                    obj.co_filename,
+                    obj.co_name,
+                    obj.co_linetable,
+                    _get_qualname(obj),
+                )
+            )
+        elif isinstance(obj, (tuple, frozenset)):
+            stack.extend(obj)
+    return objects
+
+
 def strict_compile(
     file: str,
     cfile: str,
@@ -449,18 +554,7 @@ def strict_compile(
 
     """
 
-    modname = file
-    for dir in sys.path:
-        if file.startswith(dir):
-            modname = file[len(dir) :]
-            break
-
-    modname = modname.replace("/", ".")
-    if modname.endswith("__init__.py"):
-        modname = modname[: -len("__init__.py")]
-    elif modname.endswith(".py"):
-        modname = modname[: -len(".py")]
-    modname = modname.strip(".")
+    modname = get_module_name(file)
 
     if loader_options is None:
         loader_options = {}
@@ -493,6 +587,9 @@ def strict_compile(
     if invalidation_mode is None:
         # Incomplete typeshed stub.  T54150924
         invalidation_mode = _get_default_invalidation_mode()
+    # Keep the output identical no matter which process compiles the module
+    # (see compiler.strict.batch).
+    marshalled = _marshalled_objects(code)
     if invalidation_mode == PycInvalidationMode.TIMESTAMP:
         source_stats = loader.path_stats(file)
         # pyre-fixme[16]: Module `importlib` has no attribute `_bootstrap_external`.
@@ -508,6 +605,7 @@ def strict_compile(
             source_hash,
             (invalidation_mode == PycInvalidationMode.CHECKED_HASH),
         )
+    del marshalled
 
     # Incomplete typeshed stub.
     # pyre-fixme[16]: `StrictSourceFileLoader` has no attribute `_cache_bytecode`.
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import final, Set
+from typing import Dict, final, List, Optional, Set, Tuple
 
 
 @final
@@ -30,3 +30,69 @@ def import_call_tracked(self, modname: str) -> bool:
 
 
 tracker = TrackImportCall()
+
+
+# (id, parent_id, name, module, lineno, duration_ns, lazy), as recorded by
+# cinder.get_and_clear_lazy_import_profile().
+LazyImportRecord = Tuple[int, int, str, Optional[str], int, int, bool]
+
+
+@final
+class LazyImportProfiler:
+    """Records which code triggered the resolution of each lazy import and
+    each module load, how long it took and which nested resolutions and loads
+    it caused in turn.
+
+        with LazyImportProfiler() as profiler:
+            run_app()
+        profiler.write_flamegraph("imports.folded")
+
+    The output is in the collapsed stack format accepted by flamegraph.pl and
+    speedscope, with each frame labelled by the resolved name (or `import`
+    and the loaded module) and the location that triggered it, and sample
+    counts in microseconds of self time.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[LazyImportRecord] = []
+
+    def __enter__(self) -> LazyImportProfiler:
+        import cinder
+
+        cinder.get_and_clear_lazy_import_profile()
+        cinder.set_lazy_import_profiling(True)
+        return self
+
+    def __exit__(self, *excinfo: object) -> None:
+        import cinder
+
+        cinder.set_lazy_import_profiling(False)
+        self.records.extend(cinder.get_and_clear_lazy_import_profile())
+
+    def collapsed_stacks(self) -> Dict[str, int]:
+        """Map each stack of nested resolutions, from outermost to innermost
+        separated by semicolons, to its total self time in microseconds."""
+        by_id = {record[0]: record for record in self.records}
+        child_time: Dict[int, int] = {}
+        for __, parent, __, __, __, duration, __ in self.records:
+            if parent in by_id:
+                child_time[parent] = child_time.get(parent, 0) + duration
+
+        stacks: Dict[str, int] = {}
+        for record_id, __, __, __, __, duration, __ in self.records:
+            frames = []
+            current: Optional[int] = record_id
+            while current is not None:
+                __, parent, name, module, lineno, __, lazy = by_id[current]
+                label = name if lazy else f"import {name}"
+                frames.append(f"{label} ({module}:{lineno})".replace(";", ","))
+                current = parent if parent in by_id else None
+            stack = ";".join(reversed(frames))
+            self_time = max(duration - child_time.get(record_id, 0), 0) // 1000
+            stacks[stack] = stacks.get(stack, 0) + self_time
+        return stacks
+
+    def write_flamegraph(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, micros in sorted(self.collapsed_stacks().items()):
+                f.write(f"{stack} {micros}\n")
@@ -17,6 +17,7 @@
     SC_LOCAL,
     SC_UNKNOWN,
 )
+from .future import check_future_placement
 from .misc import mangle
 from .visitor import ASTVisitor
 
@@ -293,9 +294,13 @@ class SymbolVisitor(ASTVisitor):
     _GenExprScope = GenExprScope
     _LambdaScope = LambdaScope
 
-    def __init__(self, future_flags: int):
+    def __init__(self, future_flags: int, check_futures: bool = False):
         super().__init__()
+        self.future_flags = future_flags
         self.future_annotations = future_flags & CO_FUTURE_ANNOTATIONS
+        # Check the placement of future statements as part of this walk, for
+        # callers that found futures with check_placement=False.
+        self.check_futures = check_futures
         self.scopes: dict[ast.AST, Scope] = {}
         self.klass = None
 
@@ -600,6 +605,8 @@ def visitFor(self, node, scope):
     visitAsyncFor = visitFor
 
     def visitImportFrom(self, node, scope):
+        if self.check_futures:
+            check_future_placement(node)
         for alias in node.names:
             if alias.name == "*":
                 continue
@@ -3,11 +3,56 @@
 
 import ast
 from ast import AST, copy_location
-from typing import Any, Sequence, TypeVar, Union
+from typing import Any, Callable, Dict, Sequence, Tuple, Type, TypeVar, Union
 
 # XXX should probably rename ASTVisitor to ASTWalker
 # XXX can it be made even more generic?
 
+# Fields that never hold AST nodes (identifiers, constants, flags), by node type.
+# generic_visit doesn't need to look at these.
+_SCALAR_FIELDS: Dict[Type[AST], Tuple[str, ...]] = {
+    ast.FunctionDef: ("name", "type_comment"),
+    ast.AsyncFunctionDef: ("name", "type_comment"),
+    ast.ClassDef: ("name",),
+    ast.Assign: ("type_comment",),
+    ast.AnnAssign: ("simple",),
+    ast.For: ("type_comment",),
+    ast.AsyncFor: ("type_comment",),
+    ast.With: ("type_comment",),
+    ast.AsyncWith: ("type_comment",),
+    ast.ImportFrom: ("module", "level"),
+    ast.Global: ("names",),
+    ast.Nonlocal: ("names",),
+    ast.FormattedValue: ("conversion",),
+    ast.Constant: ("value", "kind"),
+    ast.Attribute: ("attr",),
+    ast.Name: ("id",),
+    ast.comprehension: ("is_async",),
+    ast.ExceptHandler: ("name",),
+    ast.arg: ("arg", "type_comment"),
+    ast.keyword: ("arg",),
+    ast.alias: ("name", "asname"),
+    ast.MatchSingleton: ("value",),
+    ast.MatchMapping: ("rest",),
+    ast.MatchClass: ("kwd_attrs",),
+    ast.MatchStar: ("name",),
+    ast.MatchAs: ("name",),
+    ast.TypeIgnore: ("lineno", "tag"),
+}
+
+_CHILD_FIELDS: Dict[Type[AST], Tuple[str, ...]] = {}
+
+
+def child_fields(klass: Type[AST]) -> Tuple[str, ...]:
+    """The fields of `klass` that can hold AST nodes or lists of them."""
+    fields = _CHILD_FIELDS.get(klass)
+    if fields is None:
+        scalar = _SCALAR_FIELDS.get(klass, ())
+        fields = _CHILD_FIELDS[klass] = tuple(
+            field for field in klass._fields if field not in scalar
+        )
+    return fields
+
 
 class ASTVisitor:
     """Performs a depth-first walk of the AST
@@ -23,13 +68,29 @@ class ASTVisitor:
         It accepts extra parameters through the visit methods for flowing state
         It uses "visitNodeName" instead of "visit_NodeName"
         It accepts a list to the generic_visit function rather than just nodes
+
+    Visit methods are looked up once per visitor class and node type; call
+    clear_dispatch_table() after replacing visit methods on an existing class.
     """
 
     VERBOSE = 0
 
+    # Visit function for each node type, per visitor class.
+    _dispatch: Dict[Type[AST], Callable[..., Any]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
+    @classmethod
+    def clear_dispatch_table(cls) -> None:
+        """Forget the visit methods resolved for this class and its subclasses."""
+        cls._dispatch.clear()
+        for subclass in cls.__subclasses__():
+            subclass.clear_dispatch_table()
+
     def __init__(self):
         self.node = None
-        self._cache = {}
 
     def generic_visit(self, node, *args):
         """Called if no explicit visitor function exists for a node."""
@@ -39,7 +100,8 @@ def generic_visit(self, node, *args):
                     self.visit(item, *args)
             return
 
-        for _field, value in ast.iter_fields(node):
+        for field in child_fields(node.__class__):
+            value = getattr(node, field, None)
             if isinstance(value, list):
                 for item in value:
                     if isinstance(item, ast.AST):
@@ -62,12 +124,12 @@ def visit(self, node: Union[AST, Sequence[AST]], *args):
             return self.walk_list(node, *args)
         self.node = node
         klass = node.__class__
-        meth = self._cache.get(klass, None)
+        meth = self._dispatch.get(klass)
         if meth is None:
-            className = klass.__name__
-            meth = getattr(self, "visit" + className, self.generic_visit)
-            self._cache[klass] = meth
-        return meth(node, *args)
+            cls = type(self)
+            meth = getattr(cls, "visit" + klass.__name__, cls.generic_visit)
+            cls._dispatch[klass] = meth
+        return meth(self, node, *args)
 
 
 TAst = TypeVar("TAst", bound=AST)
@@ -125,11 +187,12 @@ def skip_field(self, node: AST, field: str) -> bool:
 
     def generic_visit(self, node: TAst, *args) -> TAst:
         ret_node = node
-        for field, old_value in ast.iter_fields(node):
-            if self.skip_field(node, field):
-                continue
+        for field in child_fields(node.__class__):
+            old_value = getattr(node, field, None)
             if not isinstance(old_value, (AST, list)):
                 continue
+            if self.skip_field(node, field):
+                continue
 
             new_node = self.visit(old_value)
             assert (  # noqa: IG01
@@ -154,6 +217,10 @@ class ExampleASTVisitor(ASTVisitor):
 
     examples = {}
 
+    def __init__(self):
+        super().__init__()
+        self._cache = {}
+
     def visit(self, node, *args):
         self.node = node
         meth = self._cache.get(node.__class__, None)
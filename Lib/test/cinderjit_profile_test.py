@@ -6,6 +6,7 @@
 # 'testcinder_jit_profile' make target.
 
 import os
+import tempfile
 import threading
 import unittest
 from collections import Counter
@@ -153,6 +154,31 @@ def test_get_and_clear_type_profiles(self):
         else:
             self.fail("Didn't find expected profile hit in results")
 
+    @cinder_support.runInSubprocess
+    def test_dump_type_profiles(self):
+        if not PROFILING:
+            return
+
+        from cinderjit_tools.profile_tools import read_profile
+
+        result = 0
+        for i in range(10):
+            result += i
+        self.assertEqual(result, 45)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "snapshot.prof")
+            cinder.dump_type_profiles(path)
+            self.assertEqual(os.listdir(tmp), ["snapshot.prof"])
+            profiles = read_profile(path)
+
+        # Dumping doesn't clear the profiles.
+        self.assertTrue(cinder.get_and_clear_type_profiles())
+        self.assertEqual(len(profiles), 1)
+        (profile,) = profiles.values()
+        code_keys = list(profile.codes)
+        self.assertTrue(any("test_dump_type_profiles" in k for k in code_keys))
+
 
 @cinder_support.failUnlessJITCompiled
 def run_cls_meth(cls):
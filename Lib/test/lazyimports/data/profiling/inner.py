@@ -0,0 +1 @@
+Inner = "Inner"
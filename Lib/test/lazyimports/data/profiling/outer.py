@@ -0,0 +1,3 @@
+from test.lazyimports.data.profiling.inner import Inner
+
+Outer = Inner + "Outer"
@@ -0,0 +1,57 @@
+"""
+Test recording where lazy imports get resolved
+"""
+import self
+if not self._lazy_imports:
+    self.skipTest("Test relevant only when running with global lazy imports enabled")
+
+import os
+import tempfile
+from compiler.strict.track_import_call import LazyImportProfiler
+
+from test.lazyimports.data.profiling.outer import Outer
+
+with LazyImportProfiler() as profiler:
+    self.assertEqual(Outer, "InnerOuter")
+
+records = {(record[2], record[6]): record for record in profiler.records}
+by_id = {record[0]: record for record in profiler.records}
+
+def nested_in(record, parent):
+    while record[1] in by_id:
+        record = by_id[record[1]]
+        if record is parent:
+            return True
+    return False
+
+outer = records["test.lazyimports.data.profiling.outer.Outer", True]
+outer_load = records["test.lazyimports.data.profiling.outer", False]
+inner = records["test.lazyimports.data.profiling.inner.Inner", True]
+inner_load = records["test.lazyimports.data.profiling.inner", False]
+
+# Resolving Outer loads the outer module, which resolves Inner while it runs.
+self.assertEqual(outer[3:5], (__name__, 15))
+self.assertTrue(nested_in(outer_load, outer))
+self.assertEqual(inner[3:5], ("test.lazyimports.data.profiling.outer", 3))
+self.assertTrue(nested_in(inner, outer_load))
+self.assertTrue(nested_in(inner_load, inner))
+self.assertGreaterEqual(outer[5], outer_load[5])
+self.assertGreaterEqual(outer_load[5], inner[5])
+
+stacks = profiler.collapsed_stacks()
+outer_frame = f"test.lazyimports.data.profiling.outer.Outer ({__name__}:15)"
+outer_load_frame = "import test.lazyimports.data.profiling.outer ("
+inner_frame = "test.lazyimports.data.profiling.inner.Inner (test.lazyimports.data.profiling.outer:3)"
+self.assertIn(outer_frame, stacks)
+self.assertTrue(any(s.startswith(f"{outer_frame};") for s in stacks))
+self.assertTrue(
+    any(f";{outer_load_frame}" in s and s.endswith(inner_frame) for s in stacks)
+)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "imports.folded")
+    profiler.write_flamegraph(path)
+    with open(path) as f:
+        lines = f.read().splitlines()
+self.assertEqual(len(lines), len(stacks))
+self.assertTrue(all(line.rpartition(" ")[2].isdigit() for line in lines))
@@ -4938,6 +4938,497 @@ def test_func_destroyed_during_preload(self):
         self.assertEqual(proc.stdout, expected_stdout)
 
 
+class AutoJITTests(unittest.TestCase):
+    def run_auto_jit(self, code, *args):
+        proc = subprocess.run(
+            [sys.executable, "-X", "jit-auto=5", *args, "-c", dedent(code)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding=sys.stdout.encoding,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return proc.stdout
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_queue_compiles_in_batches(self):
+        out = self.run_auto_jit(
+            """
+            import cinderjit
+
+            def f():
+                return 1
+
+            def g():
+                return 2
+
+            def loop(n):
+                total = 0
+                for i in range(n):
+                    total += i
+                return total
+
+            # Functions called during startup may have been queued; compile
+            # them first so that the batch below only has this script's.
+            cinderjit.compile_auto_jit_queue()
+            cinderjit.get_and_clear_runtime_stats()
+            for _ in range(10):
+                f()
+            loop(1000)
+            loop(1)
+            # f and loop are queued, and keep running in the interpreter until
+            # g fills the queue.
+            print(cinderjit.is_jit_compiled(f), cinderjit.is_jit_compiled(loop))
+            for _ in range(10):
+                g()
+            print(cinderjit.is_jit_compiled(f), cinderjit.is_jit_compiled(loop))
+            stats = cinderjit.get_and_clear_runtime_stats()["auto_jit"]
+            print(stats["queued"], stats["compiled"], stats["batches"])
+            """,
+            "-X",
+            "jit-auto-queue-size=3",
+            "-X",
+            "jit-auto-backedge-threshold=100",
+        )
+        self.assertEqual(out, "False False\nTrue True\n3 3 1\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_while_loop_backedges(self):
+        # while loops close with a conditional jump rather than JUMP_ABSOLUTE.
+        out = self.run_auto_jit(
+            """
+            import cinderjit
+
+            def loop(n):
+                i = 0
+                while i < n:
+                    i += 1
+                return i
+
+            loop(1000)
+            print(cinderjit.is_jit_compiled(loop))
+            loop(1)
+            print(cinderjit.is_jit_compiled(loop))
+            """,
+            "-X",
+            "jit-auto-backedge-threshold=100",
+        )
+        self.assertEqual(out, "False\nTrue\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_compile_queue_before_fork(self):
+        out = self.run_auto_jit(
+            """
+            import cinderjit
+
+            def f():
+                return 1
+
+            for _ in range(10):
+                f()
+            print(cinderjit.is_jit_compiled(f))
+            # Functions called during startup may be queued too.
+            print(cinderjit.compile_auto_jit_queue() >= 1)
+            print(cinderjit.is_jit_compiled(f))
+            """,
+            "-X",
+            "jit-auto-queue-size=100",
+        )
+        self.assertEqual(out, "False\nTrue\nTrue\n")
+
+
+class RecompileTests(unittest.TestCase):
+    SCRIPT = """
+        import sys
+
+        def add(a, b):
+            return a + b
+
+        if sys.argv[1] == "profile":
+            for _ in range(100):
+                add(1, 2)
+        else:
+            import cinderjit
+
+            cinderjit.get_and_clear_runtime_stats()
+            for _ in range(10):
+                add(1.5, 2.5)
+            stats = cinderjit.get_and_clear_runtime_stats()
+            deopts = sum(
+                d["int"]["count"]
+                for d in stats["deopt"]
+                if d["normal"]["func_qualname"] == "add"
+            )
+            print(cinderjit.is_jit_compiled(add), deopts)
+            for event in stats["recompile"]:
+                guards = [(g["func_qualname"], g["count"]) for g in event["guards"]]
+                print(event["func_qualname"], event["recompiles"], event["capped"], guards)
+        """
+
+    # Guards on floats fail for ints, whose deopts are reported per phase.
+    RETYPE_SCRIPT = """
+        import sys
+        import time
+
+        def add(a, b):
+            return a + b
+
+        if sys.argv[1] == "profile":
+            for _ in range(100):
+                add(1, 2)
+        else:
+            import cinderjit
+
+            def guilty_types(calls, delay=0):
+                cinderjit.get_and_clear_runtime_stats()
+                for a, b in calls:
+                    add(a, b)
+                    time.sleep(delay)
+                stats = cinderjit.get_and_clear_runtime_stats()
+                return sorted(
+                    {
+                        d["normal"]["guilty_type"]
+                        for d in stats["deopt"]
+                        if d["normal"]["func_qualname"] == "add"
+                    }
+                ), len(stats["recompile"])
+
+            print(*guilty_types([(1.5, 2.5)] * 3, delay=0.05))
+            print(*guilty_types([(1.5, 2.5)] * 10))
+            print(*guilty_types([(1.5, 2.5)] * 10 + [(1, 2)] * 2))
+        """
+
+    # The frame of add that resumes after the deopt is profiled, so goes
+    # through the tracing path, but the interpreted callee it calls isn't.
+    CALLEE_SCRIPT = """
+        import sys
+        from _testinternalcapi import get_use_tracing
+
+        def callee():
+            return get_use_tracing()
+
+        def add(a, b):
+            return a + b, get_use_tracing(), callee(), get_use_tracing()
+
+        if sys.argv[1] == "profile":
+            for _ in range(100):
+                add(1, 2)
+        else:
+            import cinderjit
+
+            cinderjit.jit_suppress(callee)
+            print(*add(1.5, 2.5))
+        """
+
+    def run_script(self, *args, script=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            script_path = os.path.join(tmp, "script.py")
+            profile = os.path.join(tmp, "profile")
+            with open(script_path, "w") as f:
+                f.write(dedent(script or self.SCRIPT))
+            for mode, flags in (
+                ("profile", ["-X", f"jit-write-profile={profile}"]),
+                ("test", ["-X", f"jit-read-profile={profile}", "-X", "jit", *args]),
+            ):
+                proc = subprocess.run(
+                    [sys.executable, *flags, script_path, mode],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    encoding=sys.stdout.encoding,
+                )
+                self.assertEqual(proc.returncode, 0, proc.stderr)
+        return proc.stdout
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_no_recompile_by_default(self):
+        self.assertEqual(self.run_script(), "True 10\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_recompile_after_guard_failures(self):
+        out = self.run_script("-X", "jit-recompile-threshold=3")
+        self.assertEqual(out, "True 3\nadd 1 False [('add', 3)]\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_max_recompiles(self):
+        out = self.run_script(
+            "-X", "jit-recompile-threshold=3", "-X", "jit-max-recompiles=0"
+        )
+        self.assertEqual(out, "True 10\nadd 0 True [('add', 3)]\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_recompile_uses_interpreter_profile(self):
+        out = self.run_script(
+            "-X",
+            "jit-recompile-threshold=3",
+            "-X",
+            "jit-recompile-window-ms=10",
+            script=self.RETYPE_SCRIPT,
+        )
+        # Failures further apart than the window never add up to a recompile.
+        # Once they do, the types the interpreter profiled after the deopts
+        # replace the stale ones, so the code speculates on floats instead.
+        self.assertEqual(out, "['float'] 0\n['float'] 1\n['int'] 0\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_profiling_is_not_inherited_by_callees(self):
+        out = self.run_script(
+            "-X", "jit-recompile-threshold=3", script=self.CALLEE_SCRIPT
+        )
+        self.assertEqual(out, "4.0 True False True\n")
+
+
+class ActiveCodeBudgetTests(unittest.TestCase):
+    SCRIPT = """
+        import cinderjit
+
+        def f():
+            return 1
+
+        def g():
+            return 2
+
+        def h():
+            return 3
+
+        cinderjit.get_and_clear_runtime_stats()
+        f()
+        g()
+        h()
+        f()
+        print([cinderjit.is_jit_compiled(func) for func in (f, g, h)])
+        stats = cinderjit.get_and_clear_runtime_stats()["active_code"]
+        print(stats["sweeps"], [e["func_qualname"] for e in stats["deactivations"]])
+        print(cinderjit.force_compile(f), cinderjit.is_jit_compiled(f))
+        """
+    JIT_LIST = ["__main__:f", "__main__:g", "__main__:h"]
+
+    # caller() calls callee() directly and C.m() through C's vtable.
+    STATIC_SCRIPT = """
+        import ast
+        import builtins
+        import sys
+        from compiler.static import StaticCodeGenerator
+        from compiler.static.compiler import Compiler
+        from compiler.strict.common import FIXED_MODULES
+
+        import cinderjit
+
+        SOURCE = '''
+        class C:
+            def m(self) -> int:
+                return 1
+
+        def callee() -> int:
+            return 2
+
+        def caller(c: C) -> int:
+            return callee() + c.m()
+        '''
+
+        compiler = Compiler(StaticCodeGenerator)
+        code = compiler.compile("static_mod", "static_mod.py", ast.parse(SOURCE), 0)
+        mod = type(sys)("static_mod")
+        mod.__dict__["<builtins>"] = builtins.__dict__
+        mod.__dict__["<fixed-modules>"] = FIXED_MODULES
+        sys.modules["static_mod"] = mod
+        exec(code, mod.__dict__)
+
+        cinderjit.get_and_clear_runtime_stats()
+        c = mod.C()
+        print([mod.caller(c) for _ in range(3)])
+        print([cinderjit.is_jit_compiled(f) for f in (mod.caller, mod.callee, mod.C.m)])
+        stats = cinderjit.get_and_clear_runtime_stats()["active_code"]
+        print(stats["sweeps"] > 0, stats["deactivations"])
+        """
+    STATIC_JIT_LIST = ["static_mod:caller", "static_mod:callee", "static_mod:C.m"]
+
+    # Compiling h deactivates f, as in SCRIPT, but leaves its code allocated.
+    ALLOCATOR_SCRIPT = """
+        import cinderjit
+
+        def f():
+            return 1
+
+        def g():
+            return 2
+
+        def h():
+            return 3
+
+        cinderjit.get_and_clear_runtime_stats()
+        f()
+        g()
+        used_bytes = cinderjit.get_allocator_stats()["used_bytes"]
+        h()
+        stats = cinderjit.get_and_clear_runtime_stats()["active_code"]
+        allocator = cinderjit.get_allocator_stats()
+        deactivated = stats["deactivated_bytes"]
+        print(deactivated > 0, allocator["used_bytes"] > used_bytes)
+        print(allocator["used_bytes"] >= stats["active_bytes"] + deactivated)
+        """
+
+    def run_script(self, *args, script=SCRIPT, jit_list=JIT_LIST):
+        with tempfile.TemporaryDirectory() as tmp:
+            script_path = os.path.join(tmp, "script.py")
+            jit_list_path = os.path.join(tmp, "jitlist.txt")
+            with open(script_path, "w") as f:
+                f.write(dedent(script))
+            with open(jit_list_path, "w") as f:
+                f.write("".join(f"{entry}\n" for entry in jit_list))
+            proc = subprocess.run(
+                [
+                    sys.executable,
+                    "-X",
+                    "jit",
+                    "-X",
+                    f"jit-list-file={jit_list_path}",
+                    *args,
+                    script_path,
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                encoding=sys.stdout.encoding,
+            )
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+        return proc.stdout
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_no_budget_by_default(self):
+        self.assertEqual(self.run_script(), "[True, True, True]\n0 []\nFalse True\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_deactivate_uncalled_functions(self):
+        # Each compilation goes over the budget and sweeps. Only f isn't called
+        # between the sweeps after compiling g and h, so h's compilation
+        # deactivates it, and f then stays in the interpreter until forced.
+        out = self.run_script(
+            "-X",
+            "jit-active-code-budget=1",
+            "-X",
+            "jit-active-code-sweep-interval-ms=0",
+        )
+        self.assertEqual(out, "[False, True, True]\n3 ['f']\nTrue True\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_sweep_interval(self):
+        out = self.run_script("-X", "jit-active-code-budget=1")
+        self.assertEqual(out, "[True, True, True]\n1 []\nFalse True\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_static_code_not_deactivated(self):
+        out = self.run_script(
+            "-X",
+            "jit-active-code-budget=1",
+            "-X",
+            "jit-active-code-sweep-interval-ms=0",
+            script=self.STATIC_SCRIPT,
+            jit_list=self.STATIC_JIT_LIST,
+        )
+        self.assertEqual(out, "[3, 3, 3]\n[True, True, True]\nTrue []\n")
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_deactivated_code_stays_allocated(self):
+        out = self.run_script(
+            "-X",
+            "jit-active-code-budget=1",
+            "-X",
+            "jit-active-code-sweep-interval-ms=0",
+            script=self.ALLOCATOR_SCRIPT,
+        )
+        self.assertEqual(out, "True True\nTrue\n")
+
+
+class PrecompileFromProfileTests(unittest.TestCase):
+    # Runs in its own process, since the loaded profile data is process-wide.
+    # The first profile covers add() and late(), which is only defined once
+    # a bad profile and a second one have been loaded, so it only gets its
+    # profiled types if the first profile's data is still loaded by then.
+    SCRIPT = """
+        import os
+        import struct
+        import sys
+        import tempfile
+        import zlib
+
+        import cinderjit
+
+        def write_profile(path, codes):
+            # Version 2 profile data keyed like jit::codeKey(), with ints for
+            # the operands of the binary op at offset 4.
+            data = struct.pack("<QII", 0x7265646E6963, 2, len(codes))
+            for code in codes:
+                key = (
+                    f"{code.co_filename}:{code.co_firstlineno}:"
+                    f"{code.co_name}:{zlib.crc32(code.co_code)}"
+                ).encode()
+                data += struct.pack("<H", len(key)) + key
+                data += struct.pack("<HHBB", 1, 4, 1, 2)
+                data += struct.pack("<H", 3) + b"int"
+                data += struct.pack("<H", 3) + b"int"
+            with open(path, "wb") as f:
+                f.write(data)
+
+        def add(x, y):
+            return x + y
+
+        def mul(x, y):
+            return x * y
+
+        late_module = compile("def late(x, y):\\n    return x + y\\n", "late", "exec")
+
+        def has_guards(func):
+            return "GuardType" in cinderjit.get_function_hir_opcode_counts(func)
+
+        workers = int(sys.argv[1])
+        with tempfile.TemporaryDirectory() as tmp:
+            first = os.path.join(tmp, "first")
+            second = os.path.join(tmp, "second")
+            bad = os.path.join(tmp, "bad")
+            write_profile(first, [add.__code__, late_module.co_consts[0]])
+            write_profile(second, [mul.__code__])
+            with open(bad, "wb") as f:
+                f.write(b"not a profile")
+
+            stats = cinderjit.precompile_from_profile(first, workers=workers)
+            print(stats["profiled"], stats["not_found"], stats["compiled"])
+            print(cinderjit.is_jit_compiled(add), cinderjit.is_jit_compiled(mul))
+            print(has_guards(add), add(1, 2))
+            try:
+                cinderjit.precompile_from_profile(bad)
+            except ValueError:
+                print("ValueError")
+            stats = cinderjit.precompile_from_profile(second, workers=workers)
+            print(stats["profiled"], stats["not_found"], stats["compiled"])
+
+        ns = {}
+        exec(late_module, ns)
+        late = ns["late"]
+        print(cinderjit.force_compile(late), has_guards(late), late(1, 2))
+        """
+    EXPECTED = "2 1 1\nTrue False\nTrue 3\nValueError\n1 0 1\nTrue True 3\n"
+
+    def run_script(self, workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            script_path = os.path.join(tmp, "script.py")
+            with open(script_path, "w") as f:
+                f.write(dedent(self.SCRIPT))
+            proc = subprocess.run(
+                [sys.executable, "-X", "jit", script_path, str(workers)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                encoding=sys.stdout.encoding,
+            )
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+        return proc.stdout
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_precompile_inline(self):
+        self.assertEqual(self.run_script(0), self.EXPECTED)
+
+    @cinder_support.skipUnlessJITEnabled("Runs a subprocess with the JIT enabled")
+    def test_precompile_threaded(self):
+        self.assertEqual(self.run_script(2), self.EXPECTED)
+
+
 class LoadMethodEliminationTests(unittest.TestCase):
     def lme_test_func(self, flag=False):
         return "{}{}".format(
@@ -4969,5 +5460,49 @@ def func():
         self.assertGreaterEqual(ops.get("Decref"), 2)
 
 
+@unittest.skipIf(not cinderjit, "Tests functionality on cinderjit module")
+class CodeReportTests(unittest.TestCase):
+    def test_not_a_function(self):
+        with self.assertRaises(TypeError):
+            cinderjit.get_code_report(1)
+
+    def test_deopt_report(self):
+        @cinder_support.failUnlessJITCompiled
+        def raises():
+            raise ValueError("boom")
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                raises()
+
+        report = cinderjit.get_code_report(raises)
+        self.assertTrue(report["compiled"])
+        deopts = [
+            (offset, deopt)
+            for offset, entry in report["offsets"].items()
+            for deopt in entry["deopts"]
+            if deopt["reason"] == "Raise"
+        ]
+        self.assertEqual(len(deopts), 1)
+        offset, deopt = deopts[0]
+        self.assertEqual(deopt["count"], 3)
+        entry = report["offsets"][offset]
+        self.assertEqual(entry["opname"], "RAISE_VARARGS")
+        self.assertEqual(entry["lineno"], raises.__code__.co_firstlineno + 2)
+
+        # Reading the report doesn't clear what it's built from.
+        self.assertEqual(cinderjit.get_code_report(raises), report)
+
+    def test_interpreted_function(self):
+        @cinderjit.jit_suppress
+        def f():
+            return 1
+
+        self.assertEqual(f(), 1)
+        report = cinderjit.get_code_report(f)
+        self.assertFalse(report["compiled"])
+        self.assertEqual(report["offsets"], {})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,232 @@
+import json
+import os
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from cinderjit_tools.autolist import (
+    aggregate_hits,
+    DEFAULT_FUNCTION_SIZE,
+    format_jit_list,
+    FunctionHits,
+    main,
+    select_functions,
+    SizeEstimator,
+)
+from cinderjit_tools.profile_tools import (
+    CodeKey,
+    diff_profiles,
+    dump_profile,
+    iter_records,
+    load_profile,
+    main as profile_tools_main,
+    merge_profile_files,
+    merge_profiles,
+    Profile,
+    ProfileChange,
+    ProfileError,
+    ProfileRecord,
+    read_profile,
+    write_profile,
+)
+
+
+def profile_item(filename, firstlineno, qualname, count, opname=None):
+    normal = {"func_qualname": qualname, "filename": filename}
+    ints = {"code_hash": 1234, "firstlineno": firstlineno, "count": count}
+    if opname is not None:
+        normal["opname"] = opname
+        ints["bc_offset"] = 0
+        ints["lineno"] = firstlineno
+    return {"normal": normal, "int": ints}
+
+
+PROFILES = [
+    profile_item("/src/a.py", 1, "f", 10, "BINARY_ADD"),
+    profile_item("/src/a.py", 1, "f", 5),
+    profile_item("/src/a.py", 10, "C.g", 100, "LOAD_ATTR"),
+    profile_item("/src/b.py", 3, "h", 1),
+]
+
+
+class AutolistTests(unittest.TestCase):
+    def test_aggregate_hits(self):
+        ranked = aggregate_hits(PROFILES)
+        self.assertEqual(
+            [(f.qualname, f.hits) for f in ranked], [("C.g", 100), ("f", 15), ("h", 1)]
+        )
+        self.assertEqual(ranked[0].jit_list_entry, "C.g@a.py:10")
+
+    def test_thresholds(self):
+        ranked = aggregate_hits(PROFILES)
+        self.assertEqual(len(select_functions(ranked)), 3)
+        self.assertEqual(len(select_functions(ranked, min_hits=2)), 2)
+        self.assertEqual(len(select_functions(ranked, coverage=0.8)), 1)
+        self.assertEqual(len(select_functions(ranked, coverage=0.9)), 2)
+
+    def test_size_budget(self):
+        ranked = aggregate_hits(PROFILES)
+        sizes = {"C.g": 300, "f": 200, "h": 50}
+
+        def size_of(func: FunctionHits) -> int:
+            return sizes[func.qualname]
+
+        selected = select_functions(ranked, size_budget=400, size_of=size_of)
+        # f doesn't fit after C.g, but the smaller h does.
+        self.assertEqual([f.qualname for f in selected], ["C.g", "h"])
+
+    def test_format(self):
+        jit_list = format_jit_list(aggregate_hits(PROFILES))
+        lines = jit_list.splitlines()
+        self.assertTrue(lines[0].startswith("#"))
+        self.assertEqual(lines[1:], ["C.g@a.py:10", "f@a.py:1", "h@b.py:3"])
+
+    def test_estimate_from_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mod.py")
+            source = textwrap.dedent(
+                """
+                class C:
+                    def g(self):
+                        return self.x + 1
+                """
+            )
+            with open(path, "w") as f:
+                f.write(source)
+            ns = {}
+            exec(compile(source, path, "exec"), ns)
+            g_code = ns["C"].g.__code__
+
+            estimator = SizeEstimator(bytes_per_bytecode=2)
+            self.assertEqual(
+                estimator(FunctionHits(path, 3, "C.g", 0, 1)), 2 * len(g_code.co_code)
+            )
+            self.assertEqual(
+                estimator(FunctionHits(path, 100, "nope", 0, 1)), DEFAULT_FUNCTION_SIZE
+            )
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            with open(path, "w") as f:
+                json.dump({"profile": PROFILES, "type_metadata": []}, f)
+            out = StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(main(["--min-hits", "10", path]), 0)
+        self.assertEqual(out.getvalue().splitlines()[1:], ["C.g@a.py:10", "f@a.py:1"])
+
+
+class ProfileToolsTests(unittest.TestCase):
+    def test_round_trip(self):
+        profiles = {
+            0x030A: Profile(
+                {"k1": {4: [("int", "int")], 10: [("str",), ("bytes",)]}},
+                {"C": ["x", "y"]},
+            ),
+            0x0308: Profile({"k2": {0: [("C",)]}}),
+        }
+        self.assertEqual(load_profile(dump_profile(profiles)), profiles)
+
+    def test_bad_data(self):
+        with self.assertRaisesRegex(ProfileError, "magic"):
+            load_profile(b"\0" * 12)
+        data = dump_profile({0x030A: Profile({"k": {0: [("int",)]}})})
+        with self.assertRaisesRegex(ProfileError, "truncated"):
+            load_profile(data[:-8])
+
+    def test_merge(self):
+        snapshots = [
+            {0x030A: Profile({"k": {0: [("int",)]}}, {"C": ["x"]})},
+            {0x030A: Profile({"k": {0: [("str",)], 2: [("C",)]}}, {"C": ["y"]})},
+            {0x030A: Profile({"k": {0: [("str",), ("float",)]}})},
+            {0x0308: Profile({"k": {0: [("float",)]}})},
+        ]
+        merged = merge_profile_files(snapshots)
+        self.assertEqual(
+            merged[0x030A],
+            Profile(
+                {"k": {0: [("str",), ("int",), ("float",)], 2: [("C",)]}},
+                {"C": ["x", "y"]},
+            ),
+        )
+        self.assertEqual(merged[0x0308], Profile({"k": {0: [("float",)]}}))
+
+    def test_main_merge(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i, type_name in enumerate(["int", "str", "str"]):
+                path = os.path.join(tmp, f"snapshot{i}.prof")
+                write_profile(path, {0x030A: Profile({"k": {0: [(type_name,)]}})})
+                paths.append(path)
+            out = os.path.join(tmp, "merged.prof")
+            self.assertEqual(profile_tools_main(["merge", "-o", out, *paths]), 0)
+            self.assertEqual(
+                read_profile(out)[0x030A].codes, {"k": {0: [("str",), ("int",)]}}
+            )
+
+    def test_records(self):
+        key = "/src/a.py:3:C.f:1234"
+        profiles = {0x030A: Profile({key: {4: [("int",)]}})}
+        code_key = CodeKey("/src/a.py", 3, "C.f", 1234)
+        self.assertEqual(
+            list(iter_records(profiles)),
+            [ProfileRecord(0x030A, code_key, 4, [("int",)])],
+        )
+        self.assertEqual(str(CodeKey.parse(key)), key)
+        with self.assertRaisesRegex(ProfileError, "malformed"):
+            CodeKey.parse("nope")
+
+    def test_weighted_merge(self):
+        snapshots = [
+            {0x030A: Profile({"hot": {0: [("int",)]}, "cold": {0: [("int",)]}})},
+            {0x030A: Profile({"hot": {0: [("str",)]}})},
+        ]
+        merged = merge_profile_files(snapshots, weights=[1, 3], min_weight=2)
+        self.assertEqual(merged[0x030A].codes, {"hot": {0: [("str",), ("int",)]}})
+        with self.assertRaisesRegex(ValueError, "got 1 weights for 2 profiles"):
+            merge_profile_files(snapshots, weights=[1])
+        with self.assertRaisesRegex(ValueError, "got 3 weights for 2 profiles"):
+            merge_profiles([Profile({}), Profile({})], weights=[1, 2, 3])
+
+    def test_diff(self):
+        old = Profile({"k": {0: [("int",)], 2: [("str",)]}, "gone": {0: [("C",)]}})
+        new = Profile({"k": {0: [("int",)], 2: [("bytes",)]}, "new": {4: [("C",)]}})
+        self.assertEqual(
+            diff_profiles(old, new),
+            [
+                ProfileChange("k", 2, [("str",)], [("bytes",)]),
+                ProfileChange("gone", 0, [("C",)], []),
+                ProfileChange("new", 4, [], [("C",)]),
+            ],
+        )
+        self.assertEqual(diff_profiles(old, old), [])
+
+    def test_main_show_and_diff(self):
+        key = "/src/a.py:3:f:1234"
+        with tempfile.TemporaryDirectory() as tmp:
+            old = os.path.join(tmp, "old.prof")
+            new = os.path.join(tmp, "new.prof")
+            write_profile(old, {0x030A: Profile({key: {4: [("int", "str")]}})})
+            write_profile(new, {0x030A: Profile({key: {4: [("int",), ("str",)]}})})
+
+            out = StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(profile_tools_main(["show", old]), 0)
+            self.assertEqual(
+                out.getvalue().splitlines(), ["# Python 3.10", f"{key} @ 4: (int, str)"]
+            )
+
+            out = StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(profile_tools_main(["diff", old, new]), 1)
+                self.assertEqual(profile_tools_main(["diff", old, old]), 0)
+            self.assertEqual(
+                out.getvalue().splitlines(),
+                ["# Python 3.10", f"{key} @ 4: (int, str) -> (int) | (str)"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -16,5 +16,6 @@
 from .test_visitor import VisitorTests
 
 if "cinder" in sys.version:
+    from .test_benchmark import BenchmarkTests
     from .test_static import *
     from .test_strict import *
@@ -0,0 +1,92 @@
+import glob
+import json
+from contextlib import redirect_stdout
+from io import StringIO
+
+from compiler import pyassem, pycodegen
+from compiler.benchmark import (
+    CORPORA,
+    main,
+    PhaseTimer,
+    read_sources,
+    run_benchmark,
+)
+from compiler.static.type_binder import TypeBinder
+
+from .common import CompilerTest
+
+SOURCE = b"""
+def f(x: int) -> int:
+    def g(y: int) -> int:
+        return x + y
+    if x:
+        return g(1)
+    return 0
+"""
+
+
+class BenchmarkTests(CompilerTest):
+    def sources(self):
+        return [("bench_mod", "bench_mod.py", SOURCE)]
+
+    def check_phases(self, result, phases):
+        self.assertEqual(result.failed, [])
+        self.assertEqual(result.files, 1)
+        for phase in phases:
+            self.assertGreater(result.times[phase], 0.0, phase)
+
+    def test_cinder(self):
+        result = run_benchmark("cinder", self.sources(), repeat=1)
+        common = ["parse", "symbols", "codegen", "optimize_cfg", "assembly"]
+        self.check_phases(result, common)
+        self.assertEqual(result.times["type_binding"], 0.0)
+        self.assertIn("codegen", result.blocks)
+
+    def test_static(self):
+        result = run_benchmark("static", self.sources(), repeat=1)
+        self.check_phases(
+            result,
+            ["parse", "declaration", "symbols", "type_binding", "codegen", "assembly"],
+        )
+
+    def test_strict(self):
+        result = run_benchmark("strict", self.sources(), repeat=1, count_blocks=False)
+        self.check_phases(result, ["parse", "feature_extraction", "codegen"])
+        self.assertEqual(result.blocks, {})
+
+    def test_failed_sources_excluded(self):
+        sources = self.sources() + [("bad", "bad.py", b"def f(:\n")]
+        result = run_benchmark("cinder", sources, repeat=1, count_blocks=False)
+        self.assertEqual(result.failed, ["bad.py"])
+        self.assertEqual(result.files, 1)
+
+    def test_originals_restored(self):
+        originals = (
+            pycodegen.parse,
+            pyassem.PyFlowGraph.__dict__["getCode"],
+            TypeBinder.__dict__.get("visitModule"),
+        )
+        timer = PhaseTimer()
+        with timer.installed():
+            self.assertIsNot(pycodegen.parse, originals[0])
+        self.assertEqual(
+            originals,
+            (
+                pycodegen.parse,
+                pyassem.PyFlowGraph.__dict__["getCode"],
+                TypeBinder.__dict__.get("visitModule"),
+            ),
+        )
+
+    def test_main_json(self):
+        files = sorted(glob.glob(CORPORA["testcorpus"]))[:2]
+        self.assertEqual(len(read_sources(files)), 2)
+        out = StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(
+                main(["--json", "-n", "1", "--no-blocks", "-g", "cinder", *files]), 0
+            )
+        (result,) = json.loads(out.getvalue())
+        self.assertEqual(result["generator"], "cinder")
+        self.assertEqual(result["files"] + len(result["failed"]), 2)
+        self.assertGreater(result["total_time"], 0.0)
@@ -1,6 +1,9 @@
 import ast
 import dis
 import unittest
+from compiler.flow_graph_optimizer import FlowGraphOptimizer
+from compiler.opcodebase import OPCODE_NAMES, opcode_number, PSEUDO_OPCODE_BASE
+from compiler.pyassem import FLAT, instrsize, Instruction
 from compiler.pycodegen import CodeGenerator
 from dis import opmap, opname
 from unittest import TestCase
@@ -106,6 +109,122 @@ async def f():
         )
         self.assert_graph_equal(graph, expected)
 
+    def test_integer_opcodes(self):
+        graph = self.to_graph("x = a if b else c")
+        for block in graph.getBlocks():
+            for instr in block.getInstructions():
+                self.assertEqual(instr.opcode, opmap[instr.opname])
+                self.assertEqual(
+                    instr.is_jump(graph.opcode),
+                    instr.opcode in dis.hasjrel or instr.opcode in dis.hasjabs,
+                )
+
+        instr = Instruction("LOAD_CONST", 1)
+        instr.opname = "NOP"
+        self.assertEqual(instr.opcode, opmap["NOP"])
+        self.assertEqual(instr.copy().opname, "NOP")
+        self.assertFalse(hasattr(instr, "__dict__"))
+
+    def test_pseudo_opcodes(self):
+        op = opcode_number("NOT_AN_OPCODE")
+        self.assertGreaterEqual(op, PSEUDO_OPCODE_BASE)
+        self.assertEqual(opcode_number("NOT_AN_OPCODE"), op)
+        self.assertEqual(OPCODE_NAMES[op], "NOT_AN_OPCODE")
+        self.assertEqual(Instruction("NOT_AN_OPCODE", 0).opname, "NOT_AN_OPCODE")
+
+    def test_opcode_tables(self):
+        graph = self.to_graph("pass")
+        opcode = graph.opcode
+        tables = opcode.tables
+        for name, op in opcode.opmap.items():
+            self.assertEqual(tables.jumps[op], opcode.has_jump(op), name)
+            effect = tables.stack_effects[op]
+            if isinstance(effect, int):
+                self.assertEqual(effect, opcode.stack_effect_raw(name, 0, False))
+
+    def flatten_by_relayout(self, graph):
+        # Lay out the whole graph until no jump changes size.
+        opcode = graph.opcode
+        changed = True
+        while changed:
+            changed = False
+            graph.insts = insts = []
+            pc = 0
+            for block in graph.getBlocksInOrder():
+                block.offset = pc
+                for instr in block.getInstructions():
+                    insts.append(instr)
+                    pc += instrsize(instr.ioparg)
+            pc = 0
+            for instr in insts:
+                pc += instrsize(instr.ioparg)
+                op = opcode.opmap[instr.opname]
+                if opcode.has_jump(op):
+                    offset = instr.target.offset
+                    if op in opcode.hasjrel:
+                        offset -= pc
+                    if instrsize(instr.ioparg) != instrsize(offset):
+                        changed = True
+                    instr.ioparg = offset
+        graph.stage = FLAT
+
+    def flattened_dispatch(self, branches, flatten):
+        # A flat series of ifs rather than an elif chain, which would nest
+        # too deeply for the compiler to walk.
+        lines = ["while x:"]
+        for i in range(branches):
+            lines.append(f"    if op == {i}:")
+            lines.append(f"        x = x - {i} if x > {i} else x + {i}")
+            lines.append("        continue")
+        lines.append("    break")
+        graph = self.to_graph("\n".join(lines))
+        flatten(graph)
+        return (
+            [(instr.opname, instr.ioparg) for instr in graph.insts],
+            [block.offset for block in graph.getBlocksInOrder()],
+        )
+
+    def test_flatten_extended_arg_jumps(self):
+        # Small enough for one-byte jumps, then long enough for two and three
+        # byte ones.
+        for branches in (2, 100, 4500):
+            with self.subTest(branches=branches):
+                expected = self.flattened_dispatch(branches, self.flatten_by_relayout)
+                actual = self.flattened_dispatch(
+                    branches, lambda graph: graph.flattenGraph()
+                )
+                self.assertEqual(actual, expected)
+        self.assertGreater(max(oparg for __, oparg in actual[0]), 0xFFFF)
+
+    def test_stack_summary(self):
+        source = (
+            "for x in y:\n    if x:\n        z = (a, b, c)\n    else:\n        break"
+        )
+        graph = self.to_graph(source)
+        graph.computeStackDepth()
+        self.assertEqual(graph.stacksize, compile(source, "", "exec").co_stacksize)
+
+        walked = [b for b in graph.getBlocks() if b.startdepth >= 0]
+        self.assertTrue(walked)
+        for block in walked:
+            summary = block.stack_summary
+            self.assertIsNotNone(summary)
+            self.assertIs(graph.get_stack_summary(block), summary)
+            for instr, __ in summary.jumps:
+                self.assertIn(instr, block.insts)
+
+        for_block = next(
+            b for b in walked if any(i.opname == "FOR_ITER" for i in b.insts)
+        )
+        summary = for_block.stack_summary
+        (exit_depth,) = [d for i, d in summary.jumps if i.opname == "FOR_ITER"]
+        # The loop exit starts with the iterator popped, the body with the next
+        # item pushed.
+        self.assertLess(exit_depth, summary.net)
+
+        FlowGraphOptimizer(graph).optimize_basic_block(for_block)
+        self.assertIsNone(for_block.stack_summary)
+
 
 if __name__ == "__main__":
     unittest.main()
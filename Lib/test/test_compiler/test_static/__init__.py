@@ -32,6 +32,7 @@
 from .obj_creation import StaticObjCreationTests
 from .overrides import OverridesTests
 from .patch import StaticPatchTests
+from .peephole import PeepholeTests
 from .perf_lint import PerfLintTests
 from .primitives import PrimitivesTests
 from .property import PropertyTests
@@ -512,6 +512,121 @@ def f() -> str:
             self.assertNotInBytecode(f, "LOAD_GLOBAL", "omg")
             self.assertEqual(f(), "o")
 
+    def test_final_constant_folding_imported(self):
+        acode = """
+        from typing import Final
+
+        DEBUG: Final[bool] = False
+        LEVEL: Final[int] = 3
+        """
+        bcode = """
+        from a import DEBUG, LEVEL
+
+        def f() -> int:
+            if DEBUG:
+                return 1
+            return LEVEL
+        """
+        comp = self.compiler(a=acode, b=bcode)
+        with comp.in_module("b") as mod:
+            f = mod.f
+            self.assertInBytecode(f, "LOAD_CONST", 3)
+            self.assertNotInBytecode(f, "LOAD_CONST", 1)
+            self.assertNotInBytecode(f, "LOAD_GLOBAL")
+            self.assertNotInBytecode(f, "POP_JUMP_IF_FALSE")
+            self.assertEqual(f(), 3)
+
+    def test_final_constant_folding_imported_through_module(self):
+        acode = """
+        from typing import Final
+
+        LEVEL: Final[int] = 3
+        """
+        bcode = """
+        from a import LEVEL
+        """
+        ccode = """
+        from b import LEVEL as L
+
+        def f() -> int:
+            return L
+        """
+        comp = self.compiler(a=acode, b=bcode, c=ccode)
+        with comp.in_module("c") as mod:
+            self.assertInBytecode(mod.f, "LOAD_CONST", 3)
+            self.assertNotInBytecode(mod.f, "LOAD_GLOBAL")
+            self.assertEqual(mod.f(), 3)
+
+    def test_final_constant_folding_imported_and_rebound(self):
+        acode = """
+        from typing import Final
+
+        LEVEL: Final[int] = 3
+        """
+        bcode = """
+        from a import LEVEL
+
+        def f() -> int:
+            return LEVEL
+
+        def set_level() -> None:
+            global LEVEL
+            LEVEL = 4
+        """
+        comp = self.compiler(a=acode, b=bcode)
+        with comp.in_module("b") as mod:
+            self.assertInBytecode(mod.f, "LOAD_GLOBAL", "LEVEL")
+            mod.set_level()
+            self.assertEqual(mod.f(), 4)
+
+    def test_final_constant_folding_imported_expression(self):
+        acode = """
+        from typing import Final
+
+        LEVEL: Final[int] = 3
+        VERBOSE: Final[bool] = LEVEL > 2
+        """
+        bcode = """
+        from a import VERBOSE
+
+        def f() -> int:
+            if VERBOSE:
+                return 1
+            return 0
+        """
+        comp = self.compiler(a=acode, b=bcode)
+        with comp.in_module("b") as mod:
+            # Only Finals assigned a constant are folded across modules.
+            self.assertInBytecode(mod.f, "LOAD_GLOBAL", "VERBOSE")
+            self.assertInBytecode(mod.f, "LOAD_CONST", 0)
+            self.assertEqual(mod.f(), 1)
+
+    def test_final_constant_folding_dead_branches(self):
+        acode = """
+        from typing import Final
+
+        DEBUG: Final[bool] = False
+        LEVEL: Final[int] = 3
+        """
+        bcode = """
+        from a import DEBUG, LEVEL
+
+        def f(x: int) -> int:
+            if not DEBUG and LEVEL > 2:
+                return x
+            elif DEBUG or LEVEL == 3:
+                return x + 100
+            return x + 200
+        """
+        comp = self.compiler(a=acode, b=bcode)
+        with comp.in_module("b") as mod:
+            f = mod.f
+            self.assertNotInBytecode(f, "LOAD_CONST", 100)
+            self.assertNotInBytecode(f, "LOAD_CONST", 200)
+            self.assertNotInBytecode(f, "COMPARE_OP")
+            self.assertNotInBytecode(f, "LOAD_GLOBAL")
+            self.assertEqual(f(1), 1)
+
     def test_final_constant_folding_in_module_scope(self):
         codestr = """
         from typing import Final
@@ -1,5 +1,9 @@
+import ast
 import re
+from compiler.static.type_binder import FIXED_POINT_WIDENING_ITERATIONS, TypeBinder
+from compiler.visitor import ASTVisitor
 from unittest import skip
+from unittest.mock import patch
 
 from .common import StaticTestBase
 
@@ -454,3 +458,109 @@ def f(x: int | None):
                 reveal_type(x)
         """
         self.revealed_type(codestr, "int")
+
+    def test_loop_statement_sees_later_assignment(self) -> None:
+        codestr = """
+            def f(n: int):
+                x = 0
+                y = None
+                while n:
+                    y = x
+                    x = "a" if n else 1
+                reveal_type(y)
+        """
+        self.revealed_type(codestr, "Union[str, Literal[1], Literal[0], None]")
+
+    def test_nested_loops_bind_unchanged_statements_once(self) -> None:
+        depth = 8
+        lines = ["def f(n: int):", "    total: int = 0", "    scale: int = 1"]
+        indent = "    "
+        for level in range(depth):
+            lines.append(f"{indent}for i{level} in range(n):")
+            indent += "    "
+            lines.append(f"{indent}scale = scale + i{level}")
+        lines.append(f"{indent}total = total + scale")
+        lines.append("    reveal_type(total)")
+        codestr = "\n".join(lines)
+
+        visits = 0
+        visit_assign = TypeBinder.visitAssign
+
+        def counting_visit_assign(self, node: ast.Assign) -> None:
+            nonlocal visits
+            visits += 1
+            visit_assign(self, node)
+
+        with patch.object(TypeBinder, "visitAssign", counting_visit_assign):
+            ASTVisitor.clear_dispatch_table()
+            try:
+                self.revealed_type(codestr, "int")
+            finally:
+                ASTVisitor.clear_dispatch_table()
+        # Rebinding every loop body on every iteration of its enclosing loops
+        # would take thousands of visits.
+        self.assertLess(visits, 200)
+
+    def test_loop_increment_converges_without_widening(self) -> None:
+        codestr = """
+            def f(n: int):
+                x = 0
+                while n:
+                    x += 1
+                reveal_type(x)
+        """
+        with patch.object(
+            TypeBinder, "widen_loop_locals", side_effect=AssertionError
+        ):
+            self.revealed_type(codestr, "int")
+
+    def loop_chain(self, names: list[str]) -> list[str]:
+        # Each iteration passes the value assigned to the first name one step
+        # along the chain, so the loop needs one pass per name to converge.
+        lines = [f"{b} = {a}" for a, b in zip(names, names[1:])]
+        lines.reverse()
+        lines.append(f"{names[0]} = 1")
+        return lines
+
+    def test_loop_widens_to_declared_types(self) -> None:
+        names = [f"x{i}" for i in range(2 * FIXED_POINT_WIDENING_ITERATIONS + 2)]
+        body = "\n".join(f"        {line}" for line in self.loop_chain(names))
+        decls = "\n".join(f"    {name}: Optional[int] = None" for name in names)
+        codestr = f"""
+from typing import Optional
+
+def f(n: int):
+{decls}
+    while n:
+{body}
+    reveal_type({names[-1]})
+"""
+        widen = TypeBinder.widen_loop_locals
+        with patch.object(
+            TypeBinder, "widen_loop_locals", autospec=True, side_effect=widen
+        ) as widened:
+            self.revealed_type(codestr, "Optional[int]")
+        self.assertTrue(
+            any(call.kwargs["to_declared"] for call in widened.call_args_list)
+        )
+
+    def test_loop_widening_keeps_primitive_locals(self) -> None:
+        names = [f"x{i}" for i in range(2 * FIXED_POINT_WIDENING_ITERATIONS + 2)]
+        body = "\n".join(f"        {line}" for line in self.loop_chain(names))
+        decls = "\n".join(f"    {name}: int64 = 0" for name in names)
+        codestr = f"""
+from __static__ import box, int64
+
+def f(n: int) -> int:
+{decls}
+    total: int64 = 0
+    while n:
+{body}
+        last = {names[-1]}
+        total += last
+        n -= 1
+    return box(total)
+"""
+        with self.in_module(codestr) as mod:
+            self.assertEqual(mod.f(3), 0)
+            self.assertEqual(mod.f(len(names) + 2), 3)
@@ -1,4 +1,8 @@
+import ast
+import sys
+from compiler.consts import CO_FUTURE_ANNOTATIONS
 from compiler.static.compiler import Compiler
+from compiler.static.module_table import NodeTable
 from compiler.static.types import TypeEnvironment
 from compiler.strict.compiler import Compiler as StrictCompiler
 
@@ -214,3 +218,159 @@ def f(self, v) -> Optional[C]:
         """
         compiler = self.decl_visit(**{"a": acode, "b": bcode})
         compiler.compile_module("b")
+
+    def test_future_import_placement(self) -> None:
+        for code in (
+            """
+                x = 1
+                from __future__ import annotations
+            """,
+            """
+                def f():
+                    from __future__ import annotations
+            """,
+        ):
+            with self.assertRaisesRegex(
+                SyntaxError,
+                "from __future__ imports must occur at the beginning of the file",
+            ):
+                self.compile(code)
+
+    def test_future_flags(self) -> None:
+        code = self.compile(
+            """
+                from __future__ import annotations
+                def f(x: int) -> int:
+                    return x
+            """
+        )
+        self.assertTrue(code.co_flags & CO_FUTURE_ANNOTATIONS)
+
+    def test_node_table(self) -> None:
+        tree = ast.parse("x + y")
+        expr = tree.body[0].value
+        left, right = expr.left, expr.right
+        type_env = TypeEnvironment()
+        a = NodeTable()
+        a[expr] = a[left] = type_env.DYNAMIC
+        a.set_data(expr, str, "expr")
+        self.assertIn(left, a)
+        self.assertNotIn(right, a)
+        self.assertIsNone(a.get(right))
+        self.assertEqual(a.get_data(expr, str), "expr")
+        self.assertIsNone(a.get_opt_data(left, str))
+        with self.assertRaises(KeyError):
+            a.get_data(left, str)
+
+        # A node that is already in another table.
+        b = NodeTable()
+        b[left] = type_env.int.instance
+        self.assertEqual(b[left], type_env.int.instance)
+        self.assertEqual(a[left], type_env.DYNAMIC)
+
+        a.truncate(1)
+        self.assertEqual(len(a), 1)
+        self.assertIn(expr, a)
+        self.assertNotIn(left, a)
+        self.assertEqual(b[left], type_env.int.instance)
+
+    def test_node_data_released(self) -> None:
+        code = """
+            def f(x: int) -> int:
+                return x + 1
+        """
+        compiler = self.compiler(a=code)
+        compiler.compile_module("a")
+        # Without a retention limit, nothing is released.
+        tree = compiler.ast_cache["a"]
+        self.assertIn(tree.body[0].body[0].value, compiler.modules["a"].types)
+
+        compiler = self.compiler(a=code)
+        compiler.max_retained_asts = 10
+        compiler.compile_module("a")
+        table = compiler.modules["a"].types
+        # Only the function definition is left from the declaration visit.
+        self.assertEqual(len(table), 1)
+        tree = compiler.ast_cache["a"]
+        self.assertIn(tree.body[0], table)
+        ret = tree.body[0].body[0]
+        self.assertNotIn(ret.value, table)
+        self.assertFalse(hasattr(ret.value, "_static_node_id"))
+
+    def test_max_retained_asts(self) -> None:
+        acode = """
+            def f(x: int) -> int:
+                return x
+        """
+        bcode = """
+            from a import f
+            def g() -> int:
+                return f(1)
+        """
+        compiler = self.compiler(a=acode, b=bcode)
+        compiler.max_retained_asts = 1
+        compiler.compile_module("a")
+        self.assertIn("a", compiler.ast_cache)
+        compiler.compile_module("b")
+        # a's AST is released, but its declarations are still there.
+        self.assertNotIn("a", compiler.ast_cache)
+        a = compiler.modules["a"]
+        self.assertEqual(len(a.types), a.declared_nodes)
+        self.assertIsNotNone(compiler.modules["a"].get_child("f"))
+        self.assertIn("b", compiler.ast_cache)
+
+        stats = compiler.get_retention_stats()
+        self.assertEqual(stats["modules"], len(compiler.modules))
+        self.assertEqual(stats["asts"], 1)
+        self.assertEqual(stats["compiled_asts"], 1)
+        self.assertEqual(stats["released_asts"], 1)
+        # a's function definitions are still held by its declarations.
+        b_bytes = sum(
+            sys.getsizeof(node) + sys.getsizeof(vars(node))
+            for node in ast.walk(compiler.ast_cache["b"])
+        )
+        self.assertGreater(stats["ast_bytes"], b_bytes)
+        self.assertEqual(
+            stats["retained_bytes"], stats["ast_bytes"] + stats["node_data_bytes"]
+        )
+
+        # Recompiling parses the module again.
+        compiler.compile_module("a")
+        self.assertIn("a", compiler.ast_cache)
+        self.assertNotIn("b", compiler.ast_cache)
+
+    def test_recompile_released_module(self) -> None:
+        acode = """
+            class C:
+                pass
+
+            def make() -> C:
+                return C()
+        """
+        bcode = """
+            from a import C, make
+            def get() -> C:
+                return make()
+        """
+        ccode = """
+            from a import C
+            from b import get
+            def use() -> C:
+                return get()
+        """
+        compiler = self.compiler(a=acode, b=bcode, c=ccode)
+        compiler.max_retained_asts = 1
+        compiler.compile_module("a")
+        klass = compiler.modules["a"].get_child("C")
+        compiler.compile_module("b")
+        self.assertNotIn("a", compiler.ast_cache)
+
+        # Compiling a again keeps the types b was bound against.
+        compiler.compile_module("a")
+        self.assertIn("a", compiler.ast_cache)
+        self.assertIs(compiler.modules["a"].get_child("C"), klass)
+        self.assertIs(compiler.modules["b"].get_child("C"), klass)
+
+        compiler.compile_module("c")
+        self.assertEqual(compiler.error_sink.errors, [])
+        self.assertIs(compiler.modules["c"].get_child("C"), klass)
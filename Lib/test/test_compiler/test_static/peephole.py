@@ -0,0 +1,106 @@
+import dis
+from typing import List
+
+from .common import StaticTestBase
+
+
+class PeepholeTests(StaticTestBase):
+    def opnames(self, func) -> List[str]:
+        return [instr.opname for instr in dis.get_instructions(func)]
+
+    def test_box_unbox_removed(self) -> None:
+        codestr = """
+            from __static__ import box, int64
+
+            def f(x: int) -> int:
+                y: int64 = int64(x)
+                return box(int64(box(y)) + 1)
+        """
+        with self.in_module(codestr) as mod:
+            f = mod.f
+            self.assertNotInBytecode(f, "REFINE_TYPE", ("builtins", "int", "!"))
+            self.assertEqual(self.opnames(f).count("PRIMITIVE_BOX"), 1)
+            self.assertEqual(f(41), 42)
+            self.assertEqual(f(-2), -1)
+
+    def test_repeated_cast_removed(self) -> None:
+        codestr = """
+            from typing import cast
+
+            def f(x) -> int:
+                return cast(int, cast(int, x))
+        """
+        with self.in_module(codestr) as mod:
+            f = mod.f
+            self.assertEqual(self.opnames(f).count("CAST"), 1)
+            self.assertEqual(f(1), 1)
+            with self.assertRaises(TypeError):
+                f("a")
+
+    def test_load_store_same_local_removed(self) -> None:
+        codestr = """
+            from __static__ import box, int64
+
+            def f() -> int:
+                i: int64 = 3
+                i = i
+                return box(i)
+        """
+        with self.in_module(codestr) as mod:
+            f = mod.f
+            self.assertEqual(self.opnames(f).count("STORE_LOCAL"), 1)
+            self.assertEqual(f(), 3)
+
+    def test_store_load_same_line_uses_dup(self) -> None:
+        codestr = """
+            from __static__ import box, int64
+
+            def f(x: int) -> int:
+                y: int64 = int64(x); return box(y + y)
+        """
+        with self.in_module(codestr) as mod:
+            f = mod.f
+            self.assertInBytecode(f, "DUP_TOP")
+            self.assertEqual(self.opnames(f).count("LOAD_LOCAL"), 1)
+            self.assertEqual(f(21), 42)
+
+    def test_store_load_across_lines_kept(self) -> None:
+        codestr = """
+            from __static__ import box, int64
+
+            def f(x: int) -> int:
+                y: int64 = int64(x)
+                return box(y)
+        """
+        with self.in_module(codestr) as mod:
+            self.assertInBytecode(mod.f, "LOAD_LOCAL")
+            self.assertNotInBytecode(mod.f, "DUP_TOP")
+
+    def test_narrow_store_load_wraps(self) -> None:
+        for typ, value, expected in (("int8", 127, -128), ("uint8", 255, 0)):
+            codestr = f"""
+                from __static__ import box, {typ}
+
+                def f(x: int) -> int:
+                    y: {typ} = {typ}(x)
+                    y = y + 1; return box(y)
+            """
+            with self.subTest(typ=typ), self.in_module(codestr) as mod:
+                f = mod.f
+                self.assertNotInBytecode(f, "DUP_TOP")
+                self.assertEqual(f(value), expected)
+
+    def test_narrow_box_unbox_kept(self) -> None:
+        for typ in ("int8", "uint8"):
+            codestr = f"""
+                from __static__ import box, {typ}
+
+                def f(x: int) -> int:
+                    y: {typ} = {typ}(x)
+                    z: {typ} = {typ}(box(y))
+                    return box(z)
+            """
+            with self.subTest(typ=typ), self.in_module(codestr) as mod:
+                f = mod.f
+                self.assertEqual(self.opnames(f).count("PRIMITIVE_UNBOX"), 2)
+                self.assertEqual(f(5), 5)
@@ -1,7 +1,11 @@
 import sys
 
+from .test_analysis_cache import AnalysisCacheTest
+from .test_batch import BatchCompileTest
+from .test_bundle import BundleTest
 from .test_compiler import CompilerTests, GetModuleKindTest
 from .test_definite_assignment import DefiniteAssignmentTests
+from .test_interface import InterfaceCacheTest
 from .test_loader import StrictLoaderInstallTest, StrictLoaderTest
 
 from .test_ownership import OwnershipTests
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import marshal
+from textwrap import dedent
+from typing import final, Iterable
+from unittest.mock import patch
+
+from compiler.strict.common import DEFAULT_STUB_PATH
+from compiler.strict.compiler import Compiler
+
+from .common import StrictTestBase
+from .sandbox import sandbox, use_cm
+
+
+CODE = dedent(
+    """
+    import __static__
+
+    X: int = 1
+
+    class C:
+        def f(self, x: int) -> int:
+            return x + X
+    """
+)
+
+# Accesses an attribute of a non-strict module at module level.
+INVALID_CODE = dedent(
+    """
+    import __strict__
+    import a
+    x = a.C
+    """
+)
+
+
+@final
+class AnalysisCacheTest(StrictTestBase):
+    def setUp(self) -> None:
+        self.sbx = use_cm(sandbox, self)
+        self.cache_dir = str(self.sbx.root / "cache")
+
+    def make_compiler(self, allow_list_prefix: Iterable[str] = ()) -> Compiler:
+        return Compiler(
+            [str(self.sbx.root)],
+            DEFAULT_STUB_PATH,
+            allow_list_prefix,
+            [],
+            analysis_cache_dir=self.cache_dir,
+        )
+
+    def compile(self, compiler: Compiler, code: str = CODE) -> bytes:
+        code_obj, is_valid = compiler.load_compiled_module_from_source(
+            code, "mod.py", "mod", 0
+        )
+        self.assertTrue(is_valid)
+        return marshal.dumps(code_obj)
+
+    def test_hit_skips_analysis(self) -> None:
+        compiler = self.make_compiler()
+        expected = self.compile(compiler)
+        cache = compiler.analysis_cache
+        assert cache is not None
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        compiler = self.make_compiler()
+        with patch.object(compiler, "loader") as loader:
+            self.assertEqual(self.compile(compiler), expected)
+            loader.check_source.assert_not_called()
+        cache = compiler.analysis_cache
+        assert cache is not None
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_errors_are_cached(self) -> None:
+        self.sbx.write_file("a.py", "class C:\n    x = 1\n")
+        compiler = self.make_compiler()
+        mod = compiler._check_source(INVALID_CODE, "mod.py", "mod", [], False)
+        self.assertEqual(len(mod.errors), 1)
+
+        compiler = self.make_compiler()
+        with patch.object(compiler, "loader") as loader:
+            cached = compiler._check_source(INVALID_CODE, "mod.py", "mod", [], False)
+            loader.check_source.assert_not_called()
+        self.assertEqual(cached.errors, mod.errors)
+        self.assertEqual(cached.module_kind, mod.module_kind)
+        self.assertEqual(cached.stub_kind, mod.stub_kind)
+        self.assertEqual(cached.file_name, mod.file_name)
+
+    def test_key(self) -> None:
+        compiler = self.make_compiler()
+        cache = compiler.analysis_cache
+        assert cache is not None
+        key = cache.key(CODE, "mod.py", "mod", [], False)
+        self.assertEqual(key, cache.key(CODE.encode(), "mod.py", "mod", [], False))
+        self.assertNotEqual(key, cache.key(CODE + "\n", "mod.py", "mod", [], False))
+        self.assertNotEqual(key, cache.key(CODE, "other.py", "mod", [], False))
+        self.assertNotEqual(key, cache.key(CODE, "mod.py", "mod", [], True))
+
+        other = self.make_compiler(allow_list_prefix=["a"]).analysis_cache
+        assert other is not None
+        self.assertNotEqual(key, other.key(CODE, "mod.py", "mod", [], False))
+
+    def test_key_covers_imported_modules(self) -> None:
+        self.sbx.write_file("a.py", "import __strict__\nimport b\n")
+        self.sbx.write_file("b.py", "import __strict__\nX = 1\n")
+        code = "import __strict__\nfrom a import b\n"
+        cache = self.make_compiler().analysis_cache
+        assert cache is not None
+        key = cache.key(code, "mod.py", "mod", [], False)
+
+        # Imported directly, or through another module.
+        for name, source in (
+            ("a.py", "import __strict__\nimport b\nY = 1\n"),
+            ("b.py", "import __strict__\nX = 2\n"),
+        ):
+            with self.subTest(name=name):
+                self.sbx.write_file(name, source)
+                cache = self.make_compiler().analysis_cache
+                assert cache is not None
+                self.assertNotEqual(key, cache.key(code, "mod.py", "mod", [], False))
+
+    def test_disabled_by_default(self) -> None:
+        compiler = Compiler([str(self.sbx.root)], DEFAULT_STUB_PATH, [], [])
+        self.assertIsNone(compiler.analysis_cache)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import marshal
+import os
+import sys
+
+from cinder import _get_qualname, _set_qualname
+from compiler.strict.batch import (
+    compile_all,
+    find_sources,
+    import_graph,
+    stale_sources,
+    topological_order,
+)
+from compiler.strict.loader import (
+    _marshalled_objects,
+    strict_compile,
+    StrictSourceFileLoader,
+)
+from importlib.util import cache_from_source
+from py_compile import PycInvalidationMode
+from types import CodeType
+
+from typing import Dict, final
+from unittest.mock import patch
+
+from .common import StrictTestBase
+from .sandbox import on_sys_path, sandbox, use_cm
+
+
+STRICT_PYC_SUFFIX = (
+    f"cpython-{sys.version_info.major}{sys.version_info.minor}.strict.pyc"
+)
+STRICT_DEPS_SUFFIX = (
+    f"cpython-{sys.version_info.major}{sys.version_info.minor}.strict.deps"
+)
+
+SOURCES = {
+    "pkg/__init__.py": "import __strict__\n",
+    "pkg/base.py": """
+        import __static__
+        from typing import Final
+
+        LIMIT: Final[int] = 42
+
+        class Base:
+            def __init__(self, x: int) -> None:
+                self.x: int = x
+
+            def value(self) -> int:
+                return self.x
+    """,
+    "pkg/derived.py": """
+        import __static__
+        from pkg.base import Base, LIMIT
+
+        class Derived(Base):
+            def value(self) -> int:
+                return super().value() + LIMIT
+
+        def make(x: int) -> int:
+            return Derived(x).value()
+    """,
+    "pkg/user.py": """
+        import __strict__
+        import pkg.derived
+
+        def run() -> int:
+            return pkg.derived.make(1)
+    """,
+}
+
+
+@final
+class BatchCompileTest(StrictTestBase):
+    def setUp(self) -> None:
+        self.sbx = use_cm(sandbox, self)
+        use_cm(lambda: on_sys_path(str(self.sbx.root)), self)
+        self.addCleanup(setattr, StrictSourceFileLoader, "compiler", None)
+        for relpath, contents in SOURCES.items():
+            self.sbx.write_file(relpath, contents)
+
+    def read_outputs(self) -> Dict[str, bytes]:
+        outputs = {}
+        for path in (self.sbx.root / "pkg" / "__pycache__").iterdir():
+            outputs[path.name] = path.read_bytes()
+            path.unlink()
+        return outputs
+
+    def test_import_graph(self) -> None:
+        modules = {
+            "pkg": str(self.sbx.root / "pkg/__init__.py"),
+            "pkg.base": str(self.sbx.root / "pkg/base.py"),
+            "pkg.derived": str(self.sbx.root / "pkg/derived.py"),
+            "pkg.user": str(self.sbx.root / "pkg/user.py"),
+        }
+        graph = import_graph(modules)
+        self.assertEqual(graph["pkg.base"], set())
+        self.assertEqual(graph["pkg.derived"], {"pkg", "pkg.base"})
+        self.assertEqual(graph["pkg.user"], {"pkg", "pkg.derived"})
+
+        order = topological_order(graph)
+        self.assertEqual(len(order), 4)
+        self.assertLess(order.index("pkg.base"), order.index("pkg.derived"))
+        self.assertLess(order.index("pkg.derived"), order.index("pkg.user"))
+
+    def test_topological_order_cycle(self) -> None:
+        order = topological_order({"a": {"b"}, "b": {"a"}, "c": {"a"}})
+        self.assertEqual(order, ["b", "a", "c"])
+
+    def test_matches_serial(self) -> None:
+        sources = find_sources([str(self.sbx.root / "pkg")])
+        self.assertEqual(len(sources), 4)
+        mode = PycInvalidationMode.UNCHECKED_HASH
+
+        for source in sources:
+            strict_compile(
+                source,
+                cache_from_source(source),
+                doraise=True,
+                invalidation_mode=mode,
+            )
+        serial = self.read_outputs()
+        self.assertEqual(
+            sorted(serial),
+            [
+                f"__init__.{STRICT_DEPS_SUFFIX}",
+                f"__init__.{STRICT_PYC_SUFFIX}",
+                f"base.{STRICT_DEPS_SUFFIX}",
+                f"base.{STRICT_PYC_SUFFIX}",
+                f"derived.{STRICT_DEPS_SUFFIX}",
+                f"derived.{STRICT_PYC_SUFFIX}",
+                f"user.{STRICT_DEPS_SUFFIX}",
+                f"user.{STRICT_PYC_SUFFIX}",
+            ],
+        )
+
+        StrictSourceFileLoader.compiler = None
+        errors = compile_all(sources, workers=2, invalidation_mode=mode)
+        self.assertEqual(errors, {source: None for source in sources})
+        self.assertEqual(self.read_outputs(), serial)
+
+    def test_marshal_ignores_outside_references(self) -> None:
+        code = compile("def f(): pass", "<test>", "exec")
+        inner = next(c for c in code.co_consts if isinstance(c, CodeType))
+        # Not interned, so the code object holds the only reference.
+        _set_qualname(inner, "".join(["outer", ".<locals>.f"]))
+
+        held = _marshalled_objects(code)
+        alone = marshal.dumps(code)
+        qualname = _get_qualname(inner)
+        self.assertEqual(marshal.dumps(code), alone)
+        del held, qualname
+
+    def test_max_retained_asts(self) -> None:
+        sources = find_sources([str(self.sbx.root / "pkg")])
+        StrictSourceFileLoader.compiler = None
+        compile_all(sources)
+        expected = self.read_outputs()
+
+        # Dependency records are the same when every AST is released as soon
+        # as its module is compiled.
+        StrictSourceFileLoader.compiler = None
+        with patch.dict(os.environ, {"PYTHONSTRICTMAXRETAINEDASTS": "0"}):
+            compile_all(sources)
+        compiler = StrictSourceFileLoader.compiler
+        self.assertEqual(compiler.max_retained_asts, 0)
+        self.assertEqual(compiler.ast_cache, {})
+        self.assertEqual(self.read_outputs(), expected)
+
+        # A malformed limit falls back to keeping every AST.
+        StrictSourceFileLoader.compiler = None
+        with patch.dict(os.environ, {"PYTHONSTRICTMAXRETAINEDASTS": "lots"}):
+            self.assertEqual(compile_all(sources), {source: None for source in sources})
+        self.assertIsNone(StrictSourceFileLoader.compiler.max_retained_asts)
+
+    def test_reports_errors(self) -> None:
+        bad = self.sbx.write_file(
+            "pkg/bad.py",
+            """
+            import __static__
+
+            def f() -> int:
+                return "not an int"
+            """,
+        )
+        sources = find_sources([str(self.sbx.root / "pkg")])
+        errors = compile_all(sources, workers=2)
+        self.assertIsNotNone(errors[str(bad)])
+        self.assertIn("str", errors[str(bad)])
+        for source in sources:
+            if source != str(bad):
+                self.assertIsNone(errors[source])
+
+    def test_incremental(self) -> None:
+        sources = find_sources([str(self.sbx.root / "pkg")])
+        base, derived, user = (
+            str(self.sbx.root / "pkg" / f"{name}.py")
+            for name in ("base", "derived", "user")
+        )
+
+        def stale() -> list[str]:
+            StrictSourceFileLoader.compiler = None
+            return stale_sources(sources)
+
+        self.assertEqual(stale(), sources)
+        StrictSourceFileLoader.compiler = None
+        self.assertEqual(compile_all(sources), {source: None for source in sources})
+        self.assertEqual(stale(), [])
+
+        # Changing a declaration nothing consumes only rebuilds its module.
+        unused = "\n        def unused() -> None:\n            pass\n"
+        self.sbx.write_file("pkg/base.py", SOURCES["pkg/base.py"] + unused)
+        self.assertEqual(stale(), [base])
+        StrictSourceFileLoader.compiler = None
+        compile_all([base])
+        self.assertEqual(stale(), [])
+
+        # Changing a consumed Final rebuilds its static dependents too.
+        self.sbx.write_file(
+            "pkg/base.py", SOURCES["pkg/base.py"].replace("= 42", "= 43")
+        )
+        self.assertEqual(stale(), [base, derived])
+
+        self.sbx.write_file(
+            "pkg/user.py", SOURCES["pkg/user.py"] + "\n        x = 1\n"
+        )
+        self.assertEqual(stale(), [base, derived, user])
+
+    def test_incremental_interface_only(self) -> None:
+        self.sbx.write_file(
+            "pkg/reexport.py",
+            """
+            import __static__
+            from pkg.base import LIMIT
+            """,
+        )
+        self.sbx.write_file(
+            "pkg/consumer.py",
+            """
+            import __static__
+            from pkg.reexport import LIMIT
+
+            def get() -> int:
+                return LIMIT
+            """,
+        )
+        sources = find_sources([str(self.sbx.root / "pkg")])
+        base, consumer, derived, reexport = (
+            str(self.sbx.root / "pkg" / f"{name}.py")
+            for name in ("base", "consumer", "derived", "reexport")
+        )
+
+        def stale() -> list[str]:
+            StrictSourceFileLoader.compiler = None
+            return stale_sources(sources)
+
+        StrictSourceFileLoader.compiler = None
+        self.assertEqual(compile_all(sources), {source: None for source in sources})
+        self.assertEqual(stale(), [])
+
+        # Editing only a method body doesn't change what dependents consume.
+        self.sbx.write_file(
+            "pkg/base.py",
+            SOURCES["pkg/base.py"].replace("return self.x", "return self.x + 0"),
+        )
+        self.assertEqual(stale(), [base])
+        StrictSourceFileLoader.compiler = None
+        compile_all([base])
+        self.assertEqual(stale(), [])
+
+        # A Final re-exported through another module is followed to its source.
+        self.sbx.write_file(
+            "pkg/base.py", SOURCES["pkg/base.py"].replace("= 42", "= 43")
+        )
+        self.assertEqual(stale(), [base, consumer, derived, reexport])
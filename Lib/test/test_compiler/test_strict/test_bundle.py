@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import shutil
+import sys
+
+from cinder import StrictModule
+from compiler.consts import CO_STATICALLY_COMPILED
+from compiler.strict.bundle import BundleFinder, BundleLoader, build_bundle
+from compiler.strict.loader import StrictSourceFileLoader
+from typing import final
+
+from .common import StrictTestBase
+from .sandbox import (
+    on_sys_path,
+    restore_strict_modules,
+    restore_sys_modules,
+    sandbox,
+    use_cm,
+)
+
+
+INIT = "import __strict__\nx = 1\n"
+
+
+@final
+class BundleTest(StrictTestBase):
+    def setUp(self) -> None:
+        self.sbx = use_cm(sandbox, self)
+        use_cm(lambda: on_sys_path(str(self.sbx.root)), self)
+        use_cm(restore_sys_modules, self)
+        use_cm(restore_strict_modules, self)
+        self.sources = [
+            str(self.sbx.write_file("bpkg/__init__.py", INIT)),
+            str(
+                self.sbx.write_file(
+                    "bpkg/typed.py",
+                    """
+                    import __static__
+
+                    class C:
+                        def f(self, x: int) -> int:
+                            return x * 2
+
+                    def g() -> int:
+                        return C().f(21)
+                    """,
+                )
+            ),
+            str(self.sbx.write_file("bpkg/plain.py", "import os\ny = 2\n")),
+        ]
+        self.bundle = str(self.sbx.root / "modules.bundle")
+
+    def install(self) -> BundleFinder:
+        finder = BundleFinder(self.bundle)
+        self.addCleanup(finder.close)
+        sys.meta_path.insert(0, finder)
+        self.addCleanup(sys.meta_path.remove, finder)
+        return finder
+
+    def test_build(self) -> None:
+        names = build_bundle(self.bundle, self.sources)
+        self.assertEqual(names, ["bpkg", "bpkg.typed", "bpkg.plain"])
+        finder = self.install()
+        self.assertIsNone(finder.find_spec("bpkg.missing"))
+
+        spec = finder.find_spec("bpkg")
+        assert spec is not None
+        self.assertIsInstance(spec.loader, BundleLoader)
+        self.assertEqual(spec.origin, self.sources[0])
+        self.assertEqual(
+            spec.submodule_search_locations, [str(self.sbx.root / "bpkg")]
+        )
+
+        self.assertEqual(spec.loader.get_source("bpkg"), INIT)
+        spec = finder.find_spec("bpkg.typed")
+        assert spec is not None
+        code = spec.loader.get_code("bpkg.typed")
+        self.assertTrue(code.co_flags & CO_STATICALLY_COMPILED)
+
+    def test_import_without_sources(self) -> None:
+        build_bundle(self.bundle, self.sources)
+        shutil.rmtree(self.sbx.root / "bpkg")
+        StrictSourceFileLoader.compiler = None
+        self.install()
+
+        import bpkg
+        import bpkg.plain
+        import bpkg.typed
+
+        # Strict packages are immutable, so submodules aren't set on them.
+        typed = sys.modules["bpkg.typed"]
+        plain = sys.modules["bpkg.plain"]
+        self.assertIsInstance(bpkg, StrictModule)
+        self.assertEqual(bpkg.x, 1)
+        self.assertIsInstance(typed, StrictModule)
+        self.assertEqual(typed.g(), 42)
+        self.assertTrue(typed.g.__code__.co_flags & CO_STATICALLY_COMPILED)
+        self.assertNotIsInstance(plain, StrictModule)
+        self.assertEqual(plain.y, 2)
+        self.assertEqual(plain.__file__, self.sources[2])
+        self.assertIsNone(plain.__loader__.get_source("bpkg.plain"))
+
+    def test_invalid_bundle(self) -> None:
+        self.sbx.write_file("modules.bundle", "not a bundle")
+        with self.assertRaises(ImportError):
+            BundleFinder(self.bundle)
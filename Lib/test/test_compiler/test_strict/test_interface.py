@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import ast
+import io
+import os
+import pickle
+import sys
+
+from compiler.strict.common import DEFAULT_STUB_PATH
+from compiler.strict.compiler import Compiler
+from compiler.strict.interface import (
+    _ASTUnpickler,
+    interface_path,
+    read_interface,
+)
+from compiler.static.types import Class
+from typing import final, Sequence
+from unittest.mock import patch
+
+from .common import StrictTestBase
+from .sandbox import sandbox, use_cm
+
+
+@final
+class InterfaceCacheTest(StrictTestBase):
+    def setUp(self) -> None:
+        self.sbx = use_cm(sandbox, self)
+        use_cm(lambda: patch.object(sys, "dont_write_bytecode", False), self)
+        self.path = self.sbx.write_file(
+            "a.py",
+            """
+            import __static__
+
+            class C:
+                def f(self, x: int) -> int:
+                    return x
+            """,
+        )
+
+    def make_compiler(
+        self, stub_root: str = DEFAULT_STUB_PATH, allow_list_exact: Sequence[str] = ()
+    ) -> Compiler:
+        return Compiler(
+            [str(self.sbx.root)],
+            stub_root,
+            [],
+            allow_list_exact,
+            raise_on_error=True,
+            use_interface_cache=True,
+        )
+
+    def test_written_on_import(self) -> None:
+        compiler = self.make_compiler()
+        self.assertIsNotNone(compiler.import_module("a", 0))
+        self.assertTrue(os.path.isfile(interface_path(str(self.path), 0)))
+        self.assertFalse(os.path.exists(interface_path(str(self.path), 1)))
+
+        path = str(self.path)
+        source = self.path.read_bytes()
+        config = compiler.loader_config
+        self.assertIsNotNone(read_interface(path, source, 0, False, config))
+        # The interface is only valid for the options it was built with.
+        self.assertIsNone(read_interface(path, source, 0, True, config))
+        self.assertIsNone(read_interface(path, source, 1, False, config))
+
+    def test_stale_on_loader_config_change(self) -> None:
+        self.make_compiler().import_module("a", 0)
+        path = str(self.path)
+        source = self.path.read_bytes()
+
+        stubs = str(self.sbx.root / "stubs")
+        os.mkdir(stubs)
+        for compiler in (
+            self.make_compiler(allow_list_exact=["a"]),
+            self.make_compiler(stub_root=stubs),
+        ):
+            config = compiler.loader_config
+            self.assertIsNone(read_interface(path, source, 0, False, config))
+
+        # So does changing the contents of the stubs.
+        config = self.make_compiler(stub_root=stubs).loader_config
+        self.sbx.write_file("stubs/b.pyi", "x: int\n")
+        self.assertNotEqual(self.make_compiler(stub_root=stubs).loader_config, config)
+
+    def test_loaded_without_analysis(self) -> None:
+        self.make_compiler().import_module("a", 0)
+
+        compiler = self.make_compiler()
+        with patch.object(compiler, "loader") as loader:
+            mod = compiler.import_module("a", 0)
+            loader.check.assert_not_called()
+        self.assertIsNotNone(mod)
+        self.assertEqual(mod.filename, str(self.path))
+        self.assertIsInstance(mod.get_child("C"), Class)
+        self.assertIn("a", compiler.ast_cache)
+        # The loaded nodes get ids in this module's table, not foreign ones.
+        self.assertEqual(mod.types.foreign, {})
+
+    def test_node_ids_not_written(self) -> None:
+        self.make_compiler().import_module("a", 0)
+        with open(interface_path(str(self.path), 0), "rb") as f:
+            self.assertNotIn(b"_static_node_id", f.read())
+
+    def test_stale_on_source_change(self) -> None:
+        self.make_compiler().import_module("a", 0)
+        self.sbx.write_file(
+            "a.py",
+            """
+            import __static__
+
+            class D:
+                pass
+            """,
+        )
+
+        compiler = self.make_compiler()
+        mod = compiler.import_module("a", 0)
+        self.assertIsNotNone(mod)
+        self.assertIsNone(mod.get_child("C"))
+        self.assertIsInstance(mod.get_child("D"), Class)
+
+    def test_not_written_for_non_static(self) -> None:
+        path = self.sbx.write_file("b.py", "import __strict__\nx = 1\n")
+        compiler = self.make_compiler()
+        self.assertIsNone(compiler.import_module("b", 0))
+        self.assertFalse(os.path.exists(interface_path(str(path), 0)))
+
+    def test_disabled_by_default(self) -> None:
+        compiler = Compiler([str(self.sbx.root)], DEFAULT_STUB_PATH, [], [])
+        compiler.import_module("a", 0)
+        self.assertFalse(os.path.exists(interface_path(str(self.path), 0)))
+
+    def test_only_ast_nodes_unpickled(self) -> None:
+        def load(obj: object) -> object:
+            return _ASTUnpickler(io.BytesIO(pickle.dumps(obj))).load()
+
+        tree = ast.parse("x = ...")
+        self.assertEqual(ast.dump(load(tree)), ast.dump(tree))
+        for obj in (ast.parse, ast.literal_eval, os.system):
+            with self.assertRaises(pickle.UnpicklingError):
+                load(obj)
@@ -14,6 +14,9 @@
 STRICT_PYC_SUFFIX = (
     f"cpython-{sys.version_info.major}{sys.version_info.minor}.strict.pyc"
 )
+STRICT_DEPS_SUFFIX = (
+    f"cpython-{sys.version_info.major}{sys.version_info.minor}.strict.deps"
+)
 
 
 @final
@@ -63,8 +66,11 @@ def test_compile_dir(self) -> None:
         self.assertEqual(
             sorted(files),
             [
+                f"__init__.{STRICT_DEPS_SUFFIX}",
                 f"__init__.{STRICT_PYC_SUFFIX}",
+                f"bar.{STRICT_DEPS_SUFFIX}",
                 f"bar.{STRICT_PYC_SUFFIX}",
+                f"foo.{STRICT_DEPS_SUFFIX}",
                 f"foo.{STRICT_PYC_SUFFIX}",
             ],
         )
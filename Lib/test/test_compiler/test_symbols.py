@@ -1,7 +1,8 @@
 import ast
 from ast import FunctionDef
 from compiler import walk
-from compiler.consts import SC_GLOBAL_IMPLICIT
+from compiler.consts import CO_FUTURE_ANNOTATIONS, SC_GLOBAL_IMPLICIT
+from compiler.pycodegen import find_futures
 from compiler.symbols import SymbolVisitor
 
 from .common import CompilerTest
@@ -73,6 +74,25 @@ class C:
         else:
             self.fail("scope not found")
 
+    def test_check_future_placement(self):
+        code = """if x:
+            from __future__ import annotations"""
+        module = ast.parse(code)
+        walk(module, SymbolVisitor(0))
+        with self.assertRaisesRegex(SyntaxError, "beginning of the file"):
+            walk(module, SymbolVisitor(0, check_futures=True))
+
+    def test_find_futures_without_placement_check(self):
+        code = """from __future__ import annotations
+if x:
+    from __future__ import generator_stop"""
+        module = ast.parse(code)
+        self.assertEqual(
+            find_futures(0, module, check_placement=False), CO_FUTURE_ANNOTATIONS
+        )
+        with self.assertRaisesRegex(SyntaxError, "beginning of the file"):
+            find_futures(0, module)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,6 @@
 import ast
 from compiler.unparse import to_expr
-from compiler.visitor import ASTRewriter
+from compiler.visitor import ASTRewriter, ASTVisitor, child_fields
 from unittest import TestCase
 
 
@@ -86,3 +86,47 @@ def visitAssign(self, node):
         func = new_tree.body[0]
         self.assertIsNotNone(func.returns)
         self.assertEqual(type(func.body[0]), ast.Pass)
+
+    def test_dispatch_table(self):
+        class Counter(ASTVisitor):
+            def __init__(self):
+                super().__init__()
+                self.names = []
+
+            def visitName(self, node):
+                self.names.append(node.id)
+
+        class SubCounter(Counter):
+            pass
+
+        tree = ast.parse("f(x, [y for y in z], k=w)")
+        counter = Counter()
+        counter.visit(tree)
+        self.assertEqual(sorted(counter.names), ["f", "w", "x", "y", "y", "z"])
+        self.assertIn(ast.Name, Counter._dispatch)
+        self.assertNotIn(ast.Name, ASTVisitor._dispatch)
+        SubCounter().visit(tree)
+        self.assertIsNot(SubCounter._dispatch, Counter._dispatch)
+
+        def visitName(self, node):
+            self.names.append(node.id.upper())
+
+        Counter.visitName = visitName
+        try:
+            Counter.clear_dispatch_table()
+            self.assertEqual(SubCounter._dispatch, {})
+            sub = SubCounter()
+            sub.visit(ast.parse("x"))
+            self.assertEqual(sub.names, ["X"])
+        finally:
+            del Counter.visitName
+            Counter.clear_dispatch_table()
+
+    def test_child_fields(self):
+        self.assertEqual(child_fields(ast.Name), ("ctx",))
+        self.assertEqual(child_fields(ast.Global), ())
+        self.assertEqual(child_fields(ast.Import), ("names",))
+        self.assertEqual(
+            child_fields(ast.FunctionDef),
+            ("args", "body", "decorator_list", "returns"),
+        )
@@ -361,12 +361,46 @@ get_and_clear_type_profiles_with_metadata(PyObject *self, PyObject *obj) {
     return _PyJIT_GetAndClearTypeProfiles();
 }
 
+static PyObject*
+dump_type_profiles(PyObject *self, PyObject *arg) {
+    PyObject *path = NULL;
+    if (!PyUnicode_FSConverter(arg, &path)) {
+        return NULL;
+    }
+    int st = _PyJIT_WriteTypeProfiles(PyBytes_AS_STRING(path));
+    Py_DECREF(path);
+    if (st < 0) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
 static PyObject*
 clear_type_profiles(PyObject *self, PyObject *obj) {
     _PyJIT_ClearTypeProfiles();
     Py_RETURN_NONE;
 }
 
+PyAPI_FUNC(int) _PyImport_SetLazyImportProfiling(int enabled);
+PyAPI_FUNC(PyObject *) _PyImport_GetAndClearLazyImportProfile(void);
+
+static PyObject*
+set_lazy_import_profiling(PyObject *self, PyObject *arg) {
+    int is_true = PyObject_IsTrue(arg);
+    if (is_true < 0) {
+        return NULL;
+    }
+    if (_PyImport_SetLazyImportProfiling(is_true) < 0) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject*
+get_and_clear_lazy_import_profile(PyObject *self, PyObject *obj) {
+    return _PyImport_GetAndClearLazyImportProfile();
+}
+
 static PyObject*
 get_frame_gen(PyObject *self, PyObject *frame) {
     if (!PyFrame_Check(frame)) {
@@ -693,10 +727,25 @@ static struct PyMethodDef cinder_module_methods[] = {
      get_and_clear_type_profiles_with_metadata,
      METH_NOARGS,
      "Get and clear accumulated interpreter type profiles, including type-specific metadata."},
+    {"dump_type_profiles",
+     dump_type_profiles,
+     METH_O,
+     "Write accumulated interpreter type profiles to the given path, in the format read by -X jit-read-profile, without clearing them."},
     {"clear_type_profiles",
      clear_type_profiles,
      METH_NOARGS,
      "Clear accumulated interpreter type profiles."},
+    {"set_lazy_import_profiling",
+     set_lazy_import_profiling,
+     METH_O,
+     "Enable or disable recording of lazy import resolutions and module "
+     "loads."},
+    {"get_and_clear_lazy_import_profile",
+     get_and_clear_lazy_import_profile,
+     METH_NOARGS,
+     "Get and clear recorded lazy import resolutions and module loads, as a "
+     "list of (id, parent_id, name, module, lineno, duration_ns, lazy) tuples "
+     "in the order they finished."},
     {"_get_frame_gen",
      get_frame_gen,
      METH_O,
@@ -1552,6 +1552,18 @@ eval_frame_handle_pending(PyThreadState *tstate)
 #define JUMPTO(x)       (next_instr = first_instr + (x))
 #define JUMPBY(x)       (next_instr += (x))
 
+/* facebook begin */
+/* Backward jumps close loops; auto-JIT counts them towards hotness when a
+   backedge threshold is configured. Call before jumping to x. */
+#define COUNT_BACKEDGE(x) do { \
+        if (_PyJIT_AutoJITBackedgeThresholdValue > 0 && \
+            (x) < INSTR_OFFSET() && \
+            co->co_mutable->nbackedges < UINT_MAX) { \
+            co->co_mutable->nbackedges++; \
+        } \
+    } while (0)
+/* facebook end */
+
 /* OpCode prediction macros
     Some opcodes tend to come in pairs thus making it possible to
     predict the second code when the first is run.  For example,
@@ -1801,6 +1813,24 @@ _PyEval_EvalFrameDefault(PyThreadState *tstate, PyFrameObject *f, int throwflag)
     co = f->f_code;
     co->co_mutable->curcalls++;
 
+#ifdef ENABLE_CINDERX
+    /* The JIT asks for the types seen by code whose compiled guards keep
+       failing. Profiling happens in tracing_dispatch, so send this frame
+       there, and recompute use_tracing for the caller when it returns.
+       Only this frame is forced: a callee doesn't inherit use_tracing from
+       a forced caller, and sets it back for the caller when it returns. */
+    int caller_forced_tracing = trace_info.cframe.use_tracing &&
+        !_Py_ThreadStateHasTracing(tstate);
+    if (caller_forced_tracing) {
+        trace_info.cframe.use_tracing = 0;
+    }
+    int force_tracing = co->co_mutable->profile_types &&
+        !trace_info.cframe.use_tracing;
+    if (force_tracing) {
+        trace_info.cframe.use_tracing = 1;
+    }
+#endif
+
     // Generator shadow frames are managed by the send implementation.
     if (f->f_gen == NULL) {
         _PyShadowFrame_PushInterp(tstate, &shadow_frame, f);
@@ -1847,8 +1877,8 @@ _PyEval_EvalFrameDefault(PyThreadState *tstate, PyFrameObject *f, int throwflag)
 
     /* facebook begin t39538061 */
     /* Initialize the inline cache after the code object is "hot enough" */
-    if (!tstate->profile_interp && co->co_mutable->shadow == NULL &&
-        _PyEval_ShadowByteCodeEnabled) {
+    if (!tstate->profile_interp && !co->co_mutable->profile_types &&
+        co->co_mutable->shadow == NULL && _PyEval_ShadowByteCodeEnabled) {
         if (++(co->co_mutable->ncalls) > PYSHADOW_INIT_THRESHOLD) {
             if (_PyShadow_InitCache(co) == -1) {
                 goto error;
@@ -1983,7 +2013,7 @@ f->lazy_imports_cache_seq = -1;
 
 #ifdef ENABLE_CINDERX
         struct _ceval_state *ceval = &tstate->interp->ceval;
-        if (tstate->profile_interp &&
+        if ((tstate->profile_interp || co->co_mutable->profile_types) &&
             ++ceval->profile_instr_counter == ceval->profile_instr_period) {
             ceval->profile_instr_counter = 0;
             profiled_instrs++;
@@ -3744,6 +3774,7 @@ f->lazy_imports_cache_seq = -1;
             }
             if (Py_IsFalse(cond)) {
                 Py_DECREF(cond);
+                COUNT_BACKEDGE(oparg);
                 JUMPTO(oparg);
                 CHECK_EVAL_BREAKER();
                 DISPATCH();
@@ -3753,6 +3784,7 @@ f->lazy_imports_cache_seq = -1;
             if (err > 0)
                 ;
             else if (err == 0) {
+                COUNT_BACKEDGE(oparg);
                 JUMPTO(oparg);
                 CHECK_EVAL_BREAKER();
             }
@@ -3771,6 +3803,7 @@ f->lazy_imports_cache_seq = -1;
             }
             if (Py_IsTrue(cond)) {
                 Py_DECREF(cond);
+                COUNT_BACKEDGE(oparg);
                 JUMPTO(oparg);
                 CHECK_EVAL_BREAKER();
                 DISPATCH();
@@ -3778,6 +3811,7 @@ f->lazy_imports_cache_seq = -1;
             err = PyObject_IsTrue(cond);
             Py_DECREF(cond);
             if (err > 0) {
+                COUNT_BACKEDGE(oparg);
                 JUMPTO(oparg);
                 CHECK_EVAL_BREAKER();
             }
@@ -3839,6 +3873,7 @@ f->lazy_imports_cache_seq = -1;
 
         case TARGET(JUMP_ABSOLUTE): {
             PREDICTED(JUMP_ABSOLUTE);
+            COUNT_BACKEDGE(oparg);
             JUMPTO(oparg);
             CHECK_EVAL_BREAKER();
             DISPATCH();
@@ -6638,6 +6673,11 @@ f->lazy_imports_cache_seq = -1;
     tstate->cframe->use_tracing = trace_info.cframe.use_tracing;
 
 #ifdef ENABLE_CINDERX
+    if (caller_forced_tracing) {
+        tstate->cframe->use_tracing = 1;
+    } else if (force_tracing) {
+        tstate->cframe->use_tracing = _Py_ThreadStateHasTracing(tstate);
+    }
     if (profiled_instrs != 0) {
         _PyJIT_CountProfiledInstrs(f->f_code, profiled_instrs);
     }
@@ -8236,13 +8276,30 @@ static unsigned int count_calls(PyCodeObject* code) {
   return ncalls;
 }
 
+static int is_hot(PyCodeObject* code) {
+  unsigned int backedge_threshold = _PyJIT_AutoJITBackedgeThresholdValue;
+  return count_calls(code) > _PyJIT_AutoJITThreshold() ||
+      (backedge_threshold > 0 &&
+       code->co_mutable->nbackedges > backedge_threshold);
+}
+
 PyObject*
 PyEntry_AutoJIT(PyFunctionObject *func,
                 PyObject **stack,
                 Py_ssize_t nargsf,
                 PyObject *kwnames) {
     PyCodeObject* code = (PyCodeObject*)func->func_code;
-    if (count_calls(code) > _PyJIT_AutoJITThreshold()) {
+    if (is_hot(code)) {
+        if (_PyJIT_AutoJITEnqueue(func)) {
+            // Run in the interpreter until the queue is compiled, which
+            // replaces the entry point again. The queue may already have been
+            // compiled, and failed to compile this function.
+            if (func->vectorcall == (vectorcallfunc)PyEntry_AutoJIT) {
+                func->vectorcall = (vectorcallfunc)PyEntry_LazyInit;
+                PyEntry_initnow(func);
+            }
+            return func->vectorcall((PyObject *)func, stack, nargsf, kwnames);
+        }
         if (_PyJIT_CompileFunction(func) != PYJIT_RESULT_OK) {
             func->vectorcall = (vectorcallfunc)PyEntry_LazyInit;
             PyEntry_initnow(func);
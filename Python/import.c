@@ -1487,6 +1487,93 @@ resolve_name(PyThreadState *tstate, PyObject *name, PyObject *globals, int level
     return NULL;
 }
 
+/* Lazy import profiling.
+
+   While enabled, every resolution of a lazy import and every module load
+   appends a tuple (id, parent_id, name, module, lineno, duration_ns, lazy) to
+   lazy_import_profile. `name` is the resolved name or the loaded module,
+   `module` and `lineno` identify the code that triggered it, `parent_id` is
+   the id of the resolution or load that was in progress on the same thread
+   when this one started (or -1), `duration_ns` is the wall time spent,
+   including nested resolutions and loads, and `lazy` is true for
+   resolutions. */
+static int lazy_import_profiling = 0;
+static PyObject *lazy_import_profile = NULL;
+static Py_ssize_t lazy_import_profile_next_id = 0;
+
+typedef struct {
+    Py_ssize_t id;
+    Py_ssize_t parent;
+    PyObject *module;
+    int lineno;
+    _PyTime_t start;
+} import_profile_entry;
+
+static int
+import_profile_enter(PyThreadState *tstate, import_profile_entry *entry)
+{
+    PyObject *module = Py_None;
+    int lineno = -1;
+    PyFrameObject *frame = PyEval_GetFrame();
+    if (frame != NULL) {
+        PyObject *name = _PyDict_GetItemIdWithError(frame->f_globals,
+                                                    &PyId___name__);
+        if (name != NULL) {
+            module = name;
+        }
+        else if (_PyErr_Occurred(tstate)) {
+            return -1;
+        }
+        lineno = PyFrame_GetLineNumber(frame);
+    }
+    Py_INCREF(module);
+    entry->module = module;
+    entry->lineno = lineno;
+    entry->id = lazy_import_profile_next_id++;
+    entry->parent = tstate->lazy_import_profile_parent;
+    tstate->lazy_import_profile_parent = entry->id;
+    entry->start = _PyTime_GetPerfCounter();
+    return 0;
+}
+
+/* Record the resolution of `lazy_import`, or the load of the module
+   `abs_name`, that started with import_profile_enter(). */
+static void
+import_profile_exit(PyThreadState *tstate, import_profile_entry *entry,
+                    PyObject *lazy_import, PyObject *abs_name)
+{
+    _PyTime_t duration = _PyTime_GetPerfCounter() - entry->start;
+    tstate->lazy_import_profile_parent = entry->parent;
+
+    if (lazy_import_profiling && lazy_import_profile != NULL) {
+        /* A failure to record the import shouldn't affect it. */
+        PyObject *exc_type, *exc_value, *exc_tb;
+        _PyErr_Fetch(tstate, &exc_type, &exc_value, &exc_tb);
+        PyObject *name;
+        if (lazy_import != NULL) {
+            name = _PyLazyImport_GetName(lazy_import);
+        }
+        else {
+            name = abs_name;
+            Py_INCREF(name);
+        }
+        PyObject *record = NULL;
+        if (name != NULL) {
+            record = Py_BuildValue("(nnOOiLO)", entry->id, entry->parent,
+                                   name, entry->module, entry->lineno,
+                                   (long long)duration,
+                                   lazy_import != NULL ? Py_True : Py_False);
+        }
+        if (record == NULL || PyList_Append(lazy_import_profile, record) < 0) {
+            _PyErr_Clear(tstate);
+        }
+        Py_XDECREF(record);
+        Py_XDECREF(name);
+        _PyErr_Restore(tstate, exc_type, exc_value, exc_tb);
+    }
+    Py_DECREF(entry->module);
+}
+
 static PyObject *
 import_find_and_load(PyThreadState *tstate, PyObject *abs_name)
 {
@@ -1509,6 +1596,11 @@ import_find_and_load(PyThreadState *tstate, PyObject *abs_name)
         return NULL;
     }
 
+    import_profile_entry profile_entry;
+    int profiling = lazy_import_profiling;
+    if (profiling && import_profile_enter(tstate, &profile_entry) < 0) {
+        return NULL;
+    }
 
     /* XOptions is initialized after first some imports.
      * So we can't have negative cache before completed initialization.
@@ -1536,6 +1628,10 @@ import_find_and_load(PyThreadState *tstate, PyObject *abs_name)
                                         interp->import_func,
                                         NULL);
 
+    if (profiling) {
+        import_profile_exit(tstate, &profile_entry, NULL, abs_name);
+    }
+
     if (PyDTrace_IMPORT_FIND_LOAD_DONE_ENABLED())
         PyDTrace_IMPORT_FIND_LOAD_DONE(PyUnicode_AsUTF8(abs_name),
                                        mod != NULL);
@@ -2079,8 +2175,8 @@ _PyImport_ImportFrom(PyThreadState *tstate, PyObject *v, PyObject *name)
     return NULL;
 }
 
-PyObject *
-_PyImport_LoadLazyImportTstate(PyThreadState *tstate, PyObject *lazy_import, int full)
+static PyObject *
+load_lazy_import(PyThreadState *tstate, PyObject *lazy_import, int full)
 {
     PyObject *obj = NULL;
     PyObject *fromlist = NULL;
@@ -2182,6 +2278,55 @@ _PyImport_LoadLazyImportTstate(PyThreadState *tstate, PyObject *lazy_import, int
     return obj;
 }
 
+static PyObject *
+load_lazy_import_profiled(PyThreadState *tstate, PyObject *lazy_import, int full)
+{
+    import_profile_entry entry;
+    if (import_profile_enter(tstate, &entry) < 0) {
+        return NULL;
+    }
+    PyObject *obj = load_lazy_import(tstate, lazy_import, full);
+    import_profile_exit(tstate, &entry, lazy_import, NULL);
+    return obj;
+}
+
+PyObject *
+_PyImport_LoadLazyImportTstate(PyThreadState *tstate, PyObject *lazy_import, int full)
+{
+    if (lazy_import_profiling) {
+        return load_lazy_import_profiled(tstate, lazy_import, full);
+    }
+    return load_lazy_import(tstate, lazy_import, full);
+}
+
+int
+_PyImport_SetLazyImportProfiling(int enabled)
+{
+    if (enabled && lazy_import_profile == NULL) {
+        lazy_import_profile = PyList_New(0);
+        if (lazy_import_profile == NULL) {
+            return -1;
+        }
+    }
+    lazy_import_profiling = enabled;
+    return 0;
+}
+
+PyObject *
+_PyImport_GetAndClearLazyImportProfile(void)
+{
+    PyObject *profile = lazy_import_profile;
+    if (profile == NULL) {
+        return PyList_New(0);
+    }
+    lazy_import_profile = PyList_New(0);
+    if (lazy_import_profile == NULL) {
+        lazy_import_profile = profile;
+        return NULL;
+    }
+    return profile;
+}
+
 PyObject *
 _PyImport_LoadLazyImport(PyObject *lazy_import, int full)
 {
@@ -672,6 +672,8 @@ new_threadstate(PyInterpreterState *interp, int init)
     tstate->context = NULL;
     tstate->context_ver = 1;
 
+    tstate->lazy_import_profile_parent = -1;
+
     if (init) {
         _PyThreadState_Init(tstate);
     }